@@ -0,0 +1,187 @@
+"""
+Admission control for /api/detect.
+Bounds the requests waiting for the model and predicts each one's queue wait
+from recent batch forward times. Work that cannot finish within its deadline is
+rejected (or dropped) before it reaches the model, and heatmaps are skipped
+under load so classification keeps its latency.
+"""
+import math
+import os
+import threading
+import time
+from typing import Optional
+
+ADMITTED = "admitted"
+DEGRADED = "degraded"
+REJECTED = "rejected"
+EXPIRED = "expired"
+
+# Request header / form field carrying the client's remaining budget in milliseconds
+DEADLINE_HEADER = "X-Deadline-Ms"
+DEADLINE_FIELD = "deadline_ms"
+
+
+class AdmissionRejected(RuntimeError):
+    """Raised when a request is shed before inference."""
+
+    def __init__(self, message: str, decision: str, retry_after: int, info: dict):
+        super().__init__(message)
+        self.decision = decision
+        self.retry_after = retry_after
+        self.info = info
+
+
+def deadline_from_request(headers, form, received_at: float, default_ms: float = 0) -> Optional[float]:
+    """
+    Absolute deadline of a request, on the time.monotonic() clock.
+
+    Args:
+        headers: Request headers (X-Deadline-Ms)
+        form: Request fields (deadline_ms, used when the header is absent)
+        received_at: time.monotonic() when the request arrived
+        default_ms: Budget for requests that carry none (0: no deadline)
+
+    Returns:
+        The deadline, or None for no deadline
+
+    Raises:
+        ValueError: The budget is not a number
+    """
+    budget = headers.get(DEADLINE_HEADER) or form.get(DEADLINE_FIELD)
+    try:
+        budget_ms = float(budget) if budget else float(default_ms)
+    except ValueError:
+        raise ValueError(f"{DEADLINE_HEADER} / {DEADLINE_FIELD} must be a number of milliseconds")
+    return received_at + budget_ms / 1000.0 if budget_ms > 0 else None
+
+
+class AdmissionController:
+    """Bounded admission in front of the model, with queue-wait prediction and counters."""
+
+    def __init__(self, max_pending: int = 32, max_batch_size: int = 8, degrade_ratio: float = 0.5,
+                 default_deadline_ms: float = 0, smoothing: float = 0.2):
+        """
+        Args:
+            max_pending: Requests admitted to inference at once; more are rejected
+            max_batch_size: Images per forward, to turn queue length into forwards
+            degrade_ratio: Share of max_pending above which heatmaps are skipped
+            default_deadline_ms: Budget of requests that carry none (0: no deadline)
+            smoothing: Weight of the newest sample in the moving averages
+        """
+        self.max_pending = max(1, int(max_pending))
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.degrade_ratio = float(degrade_ratio)
+        self.default_deadline_ms = float(default_deadline_ms)
+        self.smoothing = float(smoothing)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        # Moving averages (seconds) of one batch forward and of one inline heatmap
+        self._forward_time = None
+        self._heatmap_time = None
+        self._counters = {"admitted": 0, "degraded": 0, "rejected_full": 0,
+                          "rejected_deadline": 0, "expired": 0}
+
+    @classmethod
+    def from_env(cls):
+        """Create a controller configured from ADMISSION_* and BATCH_MAX_SIZE environment variables."""
+        return cls(
+            max_pending=int(os.environ.get('ADMISSION_MAX_PENDING', 32)),
+            max_batch_size=int(os.environ.get('BATCH_MAX_SIZE', 8)),
+            degrade_ratio=float(os.environ.get('ADMISSION_DEGRADE_RATIO', 0.5)),
+            default_deadline_ms=float(os.environ.get('DETECT_DEADLINE_MS', 0)),
+        )
+
+    def predicted_wait(self, ahead: int) -> float:
+        """Seconds until a request with `ahead` requests in front of it has been classified."""
+        forwards = ahead // self.max_batch_size + 1
+        return forwards * (self._forward_time or 0.0)
+
+    def admit(self, deadline: Optional[float] = None, heatmap: bool = False) -> dict:
+        """
+        Admit one request to inference; pair every successful call with release().
+
+        Args:
+            deadline: time.monotonic() deadline, or None
+            heatmap: The request asks for a heatmap in its response (inline or fused)
+
+        Returns:
+            Admission info for the response: 'decision' (admitted or degraded), 'in_flight',
+            'predicted_wait_ms' and 'budget_ms'
+
+        Raises:
+            AdmissionRejected: The deadline passed, the queue is full, or the predicted wait exceeds the budget
+        """
+        now = time.monotonic()
+        with self._lock:
+            ahead = self._in_flight
+            wait = self.predicted_wait(ahead)
+            info = {
+                "in_flight": ahead,
+                "predicted_wait_ms": round(wait * 1000, 2),
+                "budget_ms": round((deadline - now) * 1000, 2) if deadline is not None else None,
+            }
+            if deadline is not None and deadline <= now:
+                self._counters["expired"] += 1
+                raise AdmissionRejected("Request deadline passed before inference", EXPIRED, 1,
+                                        dict(info, decision=EXPIRED))
+            retry_after = max(1, math.ceil(wait))
+            if ahead >= self.max_pending:
+                self._counters["rejected_full"] += 1
+                raise AdmissionRejected("Server is busy, please retry shortly", REJECTED, retry_after,
+                                        dict(info, decision=REJECTED, reason="queue_full"))
+            if deadline is not None and now + wait > deadline:
+                self._counters["rejected_deadline"] += 1
+                raise AdmissionRejected("Server cannot answer within the request deadline", REJECTED, retry_after,
+                                        dict(info, decision=REJECTED, reason="deadline"))
+            self._in_flight += 1
+            degrade = heatmap and (ahead + 1 > self.degrade_ratio * self.max_pending
+                                   or not self._heatmap_fits(now + wait, deadline))
+            self._counters["admitted"] += 1
+            if degrade:
+                self._counters["degraded"] += 1
+        info["decision"] = DEGRADED if degrade else ADMITTED
+        return info
+
+    def release(self):
+        """The admitted request has left inference."""
+        with self._lock:
+            self._in_flight -= 1
+
+    def heatmap_fits(self, deadline: Optional[float]) -> bool:
+        """Whether an inline heatmap started now is expected to finish before the deadline."""
+        with self._lock:
+            return self._heatmap_fits(time.monotonic(), deadline)
+
+    def _heatmap_fits(self, start: float, deadline: Optional[float]) -> bool:
+        return deadline is None or start + (self._heatmap_time or 0.0) <= deadline
+
+    def record(self, event: str):
+        """Count a decision taken after admission: 'expired' (deadline passed in the model's queue) or 'degraded'."""
+        with self._lock:
+            self._counters[event] += 1
+
+    def observe_forward(self, seconds: float):
+        """Record the duration of one batch forward."""
+        with self._lock:
+            self._forward_time = self._average(self._forward_time, seconds)
+
+    def observe_heatmap(self, seconds: float):
+        """Record the duration of one inline heatmap."""
+        with self._lock:
+            self._heatmap_time = self._average(self._heatmap_time, seconds)
+
+    def _average(self, current: Optional[float], sample: float) -> float:
+        return sample if current is None else current + self.smoothing * (sample - current)
+
+    def stats(self) -> dict:
+        """Limits, current load, moving averages and decision counters."""
+        with self._lock:
+            return dict(
+                self._counters,
+                in_flight=self._in_flight,
+                max_pending=self.max_pending,
+                degrade_at=math.ceil(self.degrade_ratio * self.max_pending),
+                default_deadline_ms=self.default_deadline_ms or None,
+                forward_time_ms=round(self._forward_time * 1000, 2) if self._forward_time is not None else None,
+                heatmap_time_ms=round(self._heatmap_time * 1000, 2) if self._heatmap_time is not None else None,
+            )
@@ -0,0 +1,239 @@
+"""
+Asynchronous (ASGI) server for the detection API.
+Serves the same /api/detect, /api/health and /api/model-info contracts as the
+Flask app, but uploads are received on an asyncio event loop: a slow client
+trickling its image in only holds a socket and a small parser buffer, not a
+thread. Once the upload is complete, the blocking work (decode, batched
+inference, heatmap render) runs on a bounded thread pool through
+backend_api.process_detection, so both servers share one implementation.
+
+Usage: uvicorn asgi_app:app --host 0.0.0.0 --port 5000
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+import backend_api
+import metrics
+from admission import deadline_from_request
+from fair_queue import ClientLimitError, client_identity
+
+# Threads running process_detection. They mostly wait on the batch scheduler, so a few
+# more than the cores keeps batches full; uploads in progress do not count against them.
+ASYNC_WORKERS = int(os.environ.get('ASYNC_WORKERS', min(32, (os.cpu_count() or 1) + 4)))
+# Uploaded requests allowed to wait for a worker thread before new ones get a 503
+ASYNC_MAX_PENDING = int(os.environ.get('ASYNC_MAX_PENDING', ASYNC_WORKERS * 4))
+# Largest accepted request body (the multipart upload)
+MAX_UPLOAD_BYTES = int(os.environ.get('MAX_UPLOAD_BYTES', 20 * 1024 * 1024))
+
+log = logging.getLogger("asgi_app")
+executor = ThreadPoolExecutor(max_workers=ASYNC_WORKERS, thread_name_prefix="detect")
+# Requests handed to the executor and not finished yet (only touched from the event loop)
+_in_flight = 0
+
+
+def error_body(message, status, retry_after=None):
+    """JSON error in the Flask app's format, as (body, status)."""
+    body = {"success": False, "error": message}
+    if retry_after:
+        body["retry_after"] = retry_after
+    return body, status
+
+
+class BodyTooLargeError(Exception):
+    """Raised while receiving a request body that grows past MAX_UPLOAD_BYTES."""
+
+
+def limited_receive(receive, limit):
+    """ASGI receive that raises BodyTooLargeError once more than limit body bytes arrive (chunked uploads too)."""
+    received = 0
+
+    async def receive_limited():
+        nonlocal received
+        message = await receive()
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > limit:
+                raise BodyTooLargeError
+        return message
+
+    return receive_limited
+
+
+async def wait_until_ready():
+    """Async backend_api.wait_until_ready: polls instead of parking a thread per waiting request."""
+    if backend_api.model_ready.is_set():
+        return True
+    if not backend_api.loading_started.is_set():
+        # Lifespan events disabled: load on a worker thread, once
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, backend_api.wait_until_ready)
+    deadline = time.monotonic() + backend_api.MODEL_READY_TIMEOUT
+    while not backend_api.model_ready.is_set():
+        if time.monotonic() > deadline:
+            return False
+        await asyncio.sleep(0.1)
+    return True
+
+
+async def detect(request):
+    """POST /api/detect: stream the multipart upload, then classify it off the event loop."""
+    received_at = time.monotonic()
+    client = client_identity(request.headers, request.client.host if request.client else None)
+    body, status = await _detect(request, client, received_at)
+    backend_api.finish_detection(body, status, received_at, client)
+    headers = {"Retry-After": str(body["retry_after"])} if "retry_after" in body else None
+    return JSONResponse(body, status_code=status, headers=headers)
+
+
+async def _detect(request, client, received_at):
+    """The /api/detect request, as (body, status) for detect to log and send."""
+    global _in_flight
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES:
+        return error_body(f"Upload exceeds {MAX_UPLOAD_BYTES} bytes", 413)
+    if not await wait_until_ready():
+        return dict(backend_api.MODEL_LOADING_ERROR, retry_after=5), 503
+
+    # Per-client concurrency cap and rate limit; a slow upload holds one of its client's slots
+    try:
+        backend_api.client_gate.acquire(client)
+    except ClientLimitError as e:
+        return error_body(str(e), 429, retry_after=e.retry_after)
+    try:
+        try:
+            # The parser consumes the body chunk by chunk as it arrives; files are spooled to disk past 1MB.
+            # Without a Content-Length (chunked), the body is cut off at the cap while it streams in
+            bounded = Request(request.scope, limited_receive(request.receive, MAX_UPLOAD_BYTES))
+            form = await bounded.form(max_files=1)
+        except BodyTooLargeError:
+            return error_body(f"Upload exceeds {MAX_UPLOAD_BYTES} bytes", 413)
+        except Exception as e:
+            return error_body(f"Malformed multipart body: {e}", 400)
+        try:
+            upload = form.get("image")
+            if upload is None or isinstance(upload, str):
+                return error_body("No image file provided", 400)
+            if not upload.filename:
+                return error_body("No image file selected", 400)
+            if upload.size is not None and upload.size > MAX_UPLOAD_BYTES:
+                return error_body(f"Upload exceeds {MAX_UPLOAD_BYTES} bytes", 413)
+            # Never load more than the cap into memory
+            image_bytes = await upload.read(MAX_UPLOAD_BYTES + 1)
+            if len(image_bytes) > MAX_UPLOAD_BYTES:
+                return error_body(f"Upload exceeds {MAX_UPLOAD_BYTES} bytes", 413)
+            fields = {key: value for key, value in form.items() if isinstance(value, str)}
+        finally:
+            await form.close()
+        try:
+            deadline = deadline_from_request(request.headers, fields, received_at,
+                                             backend_api.admission.default_deadline_ms)
+        except ValueError as e:
+            return error_body(str(e), 400)
+
+        if _in_flight >= ASYNC_MAX_PENDING + ASYNC_WORKERS:
+            return error_body("Server is busy, please retry shortly", 503, retry_after=1)
+        _in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, backend_api.process_detection,
+                                              image_bytes, fields, deadline, client)
+        except Exception as e:
+            log.exception("Error handling /api/detect request")
+            return error_body(str(e), 500)
+        finally:
+            _in_flight -= 1
+    finally:
+        backend_api.client_gate.release(client)
+
+
+async def root(request):
+    """API information."""
+    return JSONResponse({
+        "message": "Deepfake Detection API",
+        "version": "1.0.0",
+        "server": "asgi",
+        "endpoints": {
+            "health": "/api/health",
+            "liveness": "/api/health/live",
+            "readiness": "/api/health/ready",
+            "model_info": "/api/model-info",
+            "detect": "/api/detect (POST)",
+            "visualization": "/api/visualization/<id>",
+            "metrics": "/metrics"
+        },
+        "status": "running"
+    })
+
+
+async def health(request):
+    return JSONResponse(backend_api.health_status())
+
+
+async def liveness(request):
+    return JSONResponse({"status": "alive"})
+
+
+async def readiness(request):
+    body, status = backend_api.readiness_status()
+    return JSONResponse(body, status_code=status)
+
+
+async def model_info(request):
+    return JSONResponse(backend_api.model_info_payload())
+
+
+async def visualization(request):
+    body, status = backend_api.visualization_status(request.path_params["visualization_id"])
+    return JSONResponse(body, status_code=status, headers={"Retry-After": "1"} if status == 202 else None)
+
+
+async def prometheus_metrics(request):
+    return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Start listening right away and load the model in the background, as the Flask server does."""
+    if backend_api.INFERENCE_MODE == "ring" or os.environ.get('MODEL_LOAD_BACKGROUND', '1').lower() in ('0', 'false', 'no'):
+        # The ring's model owner is forked before any serving thread exists
+        backend_api.load_or_exit()
+    elif not backend_api.loading_started.is_set():
+        backend_api.loading_started.set()
+        threading.Thread(target=backend_api.load_or_exit, name="model-loader", daemon=True).start()
+    yield
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+app = Starlette(
+    routes=[
+        Route("/", root),
+        Route("/api/health", health),
+        Route("/api/health/live", liveness),
+        Route("/api/health/ready", readiness),
+        Route("/api/model-info", model_info),
+        Route("/api/detect", detect, methods=["POST"]),
+        Route("/api/visualization/{visualization_id}", visualization),
+        Route("/metrics", prometheus_metrics),
+    ],
+    middleware=[
+        Middleware(CORSMiddleware,
+                   allow_origins=[backend_api.allowed_origins] if isinstance(backend_api.allowed_origins, str)
+                   else backend_api.allowed_origins,
+                   allow_methods=["GET", "POST", "OPTIONS"],
+                   allow_headers=["Content-Type", "X-Deadline-Ms", "X-API-Key"],
+                   expose_headers=["Retry-After"]),
+    ],
+    lifespan=lifespan,
+)
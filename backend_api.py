@@ -1,18 +1,44 @@
 """
 Flask Backend API for Deepfake Detection
 """
-from flask import Flask, request, jsonify
+import time
+_import_start = time.time()
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-from transformers import AutoImageProcessor, SiglipForImageClassification
-from PIL import Image
 import torch
-import io
 import os
-import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from datetime import datetime
-from grad_cam_utils import generate_gradcam_visualization
+from grad_cam_utils import generate_visualization_payload, classify_with_gradcam, normalize_visualization_options, render_max_dim
+from image_ingest import ImageTooLargeError, decode_for_model, decode_image, model_input_size
+from preprocessing import get_preprocessor
+from quantization import build_inference_model, model_size_mb, quantization_from_env
+from onnx_backend import inference_backend_from_env, load_onnx_classifier
+from precision import cast_vision_tower_bf16, precision_from_env, probe_bf16, resolve_precision
+from compiled_engine import build_compiled_model, compile_mode_from_env
+from inference_scheduler import BatchScheduler, DeadlineExceededError, SchedulerFullError
+from admission import DEGRADED, EXPIRED, AdmissionController, AdmissionRejected, deadline_from_request
+from fair_queue import BACKGROUND, ClientGate, ClientLimitError, client_identity, request_lane
+from single_flight import SingleFlight
+from log_pipeline import configure_logging, dropped_records, shutdown_logging
+import metrics
+from result_cache import ResultCache, make_cache_key
+from disk_cache import DiskResultCache
+from visualization_jobs import VisualizationJobs, JobQueueFullError, PENDING, DONE
+from phash_index import HASH_FUNCTIONS, PerceptualHashIndex, is_distinctive
+from url_fetch import UnsafeURLError, open_public_url
+from model_store import MODEL_NAME, load_processor, load_pretrained, parameter_count, resolve_snapshot
+IMPORT_TIME = time.time() - _import_start
 
 app = Flask(__name__)
+# Logs go through a background queue (LOG_LEVEL, LOG_FORMAT); per-step detail is DEBUG
+configure_logging()
+log = logging.getLogger("backend_api")
+# One line per /api/detect request with its outcome and stage timings
+request_log = logging.getLogger("backend_api.request")
 # Enable CORS for frontend and browser extensions
 # In production, restrict origins for security. For development, allow all.
 allowed_origins = os.environ.get('ALLOWED_ORIGINS', '*').split(',') if os.environ.get('ALLOWED_ORIGINS') else '*'
@@ -20,7 +46,8 @@ CORS(app, resources={
     r"/api/*": {
         "origins": allowed_origins,  # Allow configured origins (default: all for browser extensions)
         "methods": ["GET", "POST", "OPTIONS"],
-        "allow_headers": ["Content-Type"]
+        "allow_headers": ["Content-Type", "X-Deadline-Ms", "X-API-Key"],
+        "expose_headers": ["Retry-After"]
     }
 })
 
@@ -28,6 +55,82 @@ CORS(app, resources={
 model = None
 processor = None
 device = None
+scheduler = None
+disk_cache = None
+# Model used for no-grad classification: the PyTorch model, an int8 copy (MODEL_QUANTIZATION)
+# or an ONNX Runtime session (INFERENCE_BACKEND=onnx).
+# Grad-CAM always uses the PyTorch model because it needs gradients.
+inference_model = None
+inference_backend = "torch"
+quantization = "none"
+# Active precision of the model ('fp32' or 'bf16', MODEL_PRECISION) and the startup bf16 probe
+precision = "fp32"
+bf16_probe = None
+# Compiled engine stats (MODEL_COMPILE): mode, buckets, compile time and speedup over eager
+compile_stats = None
+model_parameters = 0
+
+# Readiness: set once the model is loaded and warmed up. Requests arriving earlier
+# wait up to MODEL_READY_TIMEOUT seconds for it, then get a 503.
+model_ready = threading.Event()
+loading_started = threading.Event()
+_load_lock = threading.Lock()
+MODEL_READY_TIMEOUT = float(os.environ.get('MODEL_READY_TIMEOUT', 60))
+# Seconds spent in each startup stage (import, load, move, engine, warmup)
+startup_report = {}
+
+# Content-addressed cache of full detection responses
+result_cache = ResultCache.from_env()
+
+# Identical uploads in flight at the same time are computed once (keyed like the result cache)
+in_flight = SingleFlight()
+# Seconds a duplicate waits for the first request when it has no deadline of its own
+COALESCE_WAIT_TIMEOUT = float(os.environ.get('COALESCE_WAIT_TIMEOUT', 120))
+
+# Perceptual-hash index mapping near-duplicate images to result cache keys (PHASH_INDEX_SIZE=0 disables)
+phash_index = PerceptualHashIndex.from_env() if int(os.environ.get('PHASH_INDEX_SIZE', 100000)) > 0 else None
+perceptual_hash = HASH_FUNCTIONS[os.environ.get('PHASH_ALGORITHM', 'dhash')]
+
+# 'local': every serving process runs the model. 'ring': front-end processes only decode and
+# preprocess, and one model-owner process classifies through a shared-memory ring (INFERENCE_MODE)
+INFERENCE_MODE = os.environ.get('INFERENCE_MODE', 'local').lower()
+RING_HEATMAP_MESSAGE = "Heatmaps need the model in the serving process (not available with INFERENCE_MODE=ring)"
+
+# Default /api/detect mode: 'separate' (batched classification, then Grad-CAM)
+# or 'fused' (one grad-enabled forward yields both). Overridable per request with the 'mode' field.
+DEFAULT_DETECT_MODE = os.environ.get('DETECT_MODE', 'separate').lower()
+
+# Default heatmap delivery for /api/detect: 'deferred' (background job, fetch from
+# /api/visualization/<id>), 'inline' (in the response) or 'none'. Overridable with the 'heatmap' field.
+DEFAULT_HEATMAP_MODE = os.environ.get('HEATMAP_MODE', 'none' if INFERENCE_MODE == 'ring' else 'deferred').lower()
+
+# Background heatmap workers for deferred visualizations
+visualization_jobs = VisualizationJobs.from_env()
+
+# Bounded admission to inference for /api/detect, with per-request deadlines (ADMISSION_*, DETECT_DEADLINE_MS)
+admission = AdmissionController.from_env()
+
+# Per-client concurrency caps and token-bucket rate limits (CLIENT_*); the batch
+# scheduler's queue takes clients in turn and interactive uploads first
+client_gate = ClientGate.from_env()
+UNDER_LOAD_MESSAGE = "Heatmap skipped: server under load"
+
+# Prometheus gauges read at scrape time (histograms and counters are recorded as requests run)
+metrics.registry.gauge("deepfake_model_loaded", "1 once the model is loaded and warmed up.",
+                       lambda: [({}, float(model_ready.is_set()))])
+metrics.registry.gauge("deepfake_log_records_dropped", "Log records the scraped process dropped because the log queue was full.",
+                       lambda: [({}, float(dropped_records()))])
+metrics.registry.gauge("deepfake_queue_depth", "Requests waiting for the model in the scraped process.",
+                       lambda: [({}, float(scheduler.queue_depth()))] if scheduler is not None else [])
+
+# Batch endpoint limits
+BATCH_MAX_ITEMS = int(os.environ.get('BATCH_MAX_ITEMS', 64))
+BATCH_CHUNK_SIZE = int(os.environ.get('BATCH_CHUNK_SIZE', 16))
+URL_FETCH_TIMEOUT = float(os.environ.get('URL_FETCH_TIMEOUT', 10))
+URL_FETCH_MAX_BYTES = int(os.environ.get('URL_FETCH_MAX_BYTES', 20 * 1024 * 1024))
+
+# Thread pool used to decode (and download) batch items concurrently
+decode_pool = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1), thread_name_prefix="decode")
 
 # Label mapping
 id2label = {
@@ -36,64 +139,245 @@ id2label = {
 }
 
 def load_model():
-    """Load the deepfake detection model."""
-    global model, processor, device
+    """Load the deepfake detection model once; concurrent callers wait for the first load."""
+    loading_started.set()
+    with _load_lock:
+        if model_ready.is_set():
+            log.debug("Model already loaded on %s", device)
+            return model, processor, device
+        _load_model()
+        model_ready.set()
+    return model, processor, device
+
+def wait_until_ready(timeout=None):
+    """
+    Block until the model is ready, loading it here if nothing else is.
+    
+    Returns:
+        True when ready, False if it is still loading after timeout seconds (default MODEL_READY_TIMEOUT)
+    """
+    if model_ready.is_set():
+        return True
+    if not loading_started.is_set():
+        # Nobody started loading (e.g. imported by another server): load inline
+        load_model()
+    return model_ready.wait(MODEL_READY_TIMEOUT if timeout is None else timeout)
+
+MODEL_LOADING_ERROR = {"success": False, "error": "Model is still loading, please retry shortly"}
+
+def model_loading_response():
+    """503 returned while the model is still loading."""
+    response = jsonify(MODEL_LOADING_ERROR)
+    response.headers["Retry-After"] = "5"
+    return response, 503
+
+def init_worker(num_threads=None):
+    """
+    Re-create per-process state in a worker forked from a master that loaded the model.
     
-    if model is not None and processor is not None:
-        print(f"[INFO] Model already loaded on {device}")
-        return model, processor, device
+    Threads and SQLite connections do not survive fork(), so the batch scheduler, heatmap
+    workers, decode pool and disk-cache connections are rebuilt; the model weights stay
+    shared copy-on-write with the master.
     
-    print("\n" + "="*70)
-    print("LOADING DEEPFAKE DETECTION MODEL")
-    print("="*70)
+    Args:
+        num_threads: Intra-op threads for this worker's forwards (None keeps torch's default)
+    """
+    global scheduler, visualization_jobs, decode_pool
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    visualization_jobs = VisualizationJobs.from_env()
+    decode_pool = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1), thread_name_prefix="decode")
+    if disk_cache is not None:
+        disk_cache.after_fork()
+    if model_ready.is_set() and INFERENCE_MODE != "ring":
+        scheduler = BatchScheduler.from_env(inference_model, device)
+
+def start_ring_inference():
+    """
+    INFERENCE_MODE=ring: fork the model-owner process and make this process a front-end.
     
-    model_name = "prithivMLmods/deepfake-detector-model-v1"
+    Only the image processor is loaded here; the scheduler and the batch endpoint hand
+    pixel_values to the owner through the shared-memory ring. Run this before forking
+    front-end workers so they inherit the ring.
+    """
+    global processor, device, scheduler, inference_model
+    from model_owner import start_model_owner
+    from shm_ring import RingClient
+    
+    # Not under _load_lock: the owner is forked from here and calls load_model itself
+    loading_started.set()
+    start_time = time.time()
+    processor = load_processor(resolve_snapshot(MODEL_NAME))
+    device = "cpu"
+    width, height = model_input_size(processor)
+    ring, owner, settings = start_model_owner((3, height, width), len(id2label))
+    scheduler = inference_model = RingClient(ring, settings["max_batch_size"], settings["max_wait"])
+    startup_report.clear()
+    startup_report["total"] = round(IMPORT_TIME + time.time() - start_time, 3)
+    model_ready.set()
+    log.info("Model-owner process %d ready; ring of %d slots (%.0fMB)", owner.pid, ring.num_slots, ring.size_mb())
+
+def load_or_exit():
+    """Server startup: load the model (or start the ring's model owner); exit the process on failure."""
+    try:
+        if INFERENCE_MODE == "ring":
+            start_ring_inference()
+        else:
+            load_model()
+    except Exception as e:
+        log.critical("Failed to load model: %s. Check that the model is downloaded (python download_model.py), "
+                     "that the Hub is reachable or MODEL_SNAPSHOT_DIR / MODEL_REVISION point at a cached snapshot, "
+                     "and that transformers is installed", e, exc_info=True)
+        # Exit the whole process, also from the background loader thread (after the queued logs are written)
+        shutdown_logging()
+        os._exit(1)
+
+def _load_model():
+    """Load, optimize and warm up the model (use load_model, which serializes callers)."""
+    global model, processor, device, scheduler, disk_cache, inference_model, inference_backend, quantization, precision, bf16_probe, compile_stats, model_parameters
+    
+    load_start = time.time()
+    startup_report.clear()
+    startup_report["import"] = round(IMPORT_TIME, 3)
+    
+    model_name = MODEL_NAME
+    log.info("Loading model %s", model_name)
     
     # Show device info
     device = "cuda" if torch.cuda.is_available() else "cpu"
-    print(f"\n[1] Device Check:")
-    print(f"    CUDA Available: {torch.cuda.is_available()}")
     if torch.cuda.is_available():
-        print(f"    GPU: {torch.cuda.get_device_name(0)}")
-        print(f"    CUDA Version: {torch.version.cuda}")
+        log.info("Device: CUDA (%s, CUDA %s)", torch.cuda.get_device_name(0), torch.version.cuda)
     else:
-        print("    Using CPU")
-    print(f"    Selected Device: {device.upper()}")
+        log.info("Device: CPU")
     
-    # Load model
-    print(f"\n[2] Loading Model from Hugging Face...")
-    print(f"    Model: {model_name}")
-    print("    This may take 10-30 seconds...")
+    # Load model from the pinned local snapshot (memory-mapped safetensors, no Hub round trip)
     start_time = time.time()
     
     try:
-        model = SiglipForImageClassification.from_pretrained(model_name)
-        processor = AutoImageProcessor.from_pretrained(model_name)
+        snapshot_dir = resolve_snapshot(model_name)
+        log.debug("Snapshot: %s", snapshot_dir)
+        model, processor = load_pretrained(snapshot_dir)
         load_time = time.time() - start_time
-        print(f"    ✓ Model loaded in {load_time:.2f} seconds")
-        print(f"    Model Type: {type(model).__name__}")
-        print(f"    Parameters: {sum(p.numel() for p in model.parameters()):,}")
+        startup_report["load"] = round(load_time, 3)
+        model_parameters = parameter_count(model)
+        log.info("Model loaded in %.2fs (%s, %s parameters)", load_time, type(model).__name__, f"{model_parameters:,}")
     except Exception as e:
-        print(f"    ✗ ERROR loading model: {e}")
+        log.error("Could not load model: %s", e)
         raise
     
     # Set to evaluation mode
-    print(f"\n[3] Setting Model to Evaluation Mode...")
     model.eval()
-    print("    ✓ Model set to evaluation mode")
     
     # Move to GPU if available
-    print(f"\n[4] Moving Model to {device.upper()}...")
     start_time = time.time()
     model = model.to(device)
     move_time = time.time() - start_time
-    print(f"    ✓ Model moved to {device.upper()} in {move_time:.2f} seconds")
+    startup_report["move"] = round(move_time, 3)
+    log.info("Model moved to %s in %.2fs", device.upper(), move_time)
+    engine_start = time.time()
+    
+    # Classification engine: the PyTorch model, an int8 copy or an ONNX Runtime session
+    inference_backend = inference_backend_from_env()
+    quantization = quantization_from_env()
+    inference_model = model
+    if inference_backend == "onnx":
+        if quantization != "none":
+            log.warning("MODEL_QUANTIZATION=%s is ignored with INFERENCE_BACKEND=onnx", quantization)
+            quantization = "none"
+        start_time = time.time()
+        inference_model = load_onnx_classifier(model, processor, device)
+        log.info("Inference engine: ONNX Runtime session (%s, %.0fMB) in %.2fs; Grad-CAM uses PyTorch",
+                 ", ".join(inference_model.providers), inference_model.size_mb(), time.time() - start_time)
+    elif quantization != "none" and device != "cpu":
+        log.warning("int8 kernels are CPU-only; ignoring MODEL_QUANTIZATION=%s on %s", quantization, device.upper())
+        quantization = "none"
+    if quantization != "none":
+        start_time = time.time()
+        inference_model, quantization = build_inference_model(
+            model, get_preprocessor(processor), quantization, os.environ.get('QUANTIZATION_CALIBRATION_DIR')
+        )
+        log.info("Inference engine: %s int8 vision encoder in %.2fs (%.0fMB fp32 -> %.0fMB); Grad-CAM uses fp32",
+                 quantization, time.time() - start_time, model_size_mb(model), model_size_mb(inference_model))
+    elif inference_backend != "onnx":
+        log.info("Inference engine: PyTorch fp32 (set MODEL_QUANTIZATION=dynamic or static for int8 on CPU, "
+                 "or INFERENCE_BACKEND=onnx for ONNX Runtime)")
     
-    print("\n" + "="*70)
-    print("MODEL LOADED SUCCESSFULLY!")
-    print("="*70 + "\n")
+    # Optional bfloat16 vision tower (MODEL_PRECISION=bf16, or auto to use it when the host has fast kernels)
+    requested_precision = precision_from_env()
+    precision = "fp32"
+    if requested_precision != "fp32" and inference_model is not model:
+        log.warning("MODEL_PRECISION=%s is ignored with int8 quantization or ONNX; using fp32", requested_precision)
+    elif requested_precision != "fp32":
+        bf16_probe = probe_bf16(device)
+        log.info("bf16 kernels: %s (CPU flags: %s, matmul speedup: %sx)",
+                 "supported" if bf16_probe["supported"] else "unsupported",
+                 ", ".join(bf16_probe["flags"]) or "none", bf16_probe["speedup"])
+        precision = resolve_precision(requested_precision, bf16_probe)
+    if precision == "bf16":
+        size_before = model_size_mb(model)
+        cast_vision_tower_bf16(model)
+        log.info("Precision: bf16 vision tower (%.0fMB -> %.0fMB); LayerNorm, classifier head and softmax stay fp32",
+                 size_before, model_size_mb(model))
+    elif bf16_probe is not None:
+        log.info("Precision: fp32 (bf16 kernels are not fast on this host)")
+    else:
+        log.debug("Precision: fp32 (set MODEL_PRECISION=bf16 or auto for a bfloat16 vision tower)")
     
-    return model, processor, device
+    # Optional compiled engine for no-grad classification (MODEL_COMPILE=inductor or torchscript)
+    compile_mode = compile_mode_from_env()
+    compile_stats = None
+    if compile_mode != "none" and inference_backend != "torch":
+        log.warning("MODEL_COMPILE=%s is ignored with INFERENCE_BACKEND=%s", compile_mode, inference_backend)
+    elif compile_mode != "none":
+        width, height = model_input_size(processor)
+        try:
+            inference_model = build_compiled_model(inference_model, (3, height, width), device, compile_mode)
+            compile_stats = inference_model.stats
+            log.info("Compiled %s engine, buckets %s, in %.2fs; batch %d: %.2fms eager -> %.2fms compiled (%.2fx)",
+                     compile_stats["mode"], compile_stats["buckets"], compile_stats["compile_time_s"],
+                     compile_stats["buckets"][0], compile_stats["eager_ms"], compile_stats["compiled_ms"],
+                     compile_stats["speedup"])
+        except Exception as e:
+            log.warning("%s; using eager mode", e)
+    else:
+        log.debug("Eager mode (set MODEL_COMPILE=inductor or torchscript for a compiled engine)")
+    startup_report["engine"] = round(time.time() - engine_start, 3)
+    
+    # One forward so the first request does not pay for lazy kernel and allocator setup
+    start_time = time.time()
+    width, height = model_input_size(processor)
+    with torch.no_grad():
+        inference_model(pixel_values=torch.zeros(1, 3, height, width, device=device))
+    startup_report["warmup"] = round(time.time() - start_time, 3)
+    log.debug("Warmup forward in %.2fs", startup_report["warmup"])
+    
+    # Start micro-batching scheduler
+    scheduler = BatchScheduler.from_env(inference_model, device)
+    log.info("Batch scheduler: max batch size %d, max wait %.1fms, queue size %d",
+             scheduler.max_batch_size, scheduler.max_wait * 1000, scheduler.max_queue_size)
+    
+    # Open the persistent result cache shared by all workers
+    # Quantized, bf16 and ONNX results differ slightly from PyTorch fp32, so they are cached separately
+    model_version = f"{model_name}@{getattr(model.config, '_commit_hash', None) or 'local'}"
+    if quantization != "none":
+        model_version += f"+int8-{quantization}"
+    if precision != "fp32":
+        model_version += f"+{precision}"
+    if inference_backend != "torch":
+        model_version += f"+{inference_backend}"
+    try:
+        disk_cache = DiskResultCache.from_env(model_version)
+        if disk_cache is not None:
+            log.info("Disk result cache: %s (%d entries, version %s)",
+                     disk_cache.db_path, disk_cache.stats()["entries"], model_version)
+        else:
+            log.info("Disk result cache disabled (DISK_CACHE_DIR is empty)")
+    except Exception as e:
+        log.warning("Disk cache unavailable: %s", e)
+        disk_cache = None
+    
+    startup_report["total"] = round(IMPORT_TIME + time.time() - load_start, 3)
+    log.info("Model ready", extra={"startup": dict(startup_report)})
 
 @app.route('/', methods=['GET'])
 def root():
@@ -103,8 +387,16 @@ def root():
         "version": "1.0.0",
         "endpoints": {
             "health": "/api/health",
+            "liveness": "/api/health/live",
+            "readiness": "/api/health/ready",
             "model_info": "/api/model-info",
-            "detect": "/api/detect (POST)"
+            "detect": "/api/detect (POST)",
+            "detect_batch": "/api/detect/batch (POST)",
+            "cache_stats": "/api/cache/stats",
+            "admission_stats": "/api/admission/stats",
+            "clients_stats": "/api/clients/stats",
+            "visualization": "/api/visualization/<id>",
+            "metrics": "/metrics"
         },
         "status": "running"
     })
@@ -112,27 +404,114 @@ def root():
 @app.route('/api/health', methods=['GET'])
 def health():
     """Health check endpoint."""
-    return jsonify({
+    return jsonify(health_status())
+
+def health_status():
+    """Body of /api/health (shared with the ASGI server)."""
+    return {
         "status": "healthy",
-        "model_loaded": model is not None,
+        "model_loaded": model_ready.is_set(),
         "device": device,
         "cuda_available": torch.cuda.is_available()
-    })
+    }
+
+@app.route('/api/health/live', methods=['GET'])
+def liveness():
+    """Liveness probe: the process is up and serving HTTP, even while the model loads."""
+    return jsonify({"status": "alive"})
+
+@app.route('/api/health/ready', methods=['GET'])
+def readiness():
+    """Readiness probe: 200 once the model is loaded and warmed up, 503 before."""
+    body, status = readiness_status()
+    return jsonify(body), status
+
+def readiness_status():
+    """Body and status of /api/health/ready (shared with the ASGI server)."""
+    if not model_ready.is_set():
+        return {"status": "loading", "ready": False}, 503
+    return {"status": "ready", "ready": True, "startup": startup_report}, 200
 
 @app.route('/api/model-info', methods=['GET'])
 def model_info():
     """Get model information."""
+    return jsonify(model_info_payload())
+
+def model_info_payload():
+    """Body of /api/model-info (shared with the ASGI server)."""
     model_name = "prithivMLmods/deepfake-detector-model-v1"
-    return jsonify({
+    return {
         "model_name": model_name,
         "model_type": "SiglipForImageClassification",
         "model_source": "Hugging Face Hub",
         "repository": model_name,
         "device": device,
         "cuda_available": torch.cuda.is_available(),
-        "parameters": sum(p.numel() for p in model.parameters()) if model else 0,
+        "parameters": model_parameters,
+        "inference_mode": INFERENCE_MODE,
+        "inference_backend": inference_backend,
+        "quantization": quantization,
+        "precision": precision,
+        "bf16_support": bf16_probe,
+        "compile": compile_stats,
+        "startup": startup_report,
         "labels": ["fake", "real"]
-    })
+    }
+
+@app.route('/api/visualization/<visualization_id>', methods=['GET'])
+def get_visualization(visualization_id):
+    """Fetch a deferred heatmap: 202 while pending, 200 when done, 404 if unknown or expired."""
+    body, status = visualization_status(visualization_id)
+    response = jsonify(body)
+    if status == 202:
+        response.headers["Retry-After"] = "1"
+    return response, status
+
+def visualization_status(visualization_id):
+    """Body and status of /api/visualization/<id> (shared with the ASGI server)."""
+    job = visualization_jobs.get(visualization_id)
+    if job is None:
+        return {
+            "success": False,
+            "error": "Unknown or expired visualization id"
+        }, 404
+    if job["status"] == PENDING:
+        return {"success": True, "status": PENDING, "visualization_id": visualization_id}, 202
+    if job["status"] == DONE:
+        return {"success": True, "status": DONE, "visualization_id": visualization_id,
+                "visualization": job["visualization"]}, 200
+    return {
+        "success": False,
+        "status": job["status"],
+        "visualization_id": visualization_id,
+        "error": job["error"] or "Heatmap generation failed"
+    }, 500
+
+@app.route('/api/admission/stats', methods=['GET'])
+def admission_stats():
+    """Admission limits, current load, forward/heatmap time averages and decision counters."""
+    return jsonify(admission.stats())
+
+@app.route('/api/clients/stats', methods=['GET'])
+def clients_stats():
+    """Per-client limits and counters, and the requests each client has waiting for the model."""
+    stats = client_gate.stats()
+    stats["queued"] = scheduler.queue_depths() if hasattr(scheduler, "queue_depths") else None
+    return jsonify(stats)
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """Result cache and perceptual-hash index size and hit/miss/eviction counters."""
+    stats = result_cache.stats()
+    stats["perceptual_index"] = phash_index.stats() if phash_index is not None else None
+    stats["disk"] = disk_cache.stats() if disk_cache is not None else None
+    stats["coalescing"] = in_flight.stats()
+    return jsonify(stats)
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus scrape endpoint: stage latencies, outcome counters and gauges of all workers."""
+    return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
 
 @app.route('/api/detect', methods=['POST', 'OPTIONS'])
 def detect_deepfake():
@@ -141,169 +520,733 @@ def detect_deepfake():
     if request.method == 'OPTIONS':
         return jsonify({}), 200
     
-    print("\n" + "="*70)
-    print("NEW PREDICTION REQUEST RECEIVED")
-    print("="*70)
-    print(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    
+    received_at = time.monotonic()
+    client = client_identity(request.headers, request.remote_addr)
+    body, status = _detect_upload(client, received_at)
+    finish_detection(body, status, received_at, client)
+    response = jsonify(body)
+    if "retry_after" in body:
+        response.headers["Retry-After"] = str(body["retry_after"])
+    return response, status
+
+def _detect_upload(client, received_at):
+    """The /api/detect request: wait for the model, apply the client's limits, read the upload and classify it."""
     try:
-        # Ensure model is loaded
-        if model is None or processor is None:
-            print("\n[WARNING] Model not loaded! Loading now...")
-            load_model()
-        else:
-            print(f"\n[INFO] Model Status: ✓ Loaded and Ready")
-            print(f"[INFO] Model Device: {device.upper()}")
-            print(f"[INFO] Model Type: {type(model).__name__}")
+        # Wait for the model (loaded in the background at startup)
+        if not wait_until_ready():
+            log.warning("Model still loading")
+            return dict(MODEL_LOADING_ERROR, retry_after=5), 503
         
-        # Check if image file is in request
-        if 'image' not in request.files:
-            print("[ERROR] No image file in request")
-            return jsonify({"success": False, "error": "No image file provided"}), 400
-        
-        file = request.files['image']
-        
-        if file.filename == '':
-            print("[ERROR] Empty filename")
-            return jsonify({"success": False, "error": "No image file selected"}), 400
-        
-        print(f"[INFO] Processing image: {file.filename}")
-        
-        # Read image
-        image_bytes = file.read()
-        image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-        print(f"[INFO] Image loaded: {image.size[0]}x{image.size[1]} pixels")
-        
-        # Record timings
-        start_time = time.time()
-        
-        # Preprocess image
-        print("\n[STEP 1] Preprocessing image...")
-        prep_start = time.time()
-        inputs = processor(images=image, return_tensors="pt")
-        inputs = {k: v.to(device) for k, v in inputs.items()}
-        prep_time = time.time() - prep_start
-        print(f"        ✓ Preprocessed in {prep_time*1000:.2f}ms")
-        print(f"        Input shape: {inputs['pixel_values'].shape}")
-        print(f"        Input device: {inputs['pixel_values'].device}")
-        
-        # Run inference
-        print(f"\n[STEP 2] Running model inference on {device.upper()}...")
-        infer_start = time.time()
-        with torch.no_grad():
-            outputs = model(**inputs)
-            logits = outputs.logits
-            probs = torch.nn.functional.softmax(logits, dim=1).squeeze()
-        infer_time = time.time() - infer_start
-        print(f"        ✓ Inference completed in {infer_time*1000:.2f}ms")
+        # Per-client concurrency cap and rate limit, before the upload is parsed
+        try:
+            client_gate.acquire(client)
+        except ClientLimitError as e:
+            log.warning("%s: %s", client, e)
+            return {"success": False, "error": str(e), "retry_after": e.retry_after}, 429
+        try:
+            # Check if image file is in request
+            if 'image' not in request.files:
+                return {"success": False, "error": "No image file provided"}, 400
+            
+            file = request.files['image']
+            
+            if file.filename == '':
+                return {"success": False, "error": "No image file selected"}, 400
+            
+            log.debug("Processing image: %s", file.filename)
+            
+            try:
+                deadline = deadline_from_request(request.headers, request.form, received_at, admission.default_deadline_ms)
+            except ValueError as e:
+                return {"success": False, "error": str(e)}, 400
+            
+            # Read image
+            image_bytes = file.read()
+            
+            return process_detection(image_bytes, request.form, deadline, client)
+        finally:
+            client_gate.release(client)
         
-        # Get probabilities
-        probs_list = probs.cpu().tolist()
-        fake_prob = probs_list[0]
-        real_prob = probs_list[1]
+    except Exception as e:
+        log.exception("Error handling /api/detect request")
+        return {"success": False, "error": str(e)}, 500
+
+def finish_detection(body, status, received_at, client):
+    """
+    Count a finished /api/detect request and log its one summary line (shared with the ASGI server).
+    
+    The line carries the outcome and the stage timings in ms; errors rejected before
+    the upload was processed only have the status, error and total time.
+    """
+    metrics.count_error(status)
+    fields = {"status": status, "client": client, "total_ms": round((time.monotonic() - received_at) * 1000, 2)}
+    if status == 200:
+        analysis = body.get("analysis", {})
+        visualization = body.get("visualization", {})
+        encoding = visualization.get("encoding", {})
+        fields.update(
+            prediction=body["prediction"].lower(),
+            confidence=body["confidence"],
+            cache=body.get("cache"),
+            mode=analysis.get("mode"),
+            lane=analysis.get("lane"),
+            decision=body.get("admission", {}).get("decision"),
+            batch_size=analysis.get("batch_size"),
+            queue_depth=analysis.get("queue_depth"),
+            decode_ms=analysis.get("decode_time"),
+            preprocess_ms=analysis.get("preprocessing_time"),
+            inference_ms=analysis.get("inference_time"),
+            heatmap_ms=visualization.get("visualization_time"),
+            render_ms=encoding.get("render_time"),
+            encode_ms=encoding.get("encode_time"),
+        )
+    else:
+        fields["error"] = body.get("error")
+    request_log.log(logging.WARNING if status >= 500 else logging.INFO, "detect",
+                    extra={key: value for key, value in fields.items() if value is not None})
+
+def detect_uncached(image_bytes, form, deadline, client, viz_options, cache_key, cache_options, lookup_start):
+    """
+    The /api/detect work behind a result-cache miss: decode, near-duplicate lookup,
+    admission, classification and heatmap. Run once per set of identical in-flight requests.
+    
+    Returns:
+        Tuple of (response dict, HTTP status)
+    """
+    # Decode near the model input size; heatmaps decode their own capped copy
+    decode_start = time.time()
+    try:
+        image, original_size = decode_for_model(image_bytes, processor)
+    except ImageTooLargeError as e:
+        log.warning("%s", e)
+        return {"success": False, "error": str(e)}, 413
+    decode_time = time.time() - decode_start
+    metrics.observe_stage("decode", decode_time)
+    log.debug("Image loaded: %dx%d pixels (decoded at %dx%d in %.2fms)",
+              original_size[0], original_size[1], image.size[0], image.size[1], decode_time * 1000)
+    
+    # Re-encoded or resized copies of a known image reuse its cached result
+    image_hash = perceptual_hash(image) if phash_index is not None else None
+    if image_hash is not None and not is_distinctive(image_hash):
+        # Flat images all hash alike; never match them perceptually
+        image_hash = None
+    if image_hash is not None:
+        match = phash_index.find(image_hash)
+        if match is not None:
+            matched_hash, (matched_key, matched_options), distance = match
+            cached = None
+            if matched_options == cache_options:
+                cached = result_cache.get(matched_key, record=False)
+                if cached is None and disk_cache is not None:
+                    cached = disk_cache.get(matched_key)
+            if cached is not None:
+                log.debug("Near-duplicate cache hit (hash distance %d): %s", distance, cached["prediction"])
+                result = build_cached_result(cached, lookup_start)
+                result["analysis"]["image_size"] = original_size
+                result["analysis"]["cache_match"] = "perceptual"
+                result["analysis"]["hash_distance"] = distance
+                if cache_options["heatmap"]:
+                    # Only the classification carries over: the matched heatmap (and echoed
+                    # original) show the other upload, so explain this image in the background
+                    result["visualization"] = queue_visualization(
+                        image, result["prediction"].lower(), viz_options, image_bytes)
+                return result, 200
+            if matched_options == cache_options:
+                # The result was evicted; forget the stale hash
+                phash_index.remove(matched_hash)
+    
+    # Record timings
+    start_time = time.time()
+    
+    mode = form.get('mode', DEFAULT_DETECT_MODE).lower()
+    heatmap_mode = form.get('heatmap', DEFAULT_HEATMAP_MODE).lower()
+    # Single uploads are interactive unless marked priority=background (e.g. page scans)
+    lane = request_lane(form.get('priority'))
+    if model is None:
+        # Ring front-end: classification only
+        mode = 'separate'
+        heatmap_mode = 'none'
+    # Shed the request before the model if it cannot finish in time; under load,
+    # drop the heatmap rather than the classification
+    wants_heatmap = mode == 'fused' or heatmap_mode not in ('deferred', 'none')
+    try:
+        admission_info = admission.admit(deadline, heatmap=wants_heatmap)
+    except AdmissionRejected as e:
+        log.warning("%s (in flight %s, predicted wait %sms)", e, e.info["in_flight"], e.info["predicted_wait_ms"])
+        return {"success": False, "error": str(e), "retry_after": e.retry_after, "admission": e.info}, 503
+    if admission_info["decision"] == DEGRADED:
+        log.debug(UNDER_LOAD_MESSAGE)
+        mode = 'separate'
+        heatmap_mode = 'degraded'
+    try:
+        fused_visualization = None
+        if mode == 'fused':
+            # One preprocessing pass and one grad-enabled forward for both outputs
+            timings = {}
+            try:
+                probs_list, payload = classify_with_gradcam(
+                    model, processor, device, image, timings=timings, options=viz_options,
+                    render_image=decode_render_image(image_bytes, viz_options)
+                )
+                prep_time = timings["preprocess"]
+                infer_time = timings["forward_backward"]
+                batch_result = {"batch_size": 1, "queue_depth": 0}
+                fused_visualization = dict(payload,
+                                           available=True,
+                                           visualization_time=round(timings["render"] * 1000, 2))  # ms
+                # The one grad-enabled pass classifies and explains; it is counted as Grad-CAM
+                metrics.observe_stage("preprocess", prep_time)
+                metrics.observe_stage("gradcam", infer_time)
+                observe_encoding(payload)
+                log.debug("Fused pass completed in %.2fms", (time.time() - start_time) * 1000)
+            except Exception as e:
+                log.warning("Fused mode failed (%s), falling back to separate mode", e)
+                mode = 'separate'
+    
+        if mode != 'fused':
+            # Preprocess image
+            prep_start = time.time()
+            pixel_values = get_preprocessor(processor)(image, device)
+            prep_time = time.time() - prep_start
+            metrics.observe_stage("preprocess", prep_time)
+            log.debug("Preprocessed in %.2fms: %s on %s", prep_time * 1000, tuple(pixel_values.shape), pixel_values.device)
         
-        # Determine prediction
-        predicted_class = "fake" if fake_prob > real_prob else "real"
-        confidence = max(fake_prob, real_prob)
+            # Run inference (batched with concurrent requests by the scheduler)
+            infer_start = time.time()
+            try:
+                batch_result = scheduler.predict(pixel_values, deadline=deadline, client=client, lane=lane)
+            except SchedulerFullError as e:
+                log.warning("%s", e)
+                return {"success": False, "error": "Server is busy, please retry shortly", "retry_after": 1}, 503
+            except DeadlineExceededError as e:
+                log.debug("%s", e)
+                admission.record(EXPIRED)
+                return {"success": False, "error": str(e), "retry_after": 1,
+                        "admission": dict(admission_info, decision=EXPIRED)}, 503
+            infer_time = time.time() - infer_start
+            metrics.observe_stage("inference", infer_time)
+            metrics.QUEUE_DEPTH_AT_SUBMIT.observe(batch_result["queue_depth"])
+            # The ring front-end cannot see the owner's forward time; its round trip is the upper bound
+            admission.observe_forward(batch_result.get("forward_time", infer_time))
+            log.debug("Inference completed in %.2fms (batch size %d, queue depth %d), logits %s", infer_time * 1000,
+                      batch_result["batch_size"], batch_result["queue_depth"], batch_result["logits"])
+            probs_list = batch_result["probs"].tolist()
+    finally:
+        admission.release()
+    
+    # Get probabilities
+    fake_prob = probs_list[0]
+    real_prob = probs_list[1]
+    
+    # Determine prediction
+    predicted_class = "fake" if fake_prob > real_prob else "real"
+    
+    total_time = time.time() - start_time
+    
+    log.debug("Predicted %s (fake %.2f%%, real %.2f%%) in %.2fms",
+              predicted_class.upper(), fake_prob * 100, real_prob * 100, total_time * 1000)
+    
+    # Prepare response
+    result = build_detection_result(fake_prob, real_prob, {
+        "image_size": original_size,
+        "decode_time": round(decode_time * 1000, 2),  # ms
+        "inference_time": round(infer_time * 1000, 2),  # ms
+        "preprocessing_time": round(prep_time * 1000, 2),  # ms
+        "total_time": round(total_time * 1000, 2),  # ms
+        "batch_size": batch_result["batch_size"],
+        "queue_depth": batch_result["queue_depth"],
+        "mode": mode,
+        "lane": lane,
+        "timestamp": datetime.now().isoformat()
+    })
+    
+    result["cache"] = "miss"
+    result["admission"] = admission_info
+    
+    # Generate Grad-CAM visualization (already done in fused mode)
+    if fused_visualization is not None:
+        result["visualization"] = fused_visualization
+    elif heatmap_mode == 'deferred':
+        # Return now; the heatmap is computed in the background and fetched by id
+        def cache_completed(visualization):
+            completed = dict(result, visualization=visualization)
+            completed.pop("visualization_id", None)
+            store_result(cache_key, image_hash, completed, cache_options)
         
-        total_time = time.time() - start_time
+        result["visualization"] = queue_visualization(image, predicted_class, viz_options, image_bytes,
+                                                      on_done=cache_completed)
+        if "visualization_id" in result["visualization"]:
+            result["visualization_id"] = result["visualization"]["visualization_id"]
+    elif heatmap_mode == 'none':
+        result["visualization"] = {
+            "available": False,
+            "message": "Heatmap not requested" if model is not None else RING_HEATMAP_MESSAGE
+        }
+    elif heatmap_mode == 'degraded' or not admission.heatmap_fits(deadline):
+        if heatmap_mode != 'degraded':
+            # Classification used up the budget the heatmap needed
+            admission.record(DEGRADED)
+            admission_info["decision"] = DEGRADED
+        result["visualization"] = {
+            "available": False,
+            "message": UNDER_LOAD_MESSAGE
+        }
+    else:
+        result["visualization"] = build_visualization(image, predicted_class, viz_options, image_bytes)
+        if result["visualization"]["available"]:
+            admission.observe_heatmap(result["visualization"]["visualization_time"] / 1000)
+            log.debug("Forensic heatmap generated in %.2fms", result["visualization"]["visualization_time"])
+    
+    # Only cache complete responses so a transient heatmap failure is not replayed;
+    # without a heatmap requested, the classification is the complete response
+    if result["visualization"]["available"] or not cache_options["heatmap"]:
+        store_result(cache_key, image_hash, result, cache_options)
+    
+    return result, 200
+
+def client_limited_response(error):
+    """429 returned when a client is over its concurrency cap or rate limit."""
+    response = jsonify({"success": False, "error": str(error), "retry_after": error.retry_after})
+    response.headers["Retry-After"] = str(error.retry_after)
+    return response, 429
+
+def process_detection(image_bytes, form, deadline=None, client=""):
+    """
+    Classify an uploaded image and attach its heatmap (shared by the Flask and ASGI servers).
+    
+    Blocking: decodes, waits for the batch scheduler and may render a heatmap.
+    
+    Args:
+        image_bytes: The uploaded file's contents
+        form: Mapping with the optional request fields (mode, heatmap, heatmap_format, ...)
+        deadline: time.monotonic() by which the response is due (see admission.deadline_from_request)
+        client: Client id (fair_queue.client_identity) the batch scheduler shares the model by
+    
+    Returns:
+        Tuple of (response dict, HTTP status); shed requests carry 'retry_after' (seconds)
+    """
+    start = time.perf_counter()
+    body, status = _process_detection(image_bytes, form, deadline, client)
+    metrics.record_detection(body, status, time.perf_counter() - start)
+    return body, status
+
+def _process_detection(image_bytes, form, deadline, client):
+    try:
+        # Heatmap transport options (format, size cap, quality, echo of the original)
+        try:
+            viz_options = normalize_visualization_options({
+                "format": form.get('heatmap_format'),
+                "max_dim": form.get('heatmap_max_dim'),
+                "quality": form.get('heatmap_quality'),
+                "include_original": form.get('include_original'),
+                "cam_dtype": form.get('cam_dtype'),
+            })
+        except ValueError as e:
+            return {"success": False, "error": str(e)}, 400
         
-        print("\n[STEP 3] Results:")
-        print(f"        Raw Logits: {logits.cpu().tolist()}")
-        print(f"        Fake Probability: {fake_prob*100:.2f}%")
-        print(f"        Real Probability: {real_prob*100:.2f}%")
-        print(f"        Predicted: {predicted_class.upper()}")
-        print(f"        Confidence: {confidence*100:.2f}%")
-        print(f"        Total Time: {total_time*1000:.2f}ms")
+        # Serve repeated uploads straight from the result cache. Requests without a heatmap
+        # (heatmap=none, or any ring front-end) share one classification-only entry per image
+        lookup_start = time.time()
+        mode = form.get('mode', DEFAULT_DETECT_MODE).lower()
+        heatmap_mode = form.get('heatmap', DEFAULT_HEATMAP_MODE).lower()
+        with_heatmap = model is not None and (mode == 'fused' or heatmap_mode != 'none')
+        cache_options = {"heatmap": with_heatmap, "visualization": viz_options if with_heatmap else None}
+        cache_key = make_cache_key(image_bytes, MODEL_NAME, cache_options)
+        cached = result_cache.get(cache_key)
+        if cached is None and disk_cache is not None:
+            cached = disk_cache.get(cache_key)
+            if cached is not None:
+                result_cache.put(cache_key, cached)
+        if cached is not None:
+            log.debug("Cache hit: %s (%s%% confidence)", cached["prediction"], cached["confidence"])
+            return build_cached_result(cached, lookup_start), 200
         
-        # Generate Grad-CAM visualization (only for fake predictions or if requested)
-        print("\n[STEP 4] Generating forensic Grad-CAM heatmap visualization...")
-        viz_start = time.time()
+        # Identical uploads already being processed share that computation
+        flight_key = (cache_key, mode, heatmap_mode)
         try:
-            # For fake predictions, show what regions are suspicious
-            # For real predictions, we can still show attention but it's less critical
-            target_class_idx = 0 if predicted_class == "fake" else 1
-            is_fake = (predicted_class == "fake")
-            original_base64, heatmap_overlay_base64 = generate_gradcam_visualization(
-                model, processor, device, image, target_class=target_class_idx, is_fake=is_fake
+            (result, status), coalesced = in_flight.do(
+                flight_key,
+                lambda: detect_uncached(image_bytes, form, deadline, client, viz_options, cache_key, cache_options,
+                                        lookup_start),
+                # A request shed for its own deadline or load is not an answer for the others
+                shareable=lambda outcome: "retry_after" not in outcome[0],
+                timeout=max(0.0, deadline - time.monotonic()) if deadline is not None else COALESCE_WAIT_TIMEOUT
             )
-            viz_time = time.time() - viz_start
-            print(f"        ✓ Forensic heatmap generated in {viz_time*1000:.2f}ms")
-            if is_fake:
-                print(f"        Heatmap uses RED and YELLOW patches for detected fake regions")
-            else:
-                print(f"        Heatmap uses GREEN only for authentic regions")
-            visualization_available = True
-        except Exception as e:
-            print(f"        ⚠ Heatmap generation failed: {e}")
-            import traceback
-            traceback.print_exc()
-            print("        Continuing without visualization...")
-            original_base64 = None
-            heatmap_overlay_base64 = None
-            visualization_available = False
-            viz_time = 0
-        
-        # Prepare response
-        result = {
-            "success": True,
-            "prediction": predicted_class.upper(),
-            "confidence": round(confidence * 100, 2),
-            "probabilities": {
-                "fake": round(fake_prob * 100, 2),
-                "real": round(real_prob * 100, 2)
-            },
-            "model_info": {
-                "model_name": "prithivMLmods/deepfake-detector-model-v1",
-                "model_type": "SiglipForImageClassification",
-                "device": device,
-                "framework": "PyTorch"
-            },
-            "analysis": {
-                "image_size": image.size,
-                "inference_time": round(infer_time * 1000, 2),  # ms
-                "preprocessing_time": round(prep_time * 1000, 2),  # ms
-                "total_time": round(total_time * 1000, 2),  # ms
-                "timestamp": datetime.now().isoformat()
-            },
-            "interpretation": get_interpretation(predicted_class, confidence)
-        }
-        
-        # Add visualization if available
-        if visualization_available:
-            result["visualization"] = {
-                "available": True,
-                "original_image": f"data:image/png;base64,{original_base64}",
-                "heatmap_overlay": f"data:image/png;base64,{heatmap_overlay_base64}",
-                "visualization_time": round(viz_time * 1000, 2)  # ms
-            }
-        else:
-            result["visualization"] = {
-                "available": False,
-                "message": "Heatmap visualization not available"
-            }
+        except FutureTimeoutError:
+            return {"success": False, "error": "Timed out waiting for an identical request in progress",
+                    "retry_after": 1}, 503
+        if coalesced and status == 200:
+            log.debug("Coalesced with an identical request in progress: %s", result["prediction"])
+            result = dict(result, cache="coalesced")
+            # The admission decision belongs to the request that ran the model
+            result.pop("admission", None)
+        return result, status
         
-        print("\n" + "="*70)
-        print(f"✓ PREDICTION COMPLETE: {predicted_class.upper()} ({confidence*100:.2f}% confidence)")
-        print("="*70 + "\n")
+    except Exception as e:
+        log.exception("Error processing image")
+        return {
+            "success": False,
+            "error": str(e)
+        }, 500
+
+@app.route('/api/detect/batch', methods=['POST', 'OPTIONS'])
+def detect_deepfake_batch():
+    """Detect deepfakes in many images (multipart 'image' parts and/or a list of URLs)."""
+    # Handle CORS preflight
+    if request.method == 'OPTIONS':
+        return jsonify({}), 200
+    
+    received_at = time.monotonic()
+    try:
+        if not wait_until_ready():
+            return model_loading_response()
         
-        return jsonify(result)
+        try:
+            items, with_heatmap, viz_options, fields = _read_batch_request()
+            deadline = deadline_from_request(request.headers, fields, received_at, admission.default_deadline_ms)
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        if not items:
+            return jsonify({"success": False, "error": "No images or URLs provided"}), 400
+        if len(items) > BATCH_MAX_ITEMS:
+            return jsonify({
+                "success": False,
+                "error": f"Too many images in one batch (max {BATCH_MAX_ITEMS})"
+            }), 400
         
+        # Batch requests are page scans: they count against the client's limits per image
+        client = client_identity(request.headers, request.remote_addr)
+        try:
+            client_gate.acquire(client, cost=len(items))
+        except ClientLimitError as e:
+            log.warning("%s: %s", client, e)
+            return client_limited_response(e)
+        try:
+            body, status = _detect_batch(items, with_heatmap, viz_options, deadline, client)
+        finally:
+            client_gate.release(client)
+        response = jsonify(body)
+        if "retry_after" in body:
+            response.headers["Retry-After"] = str(body["retry_after"])
+        return response, status
+    
     except Exception as e:
-        import traceback
-        error_trace = traceback.format_exc()
-        print("\n" + "="*70)
-        print("❌ ERROR PROCESSING IMAGE")
-        print("="*70)
-        print(f"Error: {str(e)}")
-        print("\nFull traceback:")
-        print(error_trace)
-        print("="*70 + "\n")
+        log.exception("Error handling /api/detect/batch request")
         return jsonify({
             "success": False,
             "error": str(e)
         }), 500
 
+def _detect_batch(items, with_heatmap, viz_options, deadline, client):
+    """
+    Decode, classify (and optionally explain) the items of one batch request.
+    
+    Each chunk is admitted like a single upload and classified through the shared batch
+    scheduler on the background lane, so page scans queue behind interactive uploads.
+    
+    Returns:
+        Tuple of (response dict, HTTP status)
+    """
+    log.debug("Batch request: %d item(s), heatmaps %s", len(items), "on" if with_heatmap else "off")
+    start_time = time.time()
+    
+    # Decode all items concurrently; failures stay attached to their item
+    decode_start = time.time()
+    decoded = list(decode_pool.map(_decode_batch_item, items))
+    decode_time = time.time() - decode_start
+    
+    results = [None] * len(items)
+    valid = []
+    for i, (image, original_size, error) in enumerate(decoded):
+        if error is not None:
+            results[i] = {"success": False, "error": error, "source": items[i]["source"]}
+        else:
+            valid.append(i)
+    
+    # Preprocess and classify the decoded images a chunk at a time
+    for chunk_start in range(0, len(valid), BATCH_CHUNK_SIZE):
+        chunk = valid[chunk_start:chunk_start + BATCH_CHUNK_SIZE]
+        try:
+            admission_info = admission.admit(deadline, heatmap=with_heatmap)
+        except AdmissionRejected as e:
+            log.warning("Batch chunk shed: %s", e)
+            if chunk_start == 0:
+                # Nothing classified yet: shed the whole request
+                return {"success": False, "error": str(e), "retry_after": e.retry_after, "admission": e.info}, 503
+            for i in valid[chunk_start:]:
+                results[i] = {"success": False, "error": str(e), "retry_after": e.retry_after,
+                              "source": items[i]["source"]}
+            break
+        try:
+            prep_start = time.time()
+            pixel_values = get_preprocessor(processor)([decoded[i][0] for i in chunk], device)
+            prep_time = time.time() - prep_start
+            
+            infer_start = time.time()
+            outcomes = classify_background(pixel_values, deadline, client)
+            infer_time = time.time() - infer_start
+        except Exception as e:
+            log.exception("Batch chunk failed")
+            for i in chunk:
+                results[i] = {"success": False, "error": str(e), "source": items[i]["source"]}
+            continue
+        finally:
+            admission.release()
+        
+        if any(isinstance(outcome, DeadlineExceededError) for outcome in outcomes):
+            admission.record(EXPIRED)
+        for i, outcome in zip(chunk, outcomes):
+            if isinstance(outcome, Exception):
+                error = "Server is busy, please retry shortly" if isinstance(outcome, SchedulerFullError) else str(outcome)
+                results[i] = {"success": False, "error": error, "source": items[i]["source"]}
+                continue
+            admission.observe_forward(outcome.get("forward_time", infer_time))
+            image, original_size, _ = decoded[i]
+            fake_prob, real_prob = outcome["probs"].tolist()
+            result = build_detection_result(fake_prob, real_prob, {
+                "image_size": original_size,
+                "inference_time": round(infer_time * 1000, 2),  # ms, whole chunk
+                "preprocessing_time": round(prep_time * 1000, 2),  # ms, whole chunk
+                "batch_size": outcome["batch_size"],
+                "lane": BACKGROUND,
+                "timestamp": datetime.now().isoformat()
+            })
+            if not with_heatmap:
+                result["visualization"] = {
+                    "available": False,
+                    "message": "Heatmap disabled for batch requests (set heatmap=true to enable)"
+                }
+            elif admission_info["decision"] == DEGRADED:
+                result["visualization"] = {"available": False, "message": UNDER_LOAD_MESSAGE}
+            else:
+                result["visualization"] = build_visualization(
+                    image, result["prediction"].lower(), viz_options, items[i]["data"]
+                )
+            result["source"] = items[i]["source"]
+            results[i] = result
+    
+    total_time = time.time() - start_time
+    succeeded = sum(1 for r in results if r["success"])
+    request_log.info("detect_batch", extra={"items": len(items), "succeeded": succeeded, "heatmaps": with_heatmap,
+                                            "client": client, "decode_ms": round(decode_time * 1000, 2),
+                                            "total_ms": round(total_time * 1000, 2)})
+    
+    return {
+        "success": True,
+        "count": len(results),
+        "succeeded": succeeded,
+        "results": results,
+        "analysis": {
+            "decode_time": round(decode_time * 1000, 2),  # ms
+            "total_time": round(total_time * 1000, 2),  # ms
+            "timestamp": datetime.now().isoformat()
+        }
+    }, 200
+
+def classify_background(pixel_values, deadline, client):
+    """
+    Classify preprocessed images through the shared scheduler on the background lane.
+    
+    Images are queued at most one forward's worth at a time, so a large batch never
+    fills the scheduler queue that interactive uploads need.
+    
+    Returns:
+        One entry per image: the scheduler's result dict ('probs', 'batch_size', ...) or the exception it failed with
+    """
+    if not isinstance(scheduler, BatchScheduler):
+        # Ring front-end: the owner batches the images with everyone else's, in arrival order
+        probs = torch.softmax(scheduler(pixel_values).logits.float(), dim=1)
+        return [{"probs": p, "batch_size": len(pixel_values)} for p in probs]
+    outcomes = []
+    for window_start in range(0, len(pixel_values), scheduler.max_batch_size):
+        futures = []
+        for image in pixel_values[window_start:window_start + scheduler.max_batch_size]:
+            try:
+                futures.append(scheduler.submit(image, deadline=deadline, client=client, lane=BACKGROUND))
+            except SchedulerFullError as e:
+                futures.append(e)
+        for future in futures:
+            if isinstance(future, Exception):
+                outcomes.append(future)
+                continue
+            try:
+                outcomes.append(future.result())
+            except Exception as e:
+                outcomes.append(e)
+    return outcomes
+
+def _read_batch_request():
+    """Collect batch items, heatmap options and the deadline field from multipart 'image' parts and 'url' fields or a JSON body."""
+    items = []
+    for file in request.files.getlist('image'):
+        items.append({"source": file.filename, "data": file.read()})
+    
+    payload = request.get_json(silent=True) or {}
+    urls = list(payload.get('urls', [])) if isinstance(payload, dict) else []
+    urls += request.form.getlist('url')
+    for url in urls:
+        items.append({"source": url, "url": url})
+    
+    def option(name, default=None):
+        value = payload.get(name) if isinstance(payload, dict) else None
+        return request.form.get(name, default) if value is None else value
+    
+    with_heatmap = str(option('heatmap', 'false')).lower() in ('1', 'true', 'yes')
+    fields = {"deadline_ms": option('deadline_ms')}
+    viz_options = normalize_visualization_options({
+        "format": option('heatmap_format'),
+        "max_dim": option('heatmap_max_dim'),
+        "quality": option('heatmap_quality'),
+        "include_original": option('include_original'),
+        "cam_dtype": option('cam_dtype'),
+    })
+    return items, with_heatmap, viz_options, fields
+
+def _decode_batch_item(item):
+    """Download (if needed) and decode one batch item. Returns (image, original_size, error)."""
+    try:
+        data = item.get("data")
+        if data is None:
+            # Public addresses only (after every redirect too), so a URL cannot reach internal services
+            with open_public_url(str(item["url"]), timeout=URL_FETCH_TIMEOUT) as response:
+                data = response.read(URL_FETCH_MAX_BYTES + 1)
+            if len(data) > URL_FETCH_MAX_BYTES:
+                return None, None, f"Image at URL exceeds {URL_FETCH_MAX_BYTES} bytes"
+            # Kept for decoding a heatmap copy later
+            item["data"] = data
+        if not data:
+            return None, None, "Empty image file"
+        image, original_size = decode_for_model(data, processor)
+        return image, original_size, None
+    except (ImageTooLargeError, UnsafeURLError) as e:
+        return None, None, str(e)
+    except Exception as e:
+        return None, None, f"Could not load image: {e}"
+
+def store_result(cache_key, image_hash, result, cache_options):
+    """Write a complete response to the memory, perceptual and disk caches."""
+    result_cache.put(cache_key, result)
+    if image_hash is not None and phash_index is not None:
+        # Near-duplicates only reuse a result with the same heatmap delivery and visualization options
+        phash_index.add(image_hash, (cache_key, cache_options))
+    if disk_cache is not None:
+        try:
+            disk_cache.put(cache_key, result)
+        except Exception as e:
+            log.warning("Could not write disk cache: %s", e)
+
+def build_cached_result(cached, lookup_start):
+    """Copy a cached response, marking it as a hit and refreshing its timing fields."""
+    result = dict(cached)
+    result["analysis"] = dict(cached["analysis"],
+                              inference_time=0,
+                              preprocessing_time=0,
+                              batch_size=0,
+                              queue_depth=0,
+                              total_time=round((time.time() - lookup_start) * 1000, 2),
+                              timestamp=datetime.now().isoformat())
+    result["cache"] = "hit"
+    # Cache hits skip admission
+    result.pop("admission", None)
+    return result
+
+def queue_visualization(image, predicted_class, viz_options, image_bytes, on_done=None):
+    """
+    Queue a heatmap for background generation (fetched from /api/visualization/<id>).
+    
+    Returns:
+        The pending visualization block, or an unavailable one if the job queue is full
+    """
+    try:
+        visualization_id = visualization_jobs.submit(
+            lambda: build_visualization(image, predicted_class, viz_options, image_bytes),
+            on_done=on_done
+        )
+    except JobQueueFullError as e:
+        log.warning("%s", e)
+        return {
+            "available": False,
+            "message": "Heatmap queue is full, visualization skipped"
+        }
+    log.debug("Heatmap queued as %s", visualization_id)
+    return {
+        "available": False,
+        "status": "pending",
+        "visualization_id": visualization_id,
+        "url": f"/api/visualization/{visualization_id}"
+    }
+
+def decode_render_image(image_bytes, options):
+    """Decode the resolution-capped copy a heatmap overlay is drawn on (None for the raw CAM format)."""
+    if image_bytes is None or (options or {}).get("format") == "cam":
+        return None
+    image, _ = decode_image(image_bytes, max_dim=render_max_dim(options))
+    return image
+
+def build_visualization(image, predicted_class, options=None, image_bytes=None):
+    """
+    Generate the Grad-CAM visualization block for a prediction.
+    
+    The CAM is computed from the model-size image; the overlay is drawn on a copy
+    decoded from image_bytes at the rendering resolution (options: see normalize_visualization_options).
+    """
+    if model is None:
+        return {"available": False, "message": RING_HEATMAP_MESSAGE}
+    viz_start = time.time()
+    try:
+        # For fake predictions, show what regions are suspicious
+        # For real predictions, we can still show attention but it's less critical
+        target_class_idx = 0 if predicted_class == "fake" else 1
+        is_fake = (predicted_class == "fake")
+        payload = generate_visualization_payload(
+            model, processor, device, image, target_class=target_class_idx, is_fake=is_fake, options=options,
+            render_image=decode_render_image(image_bytes, options)
+        )
+    except Exception:
+        log.exception("Heatmap generation failed, continuing without visualization")
+        return {
+            "available": False,
+            "message": "Heatmap visualization not available"
+        }
+    viz_time = time.time() - viz_start
+    encoding_time = observe_encoding(payload)
+    metrics.observe_stage("gradcam", max(0.0, viz_time - encoding_time))
+    return dict(payload,
+                available=True,
+                visualization_time=round(viz_time * 1000, 2))  # ms
+
+def observe_encoding(payload):
+    """Record a heatmap payload's colormap render and encode times; returns their sum in seconds."""
+    report = payload.get("encoding", {})
+    seconds = 0.0
+    for stage, field in (("render", "render_time"), ("encode", "encode_time")):
+        if field in report:
+            metrics.observe_stage(stage, report[field] / 1000)
+            seconds += report[field] / 1000
+    return seconds
+
+def build_detection_result(fake_prob, real_prob, analysis):
+    """Build the per-image detection response shared by /api/detect and /api/detect/batch."""
+    predicted_class = "fake" if fake_prob > real_prob else "real"
+    confidence = max(fake_prob, real_prob)
+    return {
+        "success": True,
+        "prediction": predicted_class.upper(),
+        "confidence": round(confidence * 100, 2),
+        "probabilities": {
+            "fake": round(fake_prob * 100, 2),
+            "real": round(real_prob * 100, 2)
+        },
+        "model_info": {
+            "model_name": "prithivMLmods/deepfake-detector-model-v1",
+            "model_type": "SiglipForImageClassification",
+            "device": device,
+            "framework": "ONNX Runtime" if inference_backend == "onnx" else "PyTorch"
+        },
+        "analysis": analysis,
+        "interpretation": get_interpretation(predicted_class, confidence)
+    }
+
 def get_interpretation(prediction, confidence):
     """Get human-readable interpretation of the result."""
     if confidence >= 0.8:
@@ -326,10 +1269,8 @@ if __name__ == '__main__':
     # Suppress Flask development server warning
     warnings.filterwarnings('ignore', category=UserWarning)
     
-    # Suppress werkzeug logging
-    import logging
-    log = logging.getLogger('werkzeug')
-    log.setLevel(logging.ERROR)
+    # Suppress werkzeug's per-request access log (the request log line replaces it)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
     
     # Filter stderr to remove development server warning
     original_stderr = sys.stderr
@@ -348,54 +1289,31 @@ if __name__ == '__main__':
     
     sys.stderr = FilteredStderr(original_stderr)
     
-    print("\n" + "="*70)
-    print("STARTING DEEPFAKE DETECTION API SERVER")
-    print("="*70)
+    log.info("Starting deepfake detection API server")
     
-    # Load model BEFORE starting server
-    print("\nLoading model now...")
-    try:
-        load_model()
-    except Exception as e:
-        print(f"\n❌ FATAL ERROR: Failed to load model!")
-        print(f"Error: {e}")
-        print("\nPlease check:")
-        print("  1. Model is downloaded: python download_model.py")
-        print("  2. Internet connection is available")
-        print("  3. Transformers library is installed")
-        sys.exit(1)
-    
-    # Verify model is loaded
-    if model is None or processor is None:
-        print("\n❌ ERROR: Model failed to load!")
-        sys.exit(1)
-    
-    print("\n" + "="*70)
-    print("SERVER INFORMATION")
-    print("="*70)
-    print(f"Model Status: ✓ Loaded")
-    print(f"Device: {device.upper()}")
-    print(f"CUDA Available: {torch.cuda.is_available()}")
-    print(f"Model Type: {type(model).__name__}")
-    print(f"Parameters: {sum(p.numel() for p in model.parameters()):,}")
-    print("="*70)
-    print("\nStarting Flask server...")
-    print("Server URL: http://localhost:5000")
-    print("\nAPI Endpoints:")
-    print("  - GET  /              - API information")
-    print("  - GET  /api/health    - Health check")
-    print("  - GET  /api/model-info - Model information")
-    print("  - POST /api/detect    - Analyze image for deepfakes")
-    print("\n" + "="*70)
-    print("Server is ready! Waiting for requests...")
-    print("="*70 + "\n")
+    # By default the server starts listening right away and loads the model in the
+    # background; /api/health/ready turns 200 and requests proceed once it is warm.
+    # MODEL_LOAD_BACKGROUND=0 loads it before the server starts instead. Ring mode always
+    # starts its model-owner process up front, so it is not forked from a serving thread.
+    background_load = (os.environ.get('MODEL_LOAD_BACKGROUND', '1').lower() not in ('0', 'false', 'no')
+                       and INFERENCE_MODE != "ring")
+    if background_load:
+        log.info("Loading model in the background")
+        loading_started.set()
+        threading.Thread(target=load_or_exit, name="model-loader", daemon=True).start()
+    else:
+        load_or_exit()
+    log.info("Listening on http://localhost:%s (endpoints: GET /, /api/health, /api/health/live, "
+             "/api/health/ready, /api/model-info, /metrics; POST /api/detect, /api/detect/batch); %s",
+             os.environ.get('PORT', 5000),
+             "ready for requests" if model_ready.is_set() else "requests wait until the model is ready")
     
     try:
         port = int(os.environ.get('PORT', 5000))
         debug = os.environ.get('FLASK_ENV') == 'development'
         app.run(host='0.0.0.0', port=port, debug=debug, use_reloader=False)
     except KeyboardInterrupt:
-        print("\n\nShutting down server...")
+        log.info("Shutting down server")
     finally:
         sys.stderr = original_stderr
 
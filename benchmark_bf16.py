@@ -0,0 +1,79 @@
+"""
+Speed and accuracy of the bfloat16 vision tower against fp32 on this host.
+Reports the startup bf16 probe, latency, throughput, RSS and model size for both
+precisions, plus fake/real agreement and the largest probability deviation from fp32.
+
+Usage: python benchmark_bf16.py [image_folder] [threads]
+"""
+import copy
+import sys
+
+import torch
+
+from benchmark_quantization import run_engine
+from benchmark_utils import current_rss_mb, load_benchmark_model, percentiles_ms
+from precision import cast_vision_tower_bf16, probe_bf16
+from preprocessing import get_preprocessor
+from quantization import model_size_mb
+from verify_fused_gradcam import collect_images
+
+THROUGHPUT_BATCH = 8
+
+
+def main():
+    folder = sys.argv[1] if len(sys.argv) > 1 else None
+    if len(sys.argv) > 2:
+        torch.set_num_threads(int(sys.argv[2]))
+
+    model, processor, _ = load_benchmark_model()
+    model = model.to("cpu").eval()
+    images = collect_images([folder] if folder else [])
+    pixel_values = get_preprocessor(processor)(images)
+    batches = list(torch.split(pixel_values, THROUGHPUT_BATCH))
+
+    print("\n" + "=" * 78)
+    print("BF16 PRECISION BENCHMARK")
+    print("=" * 78)
+    probe = probe_bf16("cpu")
+    print(f"Images: {len(images)}  Threads: {torch.get_num_threads()}  "
+          f"bf16 kernels: {'supported' if probe['supported'] else 'unsupported'}  "
+          f"CPU flags: {', '.join(probe['flags']) or 'none'}  matmul speedup: {probe['speedup']}x")
+
+    rss = current_rss_mb()
+    latencies, throughput, fp32_probs = run_engine(model, batches)
+    rows = [("fp32", latencies, throughput, model_size_mb(model), current_rss_mb() - rss, None)]
+    fp32_fake = fp32_probs.argmax(dim=1) == 0
+
+    if probe["supported"]:
+        rss = current_rss_mb()
+        bf16_model = cast_vision_tower_bf16(copy.deepcopy(model))
+        latencies, throughput, probs = run_engine(bf16_model, batches)
+        agreement = float(((probs.argmax(dim=1) == 0) == fp32_fake).float().mean())
+        deviation = float((probs - fp32_probs).abs().max())
+        rows.append(("bf16", latencies, throughput, model_size_mb(bf16_model),
+                     current_rss_mb() - rss, (agreement, deviation)))
+    else:
+        print("\n⚠ This host has no bf16 kernels; only fp32 was measured")
+
+    print(f"\n{'precision':>10} {'p50 ms':>8} {'p95 ms':>8} {'img/s':>8} {'size MB':>8} {'+RSS MB':>8} "
+          f"{'agree':>7} {'max dev':>8}")
+    for name, latencies, throughput, size, rss_growth, accuracy in rows:
+        pct = percentiles_ms(latencies, (50, 95))
+        agree = f"{accuracy[0] * 100:>6.1f}%" if accuracy else f"{'-':>7}"
+        dev = f"{accuracy[1]:>8.4f}" if accuracy else f"{'-':>8}"
+        print(f"{name:>10} {pct['p50']:>8.2f} {pct['p95']:>8.2f} {throughput:>8.1f} {size:>8.1f} "
+              f"{rss_growth:>8.1f} {agree} {dev}")
+    if len(rows) == 2:
+        fp32_p50 = percentiles_ms(rows[0][1], (50,))['p50']
+        bf16_p50 = percentiles_ms(rows[1][1], (50,))['p50']
+        print(f"\nbf16 vs fp32: {fp32_p50 / bf16_p50:.2f}x latency, {rows[1][2] / rows[0][2]:.2f}x throughput, "
+              f"{rows[1][3] / rows[0][3] * 100:.0f}% of the model size")
+
+    print("\nagree: share of images with the same fake/real decision as fp32.")
+    print("max dev: largest absolute difference of any class probability from fp32.")
+    print("+RSS MB: resident memory added by the bf16 copy (the API casts in place instead).")
+    print("=" * 78)
+
+
+if __name__ == "__main__":
+    main()
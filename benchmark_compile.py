@@ -0,0 +1,78 @@
+"""
+Compiled inference engine against eager PyTorch on this host.
+Reports compile time, then per-batch latency and throughput for eager and compiled
+execution at every bucket size and at in-between sizes that get padded, plus
+fake/real agreement and the largest probability deviation from eager.
+
+Engines are selected with MODEL_COMPILE (inductor or torchscript; default: both).
+
+Usage: python benchmark_compile.py [image_folder] [threads]
+"""
+import os
+import sys
+
+import torch
+
+from benchmark_onnx import measure
+from benchmark_quantization import run_engine
+from benchmark_utils import load_benchmark_model, percentiles_ms
+from compiled_engine import CompiledClassifier, buckets_from_env
+from image_ingest import model_input_size
+from preprocessing import get_preprocessor
+from verify_fused_gradcam import collect_images
+
+REPEATS = 5
+
+
+def main():
+    folder = sys.argv[1] if len(sys.argv) > 1 else None
+    if len(sys.argv) > 2:
+        torch.set_num_threads(int(sys.argv[2]))
+    requested = os.environ.get('MODEL_COMPILE')
+    modes = [requested] if requested and requested != "none" else ["inductor", "torchscript"]
+
+    model, processor, _ = load_benchmark_model()
+    model = model.to("cpu").eval()
+    images = collect_images([folder] if folder else [])
+    pixel_values = get_preprocessor(processor)(images)
+    buckets = buckets_from_env()
+    width, height = model_input_size(processor)
+    # Every bucket plus one size between buckets, which pays for padding
+    batch_sizes = sorted(set(buckets) | {b + 1 for b in buckets[:-1] if b + 1 not in buckets})
+    inputs = pixel_values.repeat((max(batch_sizes) + len(images) - 1) // len(images), 1, 1, 1)
+
+    print("\n" + "=" * 78)
+    print("COMPILED ENGINE BENCHMARK")
+    print("=" * 78)
+    print(f"Images: {len(images)}  Threads: {torch.get_num_threads()}  Buckets: {list(buckets)}")
+
+    _, _, eager_probs = run_engine(model, [pixel_values])
+    eager_fake = eager_probs.argmax(dim=1) == 0
+    eager_p50 = {size: percentiles_ms(measure(model, inputs[:size], REPEATS), (50,))['p50']
+                 for size in batch_sizes}
+
+    for mode in modes:
+        engine = CompiledClassifier(model, (3, height, width), "cpu", mode, buckets)
+        try:
+            stats = engine.warmup()
+        except RuntimeError as e:
+            print(f"\n⚠ {mode}: {e}")
+            continue
+        _, _, probs = run_engine(engine, [pixel_values])
+        agreement = float(((probs.argmax(dim=1) == 0) == eager_fake).float().mean())
+        deviation = float((probs - eager_probs).abs().max())
+        print(f"\n{mode} (ran as {stats['mode']}): compiled {len(buckets)} bucket(s) in {stats['compile_time_s']:.1f}s, "
+              f"agreement {agreement * 100:.1f}%, max dev {deviation:.2e}")
+        print(f"{'batch':>6} {'bucket':>7} {'eager ms':>9} {'comp ms':>9} {'img/s':>8} {'speedup':>8}")
+        for size in batch_sizes:
+            p50 = percentiles_ms(measure(engine, inputs[:size], REPEATS), (50,))['p50']
+            print(f"{size:>6} {engine.bucket_for(size):>7} {eager_p50[size]:>9.2f} {p50:>9.2f} "
+                  f"{size / p50 * 1000:>8.1f} {eager_p50[size] / p50:>7.2f}x")
+
+    print("\nLatency is per batch (median); img/s is batch size over compiled latency.")
+    print("Sizes between buckets are zero-padded up to the next bucket.")
+    print("=" * 78)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark upload decoding: full-resolution decode versus the reduced decodes in
+image_ingest (model-size copy and capped heatmap copy), by image size and format.
+The full and model rows include the resize to the model input size the processor
+performs next; the heatmap row includes the resize to the rendering cap.
+Each measurement runs in a forked child so peak RSS is attributable to one decode.
+
+Usage: python benchmark_decode.py [repeats]
+"""
+import io
+import multiprocessing
+import sys
+import time
+
+from PIL import Image
+
+from benchmark_utils import current_rss_mb, encode_image, peak_rss_mb, synthetic_image
+from image_ingest import DECODE_OVERSAMPLE, DEFAULT_INPUT_SIZE, decode_image
+from heatmap_renderer import RENDER_MAX_DIM
+
+SIZES = [("1MP", 1152, 864), ("12MP", 4000, 3000), ("24MP", 6000, 4000)]
+FORMATS = ["JPEG", "PNG", "WEBP"]
+MODEL_MIN_SIZE = (DEFAULT_INPUT_SIZE[0] * DECODE_OVERSAMPLE, DEFAULT_INPUT_SIZE[1] * DECODE_OVERSAMPLE)
+
+
+def to_input_size(image):
+    return image.resize(DEFAULT_INPUT_SIZE, Image.Resampling.BILINEAR)
+
+
+def full_decode(data):
+    return to_input_size(Image.open(io.BytesIO(data)).convert("RGB"))
+
+
+def model_decode(data):
+    return to_input_size(decode_image(data, min_size=MODEL_MIN_SIZE)[0])
+
+
+def heatmap_decode(data):
+    return decode_image(data, max_dim=RENDER_MAX_DIM)[0]
+
+
+DECODERS = [("full", full_decode), ("model", model_decode), ("heatmap", heatmap_decode)]
+
+
+def _measure(decoder, data, repeats, conn):
+    """Child process: best-of-N decode time and peak RSS growth over the baseline."""
+    baseline = current_rss_mb()
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        decoder(data)
+        times.append(time.perf_counter() - start)
+    conn.send((min(times) * 1000, peak_rss_mb() - baseline))
+    conn.close()
+
+
+def measure(decoder, data, repeats):
+    ctx = multiprocessing.get_context("fork")
+    parent, child = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_measure, args=(decoder, data, repeats, child))
+    process.start()
+    result = parent.recv()
+    process.join()
+    return result
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+    print("\n" + "=" * 60)
+    print("UPLOAD DECODE BENCHMARK")
+    print("=" * 60)
+    print(f"Repeats: {repeats} (best time reported)  Model decode covers {MODEL_MIN_SIZE[0]}x{MODEL_MIN_SIZE[1]}, "
+          f"heatmap decode capped at {RENDER_MAX_DIM}px")
+    print(f"\n{'size':>6} {'format':>6} {'decode':>8} {'ms':>9} {'RSS MB':>8} {'speedup':>8}")
+
+    for label, width, height in SIZES:
+        image = synthetic_image(width, height)
+        for fmt in FORMATS:
+            data = encode_image(image, fmt)
+            full_ms = None
+            for name, decoder in DECODERS:
+                ms, rss = measure(decoder, data, repeats)
+                full_ms = ms if full_ms is None else full_ms
+                print(f"{label:>6} {fmt:>6} {name:>8} {ms:>9.1f} {rss:>8.1f} {full_ms / ms:>7.1f}x")
+
+    print("\nRSS MB is peak resident memory growth in a fresh child for one decoder.")
+    print("Speedup is relative to the full decode + resize to the model input size.")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
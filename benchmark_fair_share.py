@@ -0,0 +1,113 @@
+"""
+Multi-client load generator for the fair-share batch scheduler.
+A heavy client (a page scan: many threads submitting back to back on the
+background lane) floods the scheduler while a light client (the web frontend:
+one interactive upload at a time with think time) keeps using it. Compares the
+light client's tail latency when requests are served in arrival order, with
+per-client fair queuing, and with fair queuing plus the heavy client's
+concurrency cap (CLIENT_MAX_CONCURRENT).
+
+Usage: python benchmark_fair_share.py [heavy_threads] [seconds]
+"""
+import sys
+import threading
+import time
+
+import torch
+
+from benchmark_utils import load_benchmark_model, percentiles_ms, synthetic_image
+from fair_queue import BACKGROUND, INTERACTIVE, ClientGate, ClientLimitError
+from inference_scheduler import BatchScheduler, SchedulerFullError
+from preprocessing import get_preprocessor
+
+LIGHT_THINK_S = 0.05
+BACKOFF_S = 0.01
+
+
+def run_scenario(model, pixel_values, heavy_threads, seconds, fair, gate=None):
+    """Run one flood; returns the light client's latencies and both clients' completed requests."""
+    scheduler = BatchScheduler(model, "cpu", max_queue_size=max(64, heavy_threads * 2))
+    stop = threading.Event()
+    light_latencies = []
+    heavy_done = [0] * heavy_threads
+    # Arrival order: everyone is the same client on the same lane
+    heavy_tag = ("heavy", BACKGROUND) if fair else ("all", INTERACTIVE)
+    light_tag = ("light", INTERACTIVE) if fair else ("all", INTERACTIVE)
+
+    def heavy(index):
+        while not stop.is_set():
+            try:
+                if gate is not None:
+                    gate.acquire(heavy_tag[0])
+            except ClientLimitError:
+                time.sleep(BACKOFF_S)
+                continue
+            try:
+                scheduler.predict(pixel_values, client=heavy_tag[0], lane=heavy_tag[1])
+                heavy_done[index] += 1
+            except SchedulerFullError:
+                time.sleep(BACKOFF_S)
+            finally:
+                if gate is not None:
+                    gate.release(heavy_tag[0])
+
+    def light():
+        # Let the flood build up first
+        time.sleep(min(1.0, seconds / 10))
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                scheduler.predict(pixel_values, client=light_tag[0], lane=light_tag[1])
+                light_latencies.append(time.perf_counter() - start)
+            except SchedulerFullError:
+                pass
+            time.sleep(LIGHT_THINK_S)
+
+    threads = [threading.Thread(target=heavy, args=(i,)) for i in range(heavy_threads)]
+    threads.append(threading.Thread(target=light))
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    scheduler.stop(timeout=10)
+    return light_latencies, sum(heavy_done)
+
+
+def main():
+    heavy_threads = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    model, processor, _ = load_benchmark_model()
+    model = model.to("cpu").eval()
+    pixel_values = get_preprocessor(processor)(synthetic_image(640, 480))
+
+    scenarios = [
+        ("Arrival order (FIFO)", dict(fair=False)),
+        ("Fair queuing (DRR + interactive lane)", dict(fair=True)),
+        ("Fair queuing + heavy client capped at 8 concurrent",
+         dict(fair=True, gate=ClientGate(max_concurrent=8))),
+    ]
+
+    print("\n" + "=" * 78)
+    print("FAIR-SHARE SCHEDULER LOAD TEST")
+    print("=" * 78)
+    print(f"Heavy client: {heavy_threads} threads, background lane  "
+          f"Light client: 1 thread, interactive, {LIGHT_THINK_S * 1000:.0f}ms think time")
+    print(f"Duration: {seconds:.0f}s per scenario  Torch threads: {torch.get_num_threads()}")
+    for name, options in scenarios:
+        light_latencies, heavy_done = run_scenario(model, pixel_values, heavy_threads, seconds, **options)
+        print(f"\n{name}")
+        if light_latencies:
+            pct = percentiles_ms(light_latencies)
+            print(f"  Light client: {len(light_latencies)} requests, "
+                  f"p50 {pct['p50']:.0f}ms  p95 {pct['p95']:.0f}ms  p99 {pct['p99']:.0f}ms")
+        else:
+            print("  Light client: no request completed")
+        print(f"  Heavy client: {heavy_done} requests ({heavy_done / seconds:.1f} img/s)")
+    print("=" * 78)
+
+
+if __name__ == "__main__":
+    main()
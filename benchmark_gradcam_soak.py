@@ -0,0 +1,58 @@
+"""
+Soak benchmark for the reusable Grad-CAM explainer.
+Runs many explanations back to back and reports per-window latency and RSS,
+plus the number of hooks left on the target layer, to show nothing accumulates.
+
+Usage: python benchmark_gradcam_soak.py [num_requests] [window]
+"""
+import sys
+import time
+
+import numpy as np
+
+from benchmark_utils import current_rss_mb, load_benchmark_model, synthetic_image
+from grad_cam_utils import generate_gradcam_visualization, get_gradcam
+
+
+def main():
+    num_requests = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    window = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    model, processor, device = load_benchmark_model()
+    images = [synthetic_image(640, 480, seed=i) for i in range(8)]
+
+    print("\n" + "=" * 70)
+    print("GRAD-CAM SOAK BENCHMARK")
+    print("=" * 70)
+    print(f"Requests: {num_requests:,}  Window: {window:,}  Device: {device.upper()}")
+    print(f"\n{'requests':>10} {'mean ms':>10} {'p99 ms':>10} {'RSS MB':>10} {'hooks':>6}")
+
+    gradcam = get_gradcam(model, processor, device)
+    layer = gradcam.target_layer
+    rss_start = current_rss_mb()
+    window_means = []
+    latencies = []
+    for i in range(num_requests):
+        image = images[i % len(images)]
+        start = time.perf_counter()
+        generate_gradcam_visualization(model, processor, device, image, target_class=0, is_fake=True)
+        latencies.append(time.perf_counter() - start)
+
+        if (i + 1) % window == 0:
+            arr = np.array(latencies) * 1000
+            hooks = len(layer._forward_hooks) + len(layer._backward_hooks)
+            window_means.append(arr.mean())
+            print(f"{i + 1:>10,} {arr.mean():>10.2f} {np.percentile(arr, 99):>10.2f} {current_rss_mb():>10.1f} {hooks:>6}")
+            latencies = []
+
+    print("\nSummary:")
+    if window_means:
+        drift = (window_means[-1] - window_means[0]) / window_means[0] * 100
+        print(f"    Latency drift first->last window: {drift:+.1f}%")
+    print(f"    RSS growth: {current_rss_mb() - rss_start:+.1f} MB")
+    print(f"    Explainer instances reused: {get_gradcam(model, processor, device) is gradcam}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Micro-benchmark for heatmap overlay rendering.
+Compares the previous float32 path (full-resolution percentiles, float colormap
+and blend) with the lookup-table renderer at 1, 12 and 24 megapixels, reporting
+time, peak traced memory and how far the two outputs differ.
+
+Usage: python benchmark_heatmap_render.py [repeats]
+"""
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from PIL import Image
+
+from benchmark_utils import synthetic_image
+from grad_cam_utils import CV2_AVAILABLE, GradCAM
+from heatmap_renderer import render_heatmap_overlay
+
+SIZES = [("1MP", 1152, 864), ("12MP", 4000, 3000), ("24MP", 6000, 4000)]
+
+
+def synthetic_cam(seed: int = 0, grid: int = 14) -> np.ndarray:
+    """Thresholded CAM grid shaped like _compute_cam_grid output (top 30% kept)."""
+    rng = np.random.default_rng(seed)
+    cam = rng.random((grid, grid)).astype(np.float32)
+    cam = np.where(cam >= np.percentile(cam, 70), cam, 0)
+    return (cam / cam.max()).astype(np.float32)
+
+
+def legacy_render(explainer: GradCAM, image: Image.Image, cam: np.ndarray, is_fake: bool) -> np.ndarray:
+    """The float32 render_overlay body this renderer replaced."""
+    if CV2_AVAILABLE:
+        import cv2
+        cam_resized = cv2.resize(cam, image.size, interpolation=cv2.INTER_LINEAR)
+    else:
+        cam_pil = Image.fromarray((cam * 255).astype(np.uint8))
+        cam_resized = np.array(cam_pil.resize(image.size, Image.Resampling.LANCZOS)) / 255.0
+    if is_fake:
+        heatmap = explainer._apply_colormap_jet(cam_resized)
+    else:
+        heatmap = explainer._apply_green_colormap(cam_resized)
+    return explainer._overlay_heatmap_forensic(np.array(image), heatmap, cam_resized, alpha=0.5)
+
+
+def lut_render(image: Image.Image, cam: np.ndarray, is_fake: bool) -> np.ndarray:
+    _, overlay = render_heatmap_overlay(image, cam, is_fake, with_heatmap=False)
+    return overlay
+
+
+def measure(func, repeats: int):
+    """Best-of-N wall time (ms), peak traced memory (MB) and the last output."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        output = func()
+        times.append(time.perf_counter() - start)
+        del output
+    tracemalloc.start()
+    output = func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(times) * 1000, peak / (1024 * 1024), output
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    # Only the stateless colormap/blend helpers are used; no model is needed
+    explainer = GradCAM.__new__(GradCAM)
+    cam = synthetic_cam()
+
+    print("\n" + "=" * 94)
+    print("HEATMAP RENDER BENCHMARK")
+    print("=" * 94)
+    print(f"Repeats: {repeats} (best time reported)  OpenCV: {CV2_AVAILABLE}")
+    print(f"\n{'size':>6} {'colors':>7} {'legacy ms':>10} {'lut ms':>8} {'speedup':>8} "
+          f"{'legacy MB':>10} {'lut MB':>8} {'max diff':>9} {'px >8':>7}")
+
+    for label, width, height in SIZES:
+        image = synthetic_image(width, height)
+        for is_fake in (True, False):
+            legacy_ms, legacy_mb, legacy_out = measure(lambda: legacy_render(explainer, image, cam, is_fake), repeats)
+            lut_ms, lut_mb, lut_out = measure(lambda: lut_render(image, cam, is_fake), repeats)
+            diff = np.abs(legacy_out.astype(np.int16) - lut_out.astype(np.int16)).max(axis=2)
+            print(f"{label:>6} {'fake' if is_fake else 'real':>7} {legacy_ms:>10.1f} {lut_ms:>8.1f} "
+                  f"{legacy_ms / lut_ms:>7.1f}x {legacy_mb:>10.1f} {lut_mb:>8.1f} {int(diff.max()):>9} "
+                  f"{(diff > 8).mean() * 100:>6.2f}%")
+            del legacy_out, lut_out
+
+    print("\nPeak MB is memory traced during one render (the output image included).")
+    print("px >8: share of pixels differing by more than 8 levels (red/yellow patch edges).")
+    print("=" * 94)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark ONNX Runtime against PyTorch for classification.
+Exports the model to a temporary folder (or uses ONNX_MODEL_DIR when it holds an
+export) and reports per-batch latency and throughput at batch sizes 1, 8 and 32,
+plus the RSS each engine adds.
+
+Usage: python benchmark_onnx.py [repeats] [threads]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import torch
+
+from benchmark_utils import current_rss_mb, load_benchmark_model, percentiles_ms, synthetic_image
+from onnx_backend import OnnxClassifier, export_onnx, onnx_model_exists
+from preprocessing import get_preprocessor
+
+BATCH_SIZES = [1, 8, 32]
+
+
+def measure(engine, pixel_values, repeats):
+    """Per-batch latencies (seconds) over repeats runs after one warm-up."""
+    with torch.no_grad():
+        engine(pixel_values=pixel_values)
+        latencies = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            engine(pixel_values=pixel_values)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    if len(sys.argv) > 2:
+        torch.set_num_threads(int(sys.argv[2]))
+        os.environ['ONNX_THREADS'] = sys.argv[2]
+
+    model, processor, _ = load_benchmark_model()
+    model = model.to("cpu").eval()
+    preprocess = get_preprocessor(processor)
+    images = [synthetic_image(640, 480, seed=i) for i in range(max(BATCH_SIZES))]
+    pixel_values = preprocess(images)
+
+    export_dir = os.environ.get('ONNX_MODEL_DIR')
+    temp_dir = None
+    if not export_dir or not onnx_model_exists(export_dir):
+        temp_dir = tempfile.TemporaryDirectory()
+        export_dir = temp_dir.name
+        export_onnx(model, processor, export_dir)
+    rss = current_rss_mb()
+    engine = OnnxClassifier(export_dir)
+    engine(pixel_values=pixel_values[:1])
+    onnx_rss = current_rss_mb() - rss
+
+    print("\n" + "=" * 70)
+    print("ONNX RUNTIME BENCHMARK")
+    print("=" * 70)
+    print(f"Repeats: {repeats}  Threads: {torch.get_num_threads()}  Providers: {', '.join(engine.providers)}  "
+          f"ONNX session +RSS: {onnx_rss:.1f}MB")
+    print(f"\n{'batch':>6} {'engine':>8} {'p50 ms':>9} {'p95 ms':>9} {'img/s':>8} {'speedup':>8}")
+
+    for batch_size in BATCH_SIZES:
+        batch = pixel_values[:batch_size]
+        torch_p50 = None
+        for name, runner in (("pytorch", model), ("onnx", engine)):
+            pct = percentiles_ms(measure(runner, batch, repeats), (50, 95))
+            torch_p50 = torch_p50 or pct['p50']
+            print(f"{batch_size:>6} {name:>8} {pct['p50']:>9.2f} {pct['p95']:>9.2f} "
+                  f"{batch_size / pct['p50'] * 1000:>8.1f} {torch_p50 / pct['p50']:>7.2f}x")
+
+    print("\nLatency is per batch; img/s is batch size over median batch latency.")
+    print("=" * 70)
+    if temp_dir is not None:
+        temp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
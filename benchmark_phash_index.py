@@ -0,0 +1,95 @@
+"""
+Benchmark the perceptual-hash near-duplicate index.
+Measures insert throughput and lookup latency at up to 1M entries, checks
+lookups against a brute-force Hamming scan, and checks that flat images (whose
+hashes all look alike) are kept out of near-duplicate matching.
+
+Usage: python benchmark_phash_index.py [num_entries] [max_distance]
+"""
+import random
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+from benchmark_utils import synthetic_image
+from phash_index import HASH_FUNCTIONS, PerceptualHashIndex, is_distinctive
+
+FLAT_COLORS = [(0, 0, 0), (255, 255, 255), (200, 30, 30), (30, 200, 30), (128, 128, 128)]
+
+
+def flip_bits(value: int, count: int, rng: random.Random) -> int:
+    """Flip `count` distinct random bits of a 64-bit value."""
+    for bit in rng.sample(range(64), count):
+        value ^= 1 << bit
+    return value
+
+
+def percentile_ms(samples, q):
+    return np.percentile(np.array(samples) * 1000, q)
+
+
+def main():
+    num_entries = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    max_distance = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+    num_queries = 2000
+    rng = random.Random(42)
+
+    print("=" * 70)
+    print("PERCEPTUAL HASH INDEX BENCHMARK")
+    print("=" * 70)
+    print(f"Entries: {num_entries:,}  Max distance: {max_distance}  Queries: {num_queries:,}")
+
+    index = PerceptualHashIndex(max_entries=num_entries, max_distance=max_distance)
+    hashes = [rng.getrandbits(64) for _ in range(num_entries)]
+
+    start = time.perf_counter()
+    for i, h in enumerate(hashes):
+        index.add(h, i)
+    insert_time = time.perf_counter() - start
+    print(f"\n[1] Insert: {insert_time:.2f}s ({num_entries / insert_time:,.0f} inserts/s)")
+
+    # Near-duplicate queries (existing hash with a few flipped bits) and misses (random hashes)
+    near_queries = [flip_bits(rng.choice(hashes), rng.randint(0, max_distance), rng) for _ in range(num_queries)]
+    miss_queries = [rng.getrandbits(64) for _ in range(num_queries)]
+
+    for label, queries in (("near-duplicate", near_queries), ("random (miss)", miss_queries)):
+        latencies = []
+        found = 0
+        for q in queries:
+            start = time.perf_counter()
+            match = index.find(q)
+            latencies.append(time.perf_counter() - start)
+            found += match is not None
+        print(f"\n[2] Lookup ({label}):")
+        print(f"    Found: {found}/{len(queries)}")
+        print(f"    p50: {percentile_ms(latencies, 50):.3f}ms  p99: {percentile_ms(latencies, 99):.3f}ms  "
+              f"max: {max(latencies) * 1000:.3f}ms")
+
+    # Verify a sample of lookups against a vectorized brute-force scan
+    table = np.array(hashes, dtype=np.uint64)
+    mismatches = 0
+    for q in near_queries[:50]:
+        xor = np.bitwise_xor(table, np.uint64(q))
+        distances = np.unpackbits(xor.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+        best = int(distances.min())
+        match = index.find(q)
+        expected = best if best <= max_distance else None
+        if (match[2] if match else None) != expected:
+            mismatches += 1
+    print(f"\n[3] Brute-force agreement: {50 - mismatches}/50")
+
+    # Solid colors must never match each other; textured images must stay matchable
+    flat = [Image.new("RGB", (640, 480), color) for color in FLAT_COLORS]
+    textured = [synthetic_image(seed=seed) for seed in range(5)]
+    print("\n[4] Flat-image guard:")
+    for name, hash_function in HASH_FUNCTIONS.items():
+        flat_excluded = sum(not is_distinctive(hash_function(image)) for image in flat)
+        textured_kept = sum(is_distinctive(hash_function(image)) for image in textured)
+        print(f"    {name}: flat excluded {flat_excluded}/{len(flat)}  textured kept {textured_kept}/{len(textured)}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
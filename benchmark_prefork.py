@@ -0,0 +1,95 @@
+"""
+Pre-forked workers sharing one model copy vs independent processes with a model each.
+Both setups run N workers with cores split evenly between them, classify the
+same images for a fixed duration, and report total throughput and total memory
+(sum of PSS, so copy-on-write pages shared with the master are counted once).
+
+Usage: python benchmark_prefork.py [workers] [seconds]
+"""
+import gc
+import multiprocessing as mp
+import os
+import sys
+import time
+
+import torch
+
+from benchmark_utils import load_benchmark_model, pss_mb, synthetic_image
+from preprocessing import get_preprocessor
+
+# Model loaded by the parent; forked workers inherit it
+_shared = {}
+
+
+def _serve(model, processor, threads, seconds, results, start_barrier):
+    """Worker loop: classify single images until the time is up, then report count and PSS."""
+    torch.set_num_threads(threads)
+    pixel_values = get_preprocessor(processor)([synthetic_image(640, 480, seed=os.getpid())])
+    with torch.no_grad():
+        model(pixel_values=pixel_values)
+        # Start timing together, after every worker has loaded and warmed up
+        start_barrier.wait()
+        count = 0
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            model(pixel_values=pixel_values)
+            count += 1
+    results.put((count, pss_mb()))
+
+
+def _forked_worker(threads, seconds, results, start_barrier):
+    _serve(_shared["model"], _shared["processor"], threads, seconds, results, start_barrier)
+
+
+def _independent_worker(threads, seconds, results, start_barrier):
+    model, processor, _ = load_benchmark_model()
+    _serve(model.to("cpu").eval(), processor, threads, seconds, results, start_barrier)
+
+
+def run(ctx, target, workers, threads, seconds, master_pss=0.0):
+    """Start the workers, wait for them, and return (images/s, total PSS MB)."""
+    results = ctx.Queue()
+    start_barrier = ctx.Barrier(workers)
+    procs = [ctx.Process(target=target, args=(threads, seconds, results, start_barrier)) for _ in range(workers)]
+    for proc in procs:
+        proc.start()
+    reports = [results.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+    total = sum(count for count, _ in reports)
+    return total / seconds, master_pss + sum(pss for _, pss in reports)
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 20
+    threads = max(1, (os.cpu_count() or 1) // workers)
+
+    model, processor, _ = load_benchmark_model()
+    _shared["model"] = model.to("cpu").eval()
+    _shared["processor"] = processor
+    # Warm up in the master, as the server does, then freeze like gunicorn.conf.py
+    with torch.no_grad():
+        model(pixel_values=get_preprocessor(processor)([synthetic_image()]))
+    gc.freeze()
+
+    print("\n" + "=" * 70)
+    print("PRE-FORK SERVING BENCHMARK")
+    print("=" * 70)
+    print(f"Workers: {workers}  Torch threads per worker: {threads}  Duration: {seconds:.0f}s")
+
+    master_pss = pss_mb()
+    forked = run(mp.get_context("fork"), _forked_worker, workers, threads, seconds, master_pss)
+    independent = run(mp.get_context("spawn"), _independent_worker, workers, threads, seconds)
+
+    print(f"\n{'setup':>14} {'img/s':>9} {'total PSS MB':>13}")
+    print(f"{'pre-fork':>14} {forked[0]:>9.1f} {forked[1]:>13.1f}")
+    print(f"{'independent':>14} {independent[0]:>9.1f} {independent[1]:>13.1f}")
+    print(f"\nPre-fork uses {forked[1] / independent[1] * 100:.0f}% of the memory at "
+          f"{forked[0] / independent[0]:.2f}x the throughput.")
+    print("Pre-fork memory includes the master process that holds the shared weights.")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
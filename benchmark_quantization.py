@@ -0,0 +1,99 @@
+"""
+Accuracy and performance harness for int8 quantized inference.
+Compares fp32 against the quantized engine(s) on a local image folder: latency,
+throughput, RSS and model size, plus fake/real agreement and the largest
+probability deviation from fp32.
+
+Engines are selected with MODEL_QUANTIZATION (dynamic or static; default: both
+when QUANTIZATION_CALIBRATION_DIR is set, otherwise dynamic).
+
+Usage: python benchmark_quantization.py [image_folder] [threads]
+"""
+import os
+import sys
+import time
+
+import torch
+
+from benchmark_utils import current_rss_mb, load_benchmark_model, percentiles_ms
+from preprocessing import get_preprocessor
+from quantization import build_inference_model, model_size_mb
+from verify_fused_gradcam import collect_images
+
+THROUGHPUT_BATCH = 8
+
+
+def run_engine(model, batches):
+    """Per-image latency (batch 1), throughput (batched) and probabilities for every image."""
+    latencies = []
+    probs = []
+    with torch.no_grad():
+        model(pixel_values=batches[0][:1])  # warm up
+        for batch in batches:
+            for i in range(batch.shape[0]):
+                start = time.perf_counter()
+                logits = model(pixel_values=batch[i:i + 1]).logits
+                latencies.append(time.perf_counter() - start)
+                probs.append(torch.softmax(logits.float(), dim=1)[0])
+        start = time.perf_counter()
+        count = 0
+        for batch in batches:
+            model(pixel_values=batch)
+            count += batch.shape[0]
+        throughput = count / (time.perf_counter() - start)
+    return latencies, throughput, torch.stack(probs)
+
+
+def main():
+    folder = sys.argv[1] if len(sys.argv) > 1 else None
+    if len(sys.argv) > 2:
+        torch.set_num_threads(int(sys.argv[2]))
+    requested = os.environ.get('MODEL_QUANTIZATION')
+    calibration_dir = os.environ.get('QUANTIZATION_CALIBRATION_DIR')
+    modes = [requested] if requested and requested != "none" else (["dynamic", "static"] if calibration_dir else ["dynamic"])
+
+    model, processor, _ = load_benchmark_model()
+    model = model.to("cpu").eval()
+    preprocess = get_preprocessor(processor)
+    images = collect_images([folder] if folder else [])
+    pixel_values = preprocess(images)
+    batches = list(torch.split(pixel_values, THROUGHPUT_BATCH))
+
+    print("\n" + "=" * 78)
+    print("INT8 QUANTIZATION HARNESS")
+    print("=" * 78)
+    print(f"Images: {len(images)}  Threads: {torch.get_num_threads()}  "
+          f"Quantized engine: {torch.backends.quantized.engine}")
+
+    rss = current_rss_mb()
+    latencies, throughput, fp32_probs = run_engine(model, batches)
+    rows = [("fp32", latencies, throughput, model_size_mb(model), current_rss_mb() - rss, None)]
+    fp32_fake = fp32_probs.argmax(dim=1) == 0
+
+    for mode in modes:
+        rss = current_rss_mb()
+        engine, effective = build_inference_model(model, preprocess, mode, calibration_dir)
+        latencies, throughput, probs = run_engine(engine, batches)
+        agreement = float(((probs.argmax(dim=1) == 0) == fp32_fake).float().mean())
+        deviation = float((probs - fp32_probs).abs().max())
+        rows.append((f"int8-{effective}", latencies, throughput, model_size_mb(engine),
+                     current_rss_mb() - rss, (agreement, deviation)))
+        del engine
+
+    print(f"\n{'engine':>12} {'p50 ms':>8} {'p95 ms':>8} {'img/s':>8} {'size MB':>8} {'+RSS MB':>8} "
+          f"{'agree':>7} {'max dev':>8}")
+    for name, latencies, throughput, size, rss_growth, accuracy in rows:
+        pct = percentiles_ms(latencies, (50, 95))
+        agree = f"{accuracy[0] * 100:>6.1f}%" if accuracy else f"{'-':>7}"
+        dev = f"{accuracy[1]:>8.4f}" if accuracy else f"{'-':>8}"
+        print(f"{name:>12} {pct['p50']:>8.2f} {pct['p95']:>8.2f} {throughput:>8.1f} {size:>8.1f} "
+              f"{rss_growth:>8.1f} {agree} {dev}")
+
+    print("\nagree: share of images with the same fake/real decision as fp32.")
+    print("max dev: largest absolute difference of any class probability from fp32.")
+    print("+RSS MB: resident memory added by building and running the engine (fp32 stays loaded).")
+    print("=" * 78)
+
+
+if __name__ == "__main__":
+    main()
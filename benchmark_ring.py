@@ -0,0 +1,100 @@
+"""
+Multi-process load generator for INFERENCE_MODE=ring.
+Starts the model-owner process and N front-end processes. Each front-end repeatedly
+decodes a JPEG, preprocesses it and classifies it through the shared-memory ring,
+as the API's front-end workers do. Reports throughput, latency, the batch sizes the
+owner formed across processes, memory (PSS) of the owner and the front-ends, and
+checks that every front-end always gets back the logits of its own image.
+
+Usage: python benchmark_ring.py [front_ends] [seconds]
+"""
+import multiprocessing as mp
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+import torch
+
+from benchmark_utils import encode_image, percentiles_ms, pss_mb, synthetic_image
+from image_ingest import decode_for_model, model_input_size
+from model_owner import start_model_owner
+from model_store import MODEL_NAME, load_processor, resolve_snapshot
+from preprocessing import get_preprocessor
+from shm_ring import RingClient
+
+# Largest logit difference still counted as the same image (batch composition changes the last bits)
+LOGIT_TOLERANCE = 1e-3
+
+
+def _front_end(index, ring, processor, settings, seconds, start_barrier, results):
+    """Decode, preprocess and classify one image in a loop; report latencies, batch sizes and mismatches."""
+    torch.set_num_threads(1)
+    client = RingClient(ring, settings["max_batch_size"], settings["max_wait"])
+    preprocess = get_preprocessor(processor)
+    data = encode_image(synthetic_image(1280, 960, seed=index), "JPEG")
+    latencies, batch_sizes = [], []
+    reference = None
+    mismatches = 0
+    start_barrier.wait()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        image, _ = decode_for_model(data, processor)
+        result = client.predict(preprocess(image))
+        latencies.append(time.perf_counter() - start)
+        batch_sizes.append(result["batch_size"])
+        logits = result["logits"].numpy()
+        if reference is None:
+            reference = logits
+        elif np.abs(logits - reference).max() > LOGIT_TOLERANCE:
+            mismatches += 1
+    results.put((latencies, batch_sizes, mismatches, pss_mb()))
+
+
+def main():
+    front_ends = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    processor = load_processor(resolve_snapshot(MODEL_NAME))
+    width, height = model_input_size(processor)
+    ring, owner, settings = start_model_owner((3, height, width), 2)
+
+    ctx = mp.get_context("fork")
+    results = ctx.Queue()
+    start_barrier = ctx.Barrier(front_ends)
+    procs = [ctx.Process(target=_front_end, args=(i, ring, processor, settings, seconds, start_barrier, results))
+             for i in range(front_ends)]
+    for proc in procs:
+        proc.start()
+    reports = [results.get() for _ in procs]
+    owner_pss = pss_mb(owner.pid)
+    for proc in procs:
+        proc.join()
+
+    latencies = [x for r in reports for x in r[0]]
+    batch_sizes = Counter(x for r in reports for x in r[1])
+    mismatches = sum(r[2] for r in reports)
+    front_end_pss = sum(r[3] for r in reports)
+    pct = percentiles_ms(latencies)
+
+    print("\n" + "=" * 70)
+    print("SHARED-MEMORY RING LOAD TEST")
+    print("=" * 70)
+    print(f"Front-ends: {front_ends}  Duration: {seconds:.0f}s  Ring: {ring.num_slots} slots ({ring.size_mb():.1f}MB)  "
+          f"Max batch: {settings['max_batch_size']}  Max wait: {settings['max_wait'] * 1000:.1f}ms")
+    print(f"\nRequests: {len(latencies)}  Throughput: {len(latencies) / seconds:.1f} img/s")
+    print(f"Latency (decode + preprocess + ring round trip): p50 {pct['p50']:.1f}ms  "
+          f"p95 {pct['p95']:.1f}ms  p99 {pct['p99']:.1f}ms")
+    mean_batch = sum(size * count for size, count in batch_sizes.items()) / max(1, len(latencies))
+    print(f"Batch size seen by requests: mean {mean_batch:.2f}  "
+          + "  ".join(f"{size}:{count}" for size, count in sorted(batch_sizes.items())))
+    print(f"Memory (PSS): owner {owner_pss:.0f}MB, front-ends {front_end_pss:.0f}MB total "
+          f"({front_end_pss / front_ends:.0f}MB each)")
+    print(f"Wrong-image results: {mismatches}")
+    print("=" * 70)
+    return 0 if mismatches == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
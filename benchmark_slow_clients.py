@@ -0,0 +1,146 @@
+"""
+Slow-client load test for the sync (gunicorn/Flask) and async (uvicorn/ASGI) servers.
+Opens SLOW_CLIENTS connections that trickle a multipart upload in a few bytes at a
+time (a phone on a bad link), and meanwhile FAST_CLIENTS clients send complete
+uploads back to back. Reports, per server, how many slow connections were held
+open and the fast clients' throughput, latency and errors: a server that parks a
+thread on each slow upload stops answering the fast ones.
+
+Start the servers first, e.g.
+    gunicorn -c gunicorn.conf.py backend_api:app                 (port 5000)
+    uvicorn asgi_app:app --host 0.0.0.0 --port 8000
+
+Usage: python benchmark_slow_clients.py <url> [<url> ...]
+    e.g. python benchmark_slow_clients.py http://localhost:5000 http://localhost:8000
+Environment: SLOW_CLIENTS (500), FAST_CLIENTS (8), BENCH_SECONDS (30),
+             TRICKLE_BYTES (64), TRICKLE_INTERVAL_S (1.0)
+"""
+import asyncio
+import os
+import resource
+import sys
+import time
+import uuid
+from collections import Counter
+from urllib.parse import urlsplit
+
+from benchmark_utils import encode_image, percentiles_ms, synthetic_image
+
+SLOW_CLIENTS = int(os.environ.get('SLOW_CLIENTS', 500))
+FAST_CLIENTS = int(os.environ.get('FAST_CLIENTS', 8))
+BENCH_SECONDS = float(os.environ.get('BENCH_SECONDS', 30))
+TRICKLE_BYTES = int(os.environ.get('TRICKLE_BYTES', 64))
+TRICKLE_INTERVAL_S = float(os.environ.get('TRICKLE_INTERVAL_S', 1.0))
+REQUEST_TIMEOUT_S = 30.0
+
+
+def multipart_request(host: str, port: int, image: bytes) -> tuple:
+    """Raw HTTP/1.1 headers and body of a /api/detect upload without heatmap."""
+    boundary = uuid.uuid4().hex
+    body = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"heatmap\"\r\n\r\nnone\r\n"
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"image\"; filename=\"bench.jpg\"\r\n"
+            f"Content-Type: image/jpeg\r\n\r\n").encode() + image + f"\r\n--{boundary}--\r\n".encode()
+    headers = (f"POST /api/detect HTTP/1.1\r\nHost: {host}:{port}\r\n"
+               f"Content-Type: multipart/form-data; boundary={boundary}\r\n"
+               f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n").encode()
+    return headers, body
+
+
+async def read_status(reader) -> int:
+    """Status code of the response, after draining it."""
+    status_line = await reader.readline()
+    await reader.read()
+    return int(status_line.split()[1]) if status_line else 0
+
+
+async def slow_client(host, port, headers, body, deadline, stats):
+    """Trickle one upload until the deadline; count whether the server kept the connection open."""
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        stats["refused"] += 1
+        return
+    stats["opened"] += 1
+    try:
+        writer.write(headers)
+        sent = 0
+        while time.perf_counter() < deadline and sent < len(body) - 1:
+            writer.write(body[sent:sent + TRICKLE_BYTES])
+            sent += TRICKLE_BYTES
+            await writer.drain()
+            await asyncio.sleep(TRICKLE_INTERVAL_S)
+        stats["held"] += 1
+    except (ConnectionError, OSError):
+        stats["dropped"] += 1
+    finally:
+        writer.transport.abort()
+
+
+async def fast_client(host, port, headers, body, deadline, latencies, statuses):
+    """Send complete uploads back to back until the deadline."""
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), REQUEST_TIMEOUT_S)
+            writer.write(headers + body)
+            await writer.drain()
+            status = await asyncio.wait_for(read_status(reader), REQUEST_TIMEOUT_S)
+            writer.close()
+        except (asyncio.TimeoutError, ConnectionError, OSError):
+            status = 0
+        statuses[status] += 1
+        if status == 200:
+            latencies.append(time.perf_counter() - start)
+
+
+async def run_against(url: str, image: bytes) -> dict:
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    headers, body = multipart_request(host, port, image)
+    deadline = time.perf_counter() + BENCH_SECONDS
+    slow_stats = Counter()
+    latencies, statuses = [], Counter()
+    slow = [asyncio.create_task(slow_client(host, port, headers, body, deadline, slow_stats))
+            for _ in range(SLOW_CLIENTS)]
+    # Let the slow connections occupy the server before measuring
+    await asyncio.sleep(min(2.0, BENCH_SECONDS / 10))
+    fast = [asyncio.create_task(fast_client(host, port, headers, body, deadline, latencies, statuses))
+            for _ in range(FAST_CLIENTS)]
+    await asyncio.gather(*slow, *fast)
+    return {"url": url, "slow": slow_stats, "latencies": latencies, "statuses": statuses}
+
+
+def main():
+    urls = sys.argv[1:]
+    if not urls:
+        print(__doc__)
+        return 2
+    # Each slow client is a socket
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (min(hard, max(soft, SLOW_CLIENTS + FAST_CLIENTS + 256)), hard))
+    image = encode_image(synthetic_image(1280, 960), "JPEG")
+
+    reports = [asyncio.run(run_against(url, image)) for url in urls]
+
+    print("\n" + "=" * 70)
+    print("SLOW-CLIENT LOAD TEST")
+    print("=" * 70)
+    print(f"Slow clients: {SLOW_CLIENTS} ({TRICKLE_BYTES}B every {TRICKLE_INTERVAL_S:.1f}s)  "
+          f"Fast clients: {FAST_CLIENTS}  Duration: {BENCH_SECONDS:.0f}s  Upload: {len(image) / 1024:.0f}KB")
+    for report in reports:
+        slow, statuses = report["slow"], report["statuses"]
+        done = len(report["latencies"])
+        print(f"\n{report['url']}")
+        print(f"  Slow connections: {slow['held']} held open, {slow['dropped']} dropped, {slow['refused']} refused")
+        print(f"  Fast requests: {done} OK ({done / BENCH_SECONDS:.1f} req/s), "
+              f"other statuses: " + (", ".join(f"{code or 'timeout/error'}: {count}"
+                                                for code, count in sorted(statuses.items()) if code != 200) or "none"))
+        if done:
+            pct = percentiles_ms(report["latencies"])
+            print(f"  Fast latency: p50 {pct['p50']:.0f}ms  p95 {pct['p95']:.0f}ms  p99 {pct['p99']:.0f}ms")
+    print("=" * 70)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
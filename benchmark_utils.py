@@ -0,0 +1,74 @@
+"""
+Shared helpers for the benchmark_*.py scripts.
+"""
+import io
+import os
+import resource
+import sys
+
+import numpy as np
+from PIL import Image
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MB."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        # Not Linux: fall back to peak RSS (KB on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def pss_mb(pid: int = None) -> float:
+    """
+    Proportional set size of a process in MB (Linux).
+
+    Pages shared with other processes are split between them, so summing PSS over
+    forked workers counts copy-on-write weights once. Falls back to RSS elsewhere.
+    """
+    try:
+        with open(f"/proc/{pid or os.getpid()}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError):
+        pass
+    return current_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentiles_ms(samples_s, qs=(50, 95, 99)) -> dict:
+    """Percentiles of a list of durations in seconds, reported in milliseconds."""
+    arr = np.asarray(samples_s, dtype=np.float64) * 1000
+    return {f"p{q}": round(float(np.percentile(arr, q)), 3) for q in qs}
+
+
+def synthetic_image(width: int = 640, height: int = 480, seed: int = 0) -> Image.Image:
+    """Deterministic textured RGB test image."""
+    rng = np.random.default_rng(seed)
+    small = (rng.random((max(1, height // 16), max(1, width // 16), 3)) * 255).astype(np.uint8)
+    return Image.fromarray(small).resize((width, height), Image.Resampling.BILINEAR)
+
+
+def encode_image(image: Image.Image, fmt: str = "JPEG", quality: int = 90) -> bytes:
+    """Encode a PIL image to bytes."""
+    buffer = io.BytesIO()
+    if fmt.upper() in ("JPEG", "WEBP"):
+        image.save(buffer, format=fmt, quality=quality)
+    else:
+        image.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def load_benchmark_model():
+    """Load the model, processor and device the same way run_model.py does."""
+    from run_model import load_model
+    return load_model()
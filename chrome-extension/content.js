@@ -4,6 +4,7 @@
   'use strict';
 
   const API_URL = 'http://localhost:5000/api/detect';
+  const MAX_RETRIES = 3;
   const analyzedImages = new Map(); // Cache to avoid re-analyzing same images
 
   // Style for badges
@@ -115,12 +116,25 @@
     try {
       const formData = new FormData();
       formData.append('image', blob, 'image.png');
+      // Page scans yield to interactive uploads on the server
+      formData.append('priority', 'background');
+      // Badges only need the classification; skipping the heatmap also lets the result be cached
+      formData.append('heatmap', 'none');
 
       console.log('Sending image to backend:', API_URL);
-      const apiResponse = await fetch(API_URL, {
-        method: 'POST',
-        body: formData,
-      });
+      let apiResponse;
+      for (let attempt = 0; ; attempt++) {
+        apiResponse = await fetch(API_URL, {
+          method: 'POST',
+          body: formData,
+        });
+        // Over this client's share (429) or server busy (503): wait as asked, then retry
+        if ((apiResponse.status !== 429 && apiResponse.status !== 503) || attempt >= MAX_RETRIES) {
+          break;
+        }
+        const retryAfter = parseFloat(apiResponse.headers.get('Retry-After')) || 1;
+        await new Promise((resolve) => setTimeout(resolve, retryAfter * 1000));
+      }
 
       if (!apiResponse.ok) {
         const errorText = await apiResponse.text().catch(() => 'Unknown error');
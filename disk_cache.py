@@ -0,0 +1,201 @@
+"""
+Persistent detection result cache shared across worker processes.
+Results live in a SQLite database in WAL mode; heatmap images are stored as
+separate blob files so index lookups stay small.
+"""
+import base64
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+BASE64_MARKER = ";base64,"
+BLOB_FIELDS = ("original_image", "heatmap_overlay")
+# Stored in place of a blob field: the data URL header needed to rebuild it
+BLOB_HEADER_KEY = "blob_headers"
+
+
+class DiskResultCache:
+    """SQLite-backed result cache with size-bounded eviction and model-version invalidation."""
+
+    def __init__(self, cache_dir: str, model_version: str, max_bytes: int = 1024 * 1024 * 1024):
+        """
+        Open (or create) the cache.
+
+        Args:
+            cache_dir: Directory holding the database and blob files
+            model_version: Identifier of the loaded model; entries from other versions are invalid
+            max_bytes: Maximum total size of stored results and blobs
+        """
+        self.cache_dir = cache_dir
+        self.blob_dir = os.path.join(cache_dir, "blobs")
+        self.db_path = os.path.join(cache_dir, "results.db")
+        self.model_version = model_version
+        self.max_bytes = max(1, int(max_bytes))
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(self.blob_dir, exist_ok=True)
+
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " key TEXT PRIMARY KEY,"
+                " model_version TEXT NOT NULL,"
+                " result TEXT NOT NULL,"
+                " blobs INTEGER NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created REAL NOT NULL,"
+                " accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+        self.purge_stale()
+
+    @classmethod
+    def from_env(cls, model_version: str):
+        """Create a cache from DISK_CACHE_* environment variables, or None if disabled."""
+        cache_dir = os.environ.get('DISK_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'deepfake-detector'))
+        if not cache_dir:
+            return None
+        return cls(
+            cache_dir,
+            model_version,
+            max_bytes=int(float(os.environ.get('DISK_CACHE_MAX_MB', 1024)) * 1024 * 1024),
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        """Per-thread SQLite connection (connections are not shared across threads)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def after_fork(self):
+        """Drop connections inherited from the parent; a forked worker opens its own."""
+        self._local = threading.local()
+
+    def _blob_path(self, key: str, field: str) -> str:
+        return os.path.join(self.blob_dir, key[:2], f"{key}.{field}")
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return the stored result for key under the current model version, or None."""
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT result, blobs FROM results WHERE key = ? AND model_version = ?",
+            (key, self.model_version),
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        result = json.loads(row[0])
+        if row[1]:
+            try:
+                visualization = result["visualization"]
+                for field, header in visualization.pop(BLOB_HEADER_KEY).items():
+                    with open(self._blob_path(key, field), "rb") as f:
+                        visualization[field] = header + base64.b64encode(f.read()).decode("utf-8")
+            except (OSError, KeyError):
+                # Blob went missing (e.g. concurrent eviction) or the row is unreadable; treat as a miss
+                self._delete([key])
+                self.misses += 1
+                return None
+
+        with conn:
+            conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (time.time(), key))
+        self.hits += 1
+        return result
+
+    def put(self, key: str, result: dict):
+        """Store a result, writing heatmap images as blob files, then evict to stay within max_bytes."""
+        result = dict(result)
+        visualization = result.get("visualization") or {}
+        blob_fields = [field for field in BLOB_FIELDS
+                       if str(visualization.get(field, "")).startswith("data:") and BASE64_MARKER in visualization[field]]
+        has_blobs = bool(blob_fields)
+        size = 0
+        if has_blobs:
+            visualization = dict(visualization)
+            visualization[BLOB_HEADER_KEY] = {}
+            os.makedirs(os.path.dirname(self._blob_path(key, BLOB_FIELDS[0])), exist_ok=True)
+            for field in blob_fields:
+                header, encoded = visualization.pop(field).split(BASE64_MARKER, 1)
+                visualization[BLOB_HEADER_KEY][field] = header + BASE64_MARKER
+                data = base64.b64decode(encoded)
+                path = self._blob_path(key, field)
+                tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+                size += len(data)
+            result["visualization"] = visualization
+
+        payload = json.dumps(result)
+        size += len(payload)
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, model_version, result, blobs, size, created, accessed)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, self.model_version, payload, int(has_blobs), size, now, now),
+            )
+        self._evict()
+
+    def purge_stale(self):
+        """Delete entries written by a different model version."""
+        conn = self._connection()
+        keys = [row[0] for row in conn.execute(
+            "SELECT key FROM results WHERE model_version != ?", (self.model_version,)
+        )]
+        if keys:
+            self._delete(keys)
+
+    def _evict(self):
+        """Drop least recently accessed entries until the total size fits."""
+        conn = self._connection()
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM results ORDER BY accessed"):
+            victims.append(key)
+            total -= size
+            if total <= self.max_bytes:
+                break
+        self._delete(victims)
+        self.evictions += len(victims)
+
+    def _delete(self, keys: list):
+        """Remove rows and their blob files."""
+        conn = self._connection()
+        with conn:
+            conn.executemany("DELETE FROM results WHERE key = ?", [(k,) for k in keys])
+        for key in keys:
+            for field in BLOB_FIELDS:
+                try:
+                    os.remove(self._blob_path(key, field))
+                except OSError:
+                    pass
+
+    def stats(self) -> dict:
+        """Entry count, stored bytes and this process's hit/miss/eviction counters."""
+        conn = self._connection()
+        entries, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        return {
+            "path": self.db_path,
+            "model_version": self.model_version,
+            "entries": entries,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -28,6 +28,9 @@ def download_model():
         # The model is automatically cached by transformers
         # You can find it in: ~/.cache/huggingface/hub/
         print("\nModel is cached and ready to use!")
+        commit_hash = getattr(model.config, "_commit_hash", None)
+        if commit_hash:
+            print(f"Pin this snapshot for offline starts: MODEL_REVISION={commit_hash}")
         print("You can now run the model using run_model.py")
         
         return model, processor
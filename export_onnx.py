@@ -0,0 +1,39 @@
+"""
+Export the deepfake detector to ONNX for the ONNX Runtime backend.
+Traces SiglipForImageClassification with a dynamic batch axis, applies ONNX
+Runtime graph optimizations and saves model.onnx plus its preprocessing settings
+next to the Hugging Face cache (or in ONNX_MODEL_DIR / the given folder).
+
+Usage: python export_onnx.py [output_dir]
+"""
+import os
+import sys
+import time
+
+from onnx_backend import ONNX_OPSET, OnnxClassifier, default_onnx_dir, export_onnx
+from run_model import load_model
+
+
+def main():
+    model_dir = sys.argv[1] if len(sys.argv) > 1 else default_onnx_dir()
+    model, processor, _ = load_model()
+
+    print(f"\nExporting to ONNX (opset {ONNX_OPSET}, dynamic batch axis)...")
+    print(f"Output: {model_dir}")
+    start_time = time.time()
+    try:
+        model_path = export_onnx(model, processor, model_dir)
+    except Exception as e:
+        print(f"Error exporting model: {e}")
+        print("\nMake sure you have:")
+        print("  - onnx, onnxscript and onnxruntime installed: pip install onnx onnxscript onnxruntime")
+        raise
+    print(f"\n[SUCCESS] Exported in {time.time() - start_time:.1f} seconds")
+    print(f"Model file: {model_path} ({os.path.getsize(model_path) / (1024 * 1024):.1f} MB)")
+    print(f"Providers: {', '.join(OnnxClassifier(model_dir).providers)}")
+    print("\nServe it with INFERENCE_BACKEND=onnx (backend_api.py or run_model.py)")
+    print("Check parity with: python verify_onnx.py")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""
+Per-client fair sharing of the inference queue.
+Every request is tagged with a client id (configured API key, else IP address) and a
+lane: interactive single uploads are served ahead of background page scans.
+Within a lane, clients take turns by deficit round robin, so a client flooding
+the queue only delays its own requests. ClientGate adds per-client concurrency
+caps and token-bucket rate limits in front of it.
+"""
+import hashlib
+import math
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from functools import lru_cache
+from typing import Dict, Optional
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+LANES = (INTERACTIVE, BACKGROUND)
+# Smallest DRR weight: a client gets a turn at least every 1 / MIN_WEIGHT rounds
+MIN_WEIGHT = 0.01
+
+
+def _hash_key(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+
+@lru_cache(maxsize=4)
+def _configured_keys(value: str) -> frozenset:
+    return frozenset(_hash_key(key.strip()) for key in value.split(",") if key.strip())
+
+
+def client_identity(headers, remote_addr: Optional[str]) -> str:
+    """
+    Client id used for fair sharing and limits: a configured API key, else the IP address.
+
+    Only X-API-Key values listed in CLIENT_API_KEYS (comma-separated) count; any other key
+    is ignored, so a client cannot get a fresh bucket per request by inventing keys. Origin
+    is never used: every user of one site sends the same one. Keys are hashed so they never
+    appear in stats. The IP comes from the header named by CLIENT_IP_HEADER (e.g.
+    Fly-Client-IP behind fly.io's proxy) when set, else the peer.
+    """
+    api_key = headers.get("X-API-Key")
+    if api_key:
+        key_hash = _hash_key(api_key)
+        if key_hash in _configured_keys(os.environ.get('CLIENT_API_KEYS', '')):
+            return "key:" + key_hash[:12]
+    ip_header = os.environ.get('CLIENT_IP_HEADER')
+    ip = headers.get(ip_header) if ip_header else None
+    return "ip:" + (ip or remote_addr or "unknown")
+
+
+def request_lane(value: Optional[str], default: str = INTERACTIVE) -> str:
+    """Lane named by a request's 'priority' field; unknown values get the default."""
+    value = (value or "").lower()
+    return value if value in LANES else default
+
+
+def weights_from_env() -> Dict[str, float]:
+    """Per-client DRR weights from CLIENT_WEIGHTS ('key:3f2a9c1b7d4e=4,ip:10.0.0.5=2')."""
+    weights = {}
+    for entry in os.environ.get('CLIENT_WEIGHTS', '').split(','):
+        client, _, weight = entry.strip().rpartition('=')
+        if client:
+            weights[client] = float(weight)
+            if not (math.isfinite(weights[client]) and weights[client] > 0):
+                raise ValueError(f"CLIENT_WEIGHTS: weight for '{client}' must be a positive number, got '{weight}'")
+    return weights
+
+
+class FairQueue:
+    """
+    Bounded queue with an interactive and a background lane and deficit round robin
+    across clients within each lane.
+
+    Offers the subset of queue.Queue the batch scheduler uses. Interactive requests go
+    first, but at most interactive_burst in a row while background work waits, so page
+    scans are slowed rather than starved.
+    """
+
+    def __init__(self, maxsize: int, weights: Optional[Dict[str, float]] = None, interactive_burst: int = 8):
+        self.maxsize = max(1, int(maxsize))
+        # A weight <= 0 would never earn its client a turn and _pop would spin forever
+        self.weights = {client: weight if weight >= MIN_WEIGHT else MIN_WEIGHT
+                        for client, weight in (weights or {}).items()}
+        self.interactive_burst = max(1, int(interactive_burst))
+        self._cond = threading.Condition()
+        # Per lane: client -> deque of items, in round-robin order
+        self._lanes = {lane: OrderedDict() for lane in LANES}
+        self._deficit = {}
+        self._control = deque()
+        self._size = 0
+        self._streak = 0
+
+    def qsize(self) -> int:
+        with self._cond:
+            return self._size
+
+    def put_nowait(self, item, client: str = "", lane: str = INTERACTIVE):
+        """Queue a request; raises queue.Full at capacity."""
+        with self._cond:
+            if self._size >= self.maxsize:
+                raise queue.Full
+            self._lanes[lane].setdefault(client, deque()).append(item)
+            self._size += 1
+            self._cond.notify()
+
+    def put(self, item):
+        """Queue a control item (the scheduler's stop sentinel), delivered once no request is waiting."""
+        with self._cond:
+            self._control.append(item)
+            self._cond.notify()
+
+    def get(self, timeout: Optional[float] = None):
+        """Next item by lane and client turn; raises queue.Empty after timeout seconds."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not self._size and not self._control:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise queue.Empty
+                self._cond.wait(remaining)
+            return self._pop()
+
+    def get_nowait(self):
+        return self.get(timeout=0)
+
+    def depths(self) -> dict:
+        """Waiting requests per lane and client."""
+        with self._cond:
+            return {lane: {client: len(items) for client, items in clients.items()}
+                    for lane, clients in self._lanes.items()}
+
+    def _pop(self):
+        lanes = LANES
+        if self._lanes[BACKGROUND] and (not self._lanes[INTERACTIVE] or self._streak >= self.interactive_burst):
+            lanes = (BACKGROUND,)
+        for lane in lanes:
+            clients = self._lanes[lane]
+            while clients:
+                client, items = next(iter(clients.items()))
+                key = (lane, client)
+                deficit = self._deficit.get(key, 0.0)
+                if deficit < 1.0:
+                    # New round for this client: add its quantum
+                    deficit += self.weights.get(client, 1.0)
+                if deficit < 1.0:
+                    self._deficit[key] = deficit
+                    clients.move_to_end(client)
+                    continue
+                item = items.popleft()
+                self._size -= 1
+                self._streak = self._streak + 1 if lane == INTERACTIVE else 0
+                if not items:
+                    del clients[client]
+                    self._deficit.pop(key, None)
+                else:
+                    self._deficit[key] = deficit - 1.0
+                    if deficit - 1.0 < 1.0:
+                        clients.move_to_end(client)
+                return item
+        return self._control.popleft()
+
+
+class ClientLimitError(RuntimeError):
+    """Raised when a client exceeds its concurrency cap or request rate."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _ClientState:
+    __slots__ = ("in_flight", "tokens", "updated")
+
+    def __init__(self, tokens: float, now: float):
+        self.in_flight = 0
+        self.tokens = tokens
+        self.updated = now
+
+
+class ClientGate:
+    """Per-client concurrency caps and token-bucket rate limits."""
+
+    def __init__(self, max_concurrent: int = 8, rate: float = 0.0, burst: Optional[float] = None,
+                 max_clients: int = 10000):
+        """
+        Args:
+            max_concurrent: Requests one client may have in progress (0: unlimited)
+            rate: Images per second a client may submit on average (0: unlimited)
+            burst: Bucket size, the images a client may submit at once (default: 2 x rate, at least 1)
+            max_clients: Idle clients are forgotten beyond this many tracked clients
+        """
+        self.max_concurrent = max(0, int(max_concurrent))
+        self.rate = max(0.0, float(rate))
+        self.burst = float(burst) if burst else max(1.0, 2 * self.rate)
+        self.max_clients = max(1, int(max_clients))
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._counters = {"accepted": 0, "rejected_concurrency": 0, "rejected_rate": 0}
+
+    @classmethod
+    def from_env(cls):
+        """Create a gate configured from CLIENT_* environment variables."""
+        return cls(
+            max_concurrent=int(os.environ.get('CLIENT_MAX_CONCURRENT', 8)),
+            rate=float(os.environ.get('CLIENT_RATE_PER_S', 0)),
+            burst=float(os.environ.get('CLIENT_BURST', 0)) or None,
+        )
+
+    def acquire(self, client: str, cost: float = 1.0):
+        """
+        Start a request of `cost` images for a client; pair every successful call with release().
+
+        Raises:
+            ClientLimitError: The client is at its concurrency cap or out of tokens
+        """
+        now = time.monotonic()
+        with self._lock:
+            state = self._clients.get(client)
+            if state is None:
+                if len(self._clients) >= self.max_clients:
+                    self._prune(now)
+                state = self._clients[client] = _ClientState(self.burst, now)
+            if self.max_concurrent and state.in_flight >= self.max_concurrent:
+                self._counters["rejected_concurrency"] += 1
+                raise ClientLimitError(f"Too many concurrent requests (limit {self.max_concurrent} per client)", 1)
+            if self.rate:
+                state.tokens = min(self.burst, state.tokens + (now - state.updated) * self.rate)
+                state.updated = now
+                # A batch larger than the bucket needs a full bucket and leaves it in debt, so
+                # every image is paid for before the client's next request gets through
+                needed = min(cost, self.burst)
+                if state.tokens < needed:
+                    self._counters["rejected_rate"] += 1
+                    retry_after = max(1, int((needed - state.tokens) / self.rate + 0.999))
+                    raise ClientLimitError(f"Rate limit exceeded ({self.rate:g} images/s per client)", retry_after)
+                state.tokens -= cost
+            state.in_flight += 1
+            self._counters["accepted"] += 1
+
+    def release(self, client: str):
+        with self._lock:
+            state = self._clients.get(client)
+            if state is not None:
+                state.in_flight -= 1
+
+    def _prune(self, now: float):
+        # Forget clients with nothing in flight whose bucket has refilled
+        for client, state in list(self._clients.items()):
+            refilled = not self.rate or state.tokens + (now - state.updated) * self.rate >= self.burst
+            if state.in_flight == 0 and refilled:
+                del self._clients[client]
+
+    def stats(self) -> dict:
+        """Limits, counters and the clients with requests in progress."""
+        with self._lock:
+            return dict(
+                self._counters,
+                max_concurrent=self.max_concurrent or None,
+                rate_per_s=self.rate or None,
+                burst=self.burst if self.rate else None,
+                tracked_clients=len(self._clients),
+                in_flight={client: state.in_flight for client, state in self._clients.items() if state.in_flight},
+            )
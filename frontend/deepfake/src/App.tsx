@@ -69,6 +69,8 @@ function App() {
     try {
       const formData = new FormData()
       formData.append('image', selectedImage)
+      // The results page shows the heatmap, so ask for it in the same response
+      formData.append('heatmap', 'inline')
 
       const apiUrl = import.meta.env.VITE_API_URL || 'http://localhost:5000'
       const response = await fetch(`${apiUrl}/api/detect`, {
@@ -7,22 +7,24 @@ import torch.nn.functional as F
 import numpy as np
 from PIL import Image
 from typing import Tuple, Optional
+from contextlib import contextmanager
 import io
+import json
+import logging
 import base64
+import threading
+import time
+import weakref
 
-# Try to import cv2, fallback to PIL if not available
-try:
-    import cv2
-    CV2_AVAILABLE = True
-except ImportError:
-    CV2_AVAILABLE = False
+from heatmap_renderer import RENDER_MAX_DIM, render_heatmap_overlay
+from lazy_imports import lazy_import
+from preprocessing import get_preprocessor
 
-# Try to import matplotlib for colormap fallback
-try:
-    from matplotlib.cm import get_cmap
-    MATPLOTLIB_AVAILABLE = True
-except ImportError:
-    MATPLOTLIB_AVAILABLE = False
+log = logging.getLogger(__name__)
+
+# cv2 is imported when the first heatmap needs it; fall back to PIL if not available
+cv2 = lazy_import("cv2")
+CV2_AVAILABLE = cv2 is not None
 
 
 class GradCAM:
@@ -32,6 +34,9 @@ class GradCAM:
         """
         Initialize Grad-CAM.
         
+        The target layer is located once here. Hooks are only attached while an
+        explanation is running, so ordinary forwards pay nothing for them.
+        
         Args:
             model: The SiglipForImageClassification model
             processor: The AutoImageProcessor
@@ -39,15 +44,19 @@ class GradCAM:
         """
         self.model = model
         self.processor = processor
+        self.preprocess = get_preprocessor(processor)
         self.device = device
         self.gradients = None
         self.activations = None
+        self._handles = []
+        self._capture_thread = None
+        self._lock = threading.Lock()
         
-        # Register hooks to capture gradients and activations
-        self._register_hooks()
+        # Locate the layer whose activations and gradients are captured
+        self._find_target_layer()
     
-    def _register_hooks(self):
-        """Register forward and backward hooks on the vision encoder."""
+    def _find_target_layer(self):
+        """Find the target layer in the vision encoder."""
         # SigLIP models have a vision_model attribute
         if hasattr(self.model, 'siglip'):
             vision_model = self.model.siglip.vision_model
@@ -81,18 +90,29 @@ class GradCAM:
                     self.target_layer = encoder
             else:
                 self.target_layer = vision_model
-        
-        # Register hooks
-        self.target_layer.register_forward_hook(self._forward_hook)
-        self.target_layer.register_full_backward_hook(self._backward_hook)
     
-    def _forward_hook(self, module, input, output):
-        """Capture activations during forward pass."""
-        self.activations = output
+    @contextmanager
+    def _capture(self):
+        """Attach the forward hook for the duration of one explanation, then remove it."""
+        self._capture_thread = threading.get_ident()
+        self._handles = [self.target_layer.register_forward_hook(self._forward_hook)]
+        try:
+            yield
+        finally:
+            for handle in self._handles:
+                handle.remove()
+            self._handles = []
+            self._capture_thread = None
+            # Release captured tensors (and the autograd graph they hold)
+            self.activations = None
+            self.gradients = None
     
-    def _backward_hook(self, module, grad_input, grad_output):
-        """Capture gradients during backward pass."""
-        self.gradients = grad_output[0]
+    def _forward_hook(self, module, input, output):
+        """Capture activations during the grad-enabled forward of the explaining thread."""
+        # Forwards from other threads (e.g. the batch scheduler) must not overwrite the capture
+        if threading.get_ident() != self._capture_thread or not torch.is_grad_enabled():
+            return
+        self.activations = output[0] if isinstance(output, tuple) else output
     
     def generate_cam(self, input_image: Image.Image, target_class: Optional[int] = None, is_fake: bool = True) -> Tuple[np.ndarray, np.ndarray]:
         """
@@ -106,43 +126,130 @@ class GradCAM:
         Returns:
             Tuple of (heatmap, overlay_image) as numpy arrays
         """
+        with self._lock, self._capture():
+            return self._generate_cam(input_image, target_class, is_fake)
+    
+    def _generate_cam(self, input_image: Image.Image, target_class: Optional[int], is_fake: bool) -> Tuple[np.ndarray, np.ndarray]:
+        """Grad-CAM computation; runs with hooks attached (see generate_cam)."""
         # Preprocess image
-        inputs = self.processor(images=input_image, return_tensors="pt")
-        inputs = {k: v.to(self.device) for k, v in inputs.items()}
+        inputs = self.preprocess.inputs(input_image, self.device)
         
-        # Forward pass
-        self.model.eval()
-        self.gradients = None
-        self.activations = None
+        if self._backward_for_class(inputs, target_class) is None:
+            # Fallback: use simpler attention method
+            target_class = 0 if target_class is None else target_class
+            return self._generate_attention_fallback(input_image, target_class, is_fake=is_fake)
+        return self._render_cam(input_image, is_fake)
+    
+    def compute_cam(self, input_image: Image.Image, target_class: Optional[int] = None) -> Optional[np.ndarray]:
+        """
+        Compute only the low-resolution CAM grid (no colormap or overlay rendering).
         
-        # Get prediction first
-        with torch.no_grad():
-            outputs = self.model(**inputs)
-            logits = outputs.logits
-            probs = F.softmax(logits, dim=1)
+        Args:
+            input_image: PIL Image to analyze
+            target_class: Class index to explain (None = use predicted class)
         
-        if target_class is None:
-            target_class = torch.argmax(probs, dim=1).item()
+        Returns:
+            2D CAM grid normalized to 0-1, or None if activations were not captured
+        """
+        with self._lock, self._capture():
+            inputs = self.preprocess.inputs(input_image, self.device)
+            if self._backward_for_class(inputs, target_class) is None:
+                return None
+            return self._compute_cam_grid()
+    
+    def classify_and_compute_cam(self, input_image: Image.Image, timings: Optional[dict] = None) -> Tuple[torch.Tensor, np.ndarray]:
+        """
+        Fused classification + low-resolution CAM in one grad-enabled forward.
         
-        # Backward pass with gradients enabled
-        self.model.zero_grad()
-        inputs['pixel_values'].requires_grad = True
+        Args:
+            input_image: PIL Image to analyze
+            timings: Optional dict filled with per-stage durations in seconds
         
-        outputs = self.model(**inputs)
-        logits = outputs.logits
+        Returns:
+            Tuple of (probabilities [num_labels] on CPU, CAM grid)
+        """
+        timings = {} if timings is None else timings
+        with self._lock, self._capture():
+            start = time.time()
+            inputs = self.preprocess.inputs(input_image, self.device)
+            timings["preprocess"] = time.time() - start
+            
+            start = time.time()
+            logits = self._backward_for_class(inputs, None)
+            if logits is None:
+                raise RuntimeError("Target layer activations were not captured")
+            probs = F.softmax(logits.float(), dim=1)[0].cpu()
+            cam = self._compute_cam_grid()
+            timings["forward_backward"] = time.time() - start
+            return probs, cam
+    
+    def classify_and_explain(self, input_image: Image.Image, timings: Optional[dict] = None) -> Tuple[torch.Tensor, np.ndarray, np.ndarray]:
+        """
+        Classify and explain in a single pass.
         
-        # Backward pass for target class
-        target = logits[0, target_class]
-        target.backward()
+        Preprocesses once and runs one grad-enabled forward whose logits give both
+        the class probabilities and the backward target (the predicted class).
         
-        # Get gradients and activations
-        if self.gradients is None or self.activations is None:
-            # Fallback: use simpler attention method
-            return self._generate_attention_fallback(input_image, target_class, is_fake=is_fake)
+        Args:
+            input_image: PIL Image to analyze
+            timings: Optional dict filled with per-stage durations in seconds
+        
+        Returns:
+            Tuple of (probabilities [num_labels] on CPU, heatmap, overlay_image)
+        """
+        timings = {} if timings is None else timings
+        probs, cam = self.classify_and_compute_cam(input_image, timings=timings)
+        start = time.time()
+        is_fake = bool(torch.argmax(probs).item() == 0)
+        heatmap, overlay = self.render_overlay(input_image, cam, is_fake)
+        timings["render"] = time.time() - start
+        return probs, heatmap, overlay
+    
+    def _backward_for_class(self, inputs: dict, target_class: Optional[int]) -> Optional[torch.Tensor]:
+        """
+        Run one grad-enabled forward and compute gradients of the target class
+        w.r.t. the captured activations.
+        
+        Args:
+            inputs: Preprocessed model inputs on the target device
+            target_class: Class index (None = use the predicted class from this forward)
+        
+        Returns:
+            Detached logits of the forward, or None if activations were not captured
+        """
+        self.model.eval()
+        self.gradients = None
+        self.activations = None
         
+        with torch.enable_grad():
+            logits = self.model(**inputs).logits
+            if self.activations is None or not self.activations.requires_grad:
+                return None
+            
+            if target_class is None:
+                target_class = torch.argmax(logits, dim=1).item()
+            
+            # Gradient of the target class w.r.t. the captured activations only,
+            # so no .grad buffers are accumulated on the model parameters
+            target = logits[0, target_class]
+            self.gradients = torch.autograd.grad(target, self.activations)[0]
+        return logits.detach()
+    
+    def _render_cam(self, input_image: Image.Image, is_fake: bool) -> Tuple[np.ndarray, np.ndarray]:
+        """Turn captured activations and gradients into (heatmap, overlay) at image resolution."""
+        return self.render_overlay(input_image, self._compute_cam_grid(), is_fake)
+    
+    def _compute_cam_grid(self) -> np.ndarray:
+        """
+        Compute the thresholded CAM at the target layer's (patch grid) resolution.
+        
+        Returns:
+            2D float array normalized to 0-1, e.g. 14x14 for a 224px/16px ViT
+        """
         # Process gradients and activations
-        gradients = self.gradients[0].cpu().data.numpy()
-        activations = self.activations[0].cpu().data.numpy()
+        # float() first: NumPy has no bfloat16 (MODEL_PRECISION=bf16)
+        gradients = self.gradients[0].detach().float().cpu().numpy()
+        activations = self.activations[0].detach().float().cpu().numpy()
         
         # Handle different activation shapes
         if len(activations.shape) == 4:  # [batch, channels, height, width]
@@ -176,34 +283,24 @@ class GradCAM:
             cam_thresholded = cam_thresholded / cam_thresholded.max()
         else:
             cam_thresholded = cam
+        return cam_thresholded.astype(np.float32)
+    
+    def render_overlay(self, input_image: Image.Image, cam_thresholded: np.ndarray, is_fake: bool,
+                       with_heatmap: bool = True) -> Tuple[Optional[np.ndarray], np.ndarray]:
+        """
+        Colorize a low-resolution CAM and blend it over the image at the image's resolution.
         
-        # Resize thresholded CAM to original image size
-        original_size = input_image.size
-        
-        if CV2_AVAILABLE:
-            cam_resized = cv2.resize(cam_thresholded, original_size, interpolation=cv2.INTER_LINEAR)
-            # For fake: red/yellow patches, For real: green only
-            if is_fake:
-                # Create patched red/yellow colormap (not smooth gradient)
-                heatmap = self._apply_colormap_jet(cam_resized)
-            else:
-                # For real images, use only green color
-                heatmap = self._apply_green_colormap(cam_resized)
-                heatmap = cv2.cvtColor(heatmap, cv2.COLOR_BGR2RGB)
-        else:
-            # PIL fallback
-            cam_pil = Image.fromarray((cam_thresholded * 255).astype(np.uint8))
-            cam_resized = np.array(cam_pil.resize(original_size, Image.Resampling.LANCZOS)) / 255.0
-            if is_fake:
-                heatmap = self._apply_colormap_jet(cam_resized)
-            else:
-                heatmap = self._apply_green_colormap(cam_resized)
-        
-        # Overlay on original image with selective blending
-        original_array = np.array(input_image)
-        overlay = self._overlay_heatmap_forensic(original_array, heatmap, cam_resized, alpha=0.5)
+        Args:
+            input_image: PIL Image to draw on (pass a downscaled copy to render smaller)
+            cam_thresholded: CAM grid from _compute_cam_grid (0-1)
+            is_fake: Red/yellow patches (True) or green (False)
+            with_heatmap: Also return the colorized heatmap array
         
-        return heatmap, overlay
+        Returns:
+            Tuple of (heatmap or None, overlay_image) as numpy arrays
+        """
+        # Lookup-table colorization and fixed-point blending (see heatmap_renderer)
+        return render_heatmap_overlay(input_image, cam_thresholded, is_fake, alpha=0.5, with_heatmap=with_heatmap)
     
     def _apply_colormap_jet(self, cam: np.ndarray) -> np.ndarray:
         """
@@ -364,13 +461,12 @@ class GradCAM:
             overlay = (original.astype(np.float32) * (1 - alpha) + heatmap.astype(np.float32) * alpha).astype(np.uint8)
         return overlay
     
-    def _generate_attention_fallback(self, input_image: Image.Image, target_class: int) -> Tuple[np.ndarray, np.ndarray]:
+    def _generate_attention_fallback(self, input_image: Image.Image, target_class: int, is_fake: bool = True) -> Tuple[np.ndarray, np.ndarray]:
         """
         Fallback method using model attention weights if Grad-CAM fails.
         """
         # Simple attention visualization based on model features
-        inputs = self.processor(images=input_image, return_tensors="pt")
-        inputs = {k: v.to(self.device) for k, v in inputs.items()}
+        inputs = self.preprocess.inputs(input_image, self.device)
         
         with torch.no_grad():
             # Get intermediate features
@@ -386,7 +482,7 @@ class GradCAM:
                     heatmap = cv2.applyColorMap(np.uint8(255 * attention_map), cv2.COLORMAP_HOT)
                     heatmap = cv2.cvtColor(heatmap, cv2.COLOR_BGR2RGB)
                 else:
-                    heatmap = self._apply_colormap_forensic(attention_map)
+                    heatmap = self._apply_colormap_jet(attention_map)
                 original_array = np.array(input_image)
                 overlay = self._overlay_heatmap_forensic(original_array, heatmap, attention_map, alpha=0.3)
                 return heatmap, overlay
@@ -402,9 +498,9 @@ class GradCAM:
             # Compute attention weights (simplified)
             if len(features.shape) == 3:  # [batch, seq_len, hidden_dim]
                 # Average over sequence dimension
-                attention_weights = torch.mean(torch.abs(features), dim=-1).squeeze().cpu().numpy()
+                attention_weights = torch.mean(torch.abs(features), dim=-1).squeeze().float().cpu().numpy()
             else:
-                attention_weights = torch.mean(torch.abs(features), dim=-1).squeeze().cpu().numpy()
+                attention_weights = torch.mean(torch.abs(features), dim=-1).squeeze().float().cpu().numpy()
         
         # Reshape to spatial dimensions (approximate)
         original_size = input_image.size
@@ -482,12 +578,38 @@ class GradCAM:
         return img_str
 
 
+# One long-lived explainer per loaded model
+_explainers = weakref.WeakKeyDictionary()
+_explainers_lock = threading.Lock()
+
+
+def get_gradcam(model, processor, device) -> GradCAM:
+    """
+    Return the shared GradCAM explainer for a model, creating it on first use.
+    
+    Args:
+        model: The SiglipForImageClassification model
+        processor: The AutoImageProcessor
+        device: Device to run on
+    
+    Returns:
+        GradCAM instance reused across requests
+    """
+    with _explainers_lock:
+        gradcam = _explainers.get(model)
+        if gradcam is None or gradcam.processor is not processor or gradcam.device != device:
+            gradcam = GradCAM(model, processor, device)
+            _explainers[model] = gradcam
+        return gradcam
+
+
 def generate_gradcam_visualization(
     model, 
     processor, 
     device, 
     image: Image.Image, 
-    target_class: Optional[int] = None
+    target_class: Optional[int] = None,
+    is_fake: bool = True
 ) -> Tuple[str, str]:
     """
     Generate Grad-CAM visualization for an image.
@@ -498,16 +620,17 @@ def generate_gradcam_visualization(
         device: Device to run on
         image: PIL Image to analyze
         target_class: Class index (None = use predicted class)
+        is_fake: Whether the image was classified as fake (red/yellow) or real (green)
     
     Returns:
         Tuple of (original_image_base64, heatmap_overlay_base64)
     """
     try:
-        # Initialize Grad-CAM
-        gradcam = GradCAM(model, processor, device)
+        # Reuse the explainer for this model
+        gradcam = get_gradcam(model, processor, device)
         
         # Generate heatmap and overlay
-        heatmap, overlay = gradcam.generate_cam(image, target_class)
+        heatmap, overlay = gradcam.generate_cam(image, target_class, is_fake=is_fake)
         
         # Convert original image to base64
         original_base64 = gradcam.image_to_base64(np.array(image))
@@ -517,11 +640,8 @@ def generate_gradcam_visualization(
         
         return original_base64, overlay_base64
     
-    except Exception as e:
-        print(f"[WARNING] Grad-CAM visualization failed: {e}")
-        import traceback
-        traceback.print_exc()
-        print("Falling back to returning original image only...")
+    except Exception:
+        log.exception("Grad-CAM visualization failed, falling back to the original image only")
         
         # Fallback: return original image twice
         buffer = io.BytesIO()
@@ -529,3 +649,202 @@ def generate_gradcam_visualization(
         img_str = base64.b64encode(buffer.getvalue()).decode('utf-8')
         
         return img_str, img_str
+
+
+# Heatmap transport options (see normalize_visualization_options)
+VISUALIZATION_FORMATS = ("png", "jpeg", "webp", "cam")
+DEFAULT_VISUALIZATION_OPTIONS = {
+    "format": "png",          # png | jpeg | webp | cam (raw low-resolution CAM grid)
+    "max_dim": None,          # cap on the longest side of rendered images (None = HEATMAP_RENDER_MAX_DIM)
+    "quality": 85,            # JPEG/WebP quality
+    "include_original": True, # echo the original image back
+    "cam_dtype": "uint8",     # uint8 (base64 bytes) or float (list) for the cam format
+}
+
+
+def normalize_visualization_options(raw: Optional[dict] = None) -> dict:
+    """
+    Validate heatmap transport options, filling in defaults.
+    
+    Args:
+        raw: Dict with any of format, max_dim, quality, include_original, cam_dtype
+             (string values from form fields are accepted)
+    
+    Returns:
+        Normalized options dict
+    """
+    options = dict(DEFAULT_VISUALIZATION_OPTIONS)
+    raw = raw or {}
+    if raw.get("format"):
+        fmt = str(raw["format"]).lower()
+        fmt = "jpeg" if fmt == "jpg" else fmt
+        if fmt not in VISUALIZATION_FORMATS:
+            raise ValueError(f"Unsupported heatmap format '{fmt}' (use one of {', '.join(VISUALIZATION_FORMATS)})")
+        options["format"] = fmt
+    if raw.get("max_dim") not in (None, "", 0, "0"):
+        options["max_dim"] = max(16, int(raw["max_dim"]))
+    if raw.get("quality") not in (None, ""):
+        options["quality"] = min(100, max(1, int(raw["quality"])))
+    if raw.get("include_original") not in (None, ""):
+        options["include_original"] = str(raw["include_original"]).lower() in ("1", "true", "yes")
+    if raw.get("cam_dtype"):
+        options["cam_dtype"] = "float" if str(raw["cam_dtype"]).lower().startswith("float") else "uint8"
+    return options
+
+
+def render_max_dim(options: Optional[dict] = None) -> int:
+    """Longest side rendered overlays are drawn at for these transport options."""
+    max_dim = (options or {}).get("max_dim")
+    return min(max_dim or RENDER_MAX_DIM, RENDER_MAX_DIM)
+
+
+def _fit_to_max_dim(image: Image.Image, max_dim: Optional[int]) -> Image.Image:
+    """Downscale an image so its longest side is at most max_dim."""
+    if not max_dim or max(image.size) <= max_dim:
+        return image
+    scale = max_dim / max(image.size)
+    size = (max(1, round(image.size[0] * scale)), max(1, round(image.size[1] * scale)))
+    return image.resize(size, Image.Resampling.BILINEAR, reducing_gap=2.0)
+
+
+def encode_image_bytes(image_array: np.ndarray, fmt: str = "png", quality: int = 85) -> bytes:
+    """
+    Encode an RGB numpy image as PNG, JPEG or WebP.
+    
+    Args:
+        image_array: Image as numpy array (RGB)
+        fmt: png, jpeg or webp
+        quality: JPEG/WebP quality
+    
+    Returns:
+        Encoded bytes
+    """
+    if image_array.dtype != np.uint8:
+        image_array = (image_array * 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    pil_image = Image.fromarray(image_array)
+    if fmt == "png":
+        pil_image.save(buffer, format="PNG")
+    elif fmt == "jpeg":
+        pil_image.save(buffer, format="JPEG", quality=quality)
+    else:
+        pil_image.save(buffer, format="WEBP", quality=quality)
+    return buffer.getvalue()
+
+
+def encode_visualization(gradcam: GradCAM, image: Image.Image, cam: Optional[np.ndarray], is_fake: bool,
+                         options: Optional[dict] = None, target_class: Optional[int] = None) -> dict:
+    """
+    Render (if needed) and encode a CAM according to the transport options.
+    
+    Args:
+        gradcam: The GradCAM explainer that produced the CAM
+        image: Original PIL Image
+        cam: Low-resolution CAM grid (None if Grad-CAM could not capture activations)
+        is_fake: Red/yellow (True) or green (False) colorization
+        options: Transport options (see normalize_visualization_options)
+        target_class: Class explained (used by the attention fallback)
+    
+    Returns:
+        Dict with the encoded heatmap fields and an 'encoding' report (format, bytes, timings)
+    """
+    options = normalize_visualization_options(options)
+    fmt = options["format"]
+    payload = {"format": fmt}
+    report = {"format": fmt}
+    
+    if fmt == "cam":
+        if cam is None:
+            raise RuntimeError("Grad-CAM grid not available for this image")
+        start = time.time()
+        grid = {"height": int(cam.shape[0]), "width": int(cam.shape[1]), "dtype": options["cam_dtype"],
+                "colormap": "red_yellow" if is_fake else "green"}
+        if options["cam_dtype"] == "float":
+            grid["data"] = [round(float(v), 4) for v in cam.flatten()]
+            report["cam_bytes"] = len(json.dumps(grid["data"]))
+        else:
+            raw = np.round(cam * 255).astype(np.uint8).tobytes()
+            grid["data"] = base64.b64encode(raw).decode("utf-8")
+            report["cam_bytes"] = len(raw)
+        payload["cam"] = grid
+        report["encode_time"] = round((time.time() - start) * 1000, 2)  # ms
+        payload["encoding"] = report
+        return payload
+    
+    # Render at the capped resolution, not the upload's full resolution
+    start = time.time()
+    render_image = _fit_to_max_dim(image, render_max_dim(options))
+    if cam is not None:
+        _, overlay = gradcam.render_overlay(render_image, cam, is_fake, with_heatmap=False)
+    else:
+        _, overlay = gradcam._generate_attention_fallback(render_image, target_class or 0, is_fake=is_fake)
+    report["render_time"] = round((time.time() - start) * 1000, 2)  # ms
+    report["output_size"] = list(render_image.size)
+    
+    mime = "image/png" if fmt == "png" else f"image/{fmt}"
+    start = time.time()
+    overlay_bytes = encode_image_bytes(overlay, fmt, options["quality"])
+    payload["heatmap_overlay"] = f"data:{mime};base64,{base64.b64encode(overlay_bytes).decode('utf-8')}"
+    report["overlay_bytes"] = len(overlay_bytes)
+    if options["include_original"]:
+        original_bytes = encode_image_bytes(np.array(render_image), fmt, options["quality"])
+        payload["original_image"] = f"data:{mime};base64,{base64.b64encode(original_bytes).decode('utf-8')}"
+        report["original_bytes"] = len(original_bytes)
+    report["encode_time"] = round((time.time() - start) * 1000, 2)  # ms
+    payload["encoding"] = report
+    return payload
+
+
+def generate_visualization_payload(model, processor, device, image: Image.Image, target_class: Optional[int] = None,
+                                   is_fake: bool = True, options: Optional[dict] = None,
+                                   render_image: Optional[Image.Image] = None) -> dict:
+    """
+    Generate a Grad-CAM visualization encoded according to the transport options.
+    
+    Args:
+        model: The SiglipForImageClassification model
+        processor: The AutoImageProcessor
+        device: Device to run on
+        image: PIL Image to analyze
+        target_class: Class index (None = use predicted class)
+        is_fake: Whether the image was classified as fake (red/yellow) or real (green)
+        options: Transport options (see normalize_visualization_options)
+        render_image: Higher-resolution copy to draw the overlay on (None = image)
+    
+    Returns:
+        Visualization fields (see encode_visualization)
+    """
+    gradcam = get_gradcam(model, processor, device)
+    cam = gradcam.compute_cam(image, target_class)
+    if render_image is None:
+        render_image = image
+    return encode_visualization(gradcam, render_image, cam, is_fake, options, target_class)
+
+
+def classify_with_gradcam(model, processor, device, image: Image.Image, timings: Optional[dict] = None,
+                          options: Optional[dict] = None, render_image: Optional[Image.Image] = None) -> Tuple[list, dict]:
+    """
+    Fused classification + Grad-CAM: one preprocessing pass and one grad-enabled forward.
+    
+    Args:
+        model: The SiglipForImageClassification model
+        processor: The AutoImageProcessor
+        device: Device to run on
+        image: PIL Image to analyze
+        timings: Optional dict filled with per-stage durations in seconds
+        options: Heatmap transport options (see normalize_visualization_options)
+        render_image: Higher-resolution copy to draw the overlay on (None = image)
+    
+    Returns:
+        Tuple of (probabilities list, visualization fields from encode_visualization)
+    """
+    timings = {} if timings is None else timings
+    gradcam = get_gradcam(model, processor, device)
+    probs, cam = gradcam.classify_and_compute_cam(image, timings=timings)
+    start = time.time()
+    is_fake = bool(torch.argmax(probs).item() == 0)
+    if render_image is None:
+        render_image = image
+    payload = encode_visualization(gradcam, render_image, cam, is_fake, options)
+    timings["render"] = time.time() - start
+    return probs.tolist(), payload
@@ -0,0 +1,76 @@
+"""
+Pre-fork production server configuration (Linux/macOS).
+The master process loads and warms up the model once, then forks WEB_WORKERS
+workers that share its weights copy-on-write. Each worker gets its own slice of
+the CPU cores for torch, and workers are recycled after WORKER_MAX_REQUESTS
+requests without reloading the model (new workers fork from the master again).
+
+With INFERENCE_MODE=ring the master instead forks one model-owner process and
+the workers become front-ends that only decode and preprocess (see shm_ring.py).
+
+Usage: gunicorn -c gunicorn.conf.py backend_api:app
+"""
+import gc
+import os
+
+cpu_count = os.cpu_count() or 1
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_WORKERS', cpu_count))
+# Threads per worker, so the micro-batching scheduler still sees concurrent requests
+worker_class = "gthread"
+threads = int(os.environ.get('WEB_THREADS', 4))
+# Import the app in the master so the model can be loaded before forking
+preload_app = True
+
+# Graceful recycling: a worker finishes its in-flight requests and is replaced
+max_requests = int(os.environ.get('WORKER_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('WORKER_MAX_REQUESTS_JITTER', max(1, max_requests // 10)))
+graceful_timeout = int(os.environ.get('WORKER_GRACEFUL_TIMEOUT', 30))
+timeout = int(os.environ.get('WORKER_TIMEOUT', 120))
+
+ring_mode = os.environ.get('INFERENCE_MODE', 'local').lower() == 'ring'
+
+# Intra-op torch threads per worker; workers * threads should not exceed the cores.
+# Ring front-ends only preprocess, so one thread each leaves the cores to the model owner.
+torch_threads = int(os.environ.get('TORCH_THREADS_PER_WORKER',
+                                   1 if ring_mode else max(1, cpu_count // max(1, workers))))
+
+# Deferred heatmaps live in the worker that queued them, and the follow-up
+# /api/visualization/<id> request may land on another one
+if workers > 1 and not ring_mode:
+    os.environ.setdefault('HEATMAP_MODE', 'inline')
+
+
+def when_ready(server):
+    """Load the model in the master (or start the ring's model owner), before any worker is forked."""
+    import backend_api
+    import torch
+    if ring_mode:
+        # Only the owner touches the model (and CUDA), so any number of front-ends is fine
+        backend_api.start_ring_inference()
+        gc.freeze()
+        server.log.info(f"Model-owner process ready; forking {server.num_workers} front-end worker(s)")
+        return
+    if workers > 1 and torch.cuda.is_available():
+        # CUDA cannot be used in a child forked after the parent initialized it
+        server.log.warning("CUDA is not fork-safe; serving with a single worker")
+        server.num_workers = 1
+    backend_api.load_model()
+    # Move everything allocated so far out of the collector's reach, so garbage
+    # collections in workers do not write to (and un-share) the master's objects
+    gc.freeze()
+    server.log.info(f"Model loaded in master; forking {server.num_workers} worker(s) "
+                    f"with {torch_threads} torch thread(s) each")
+
+
+def post_fork(server, worker):
+    """Rebuild per-process threads and connections, and pin this worker's torch threads."""
+    import backend_api
+    backend_api.init_worker(torch_threads)
+
+
+def child_exit(server, worker):
+    """Archive the exited worker's metrics rows in the master, once its pid is reaped."""
+    import metrics
+    metrics.registry.release_process(worker.pid)
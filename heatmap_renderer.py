@@ -0,0 +1,158 @@
+"""
+Lookup-table heatmap renderer for Grad-CAM overlays.
+Thresholds are computed once on a small upsample of the CAM grid, colors come from a
+256-entry uint8 lookup table and blending is done in uint16 fixed point, so no
+full-resolution float arrays are allocated.
+"""
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from lazy_imports import lazy_import
+
+# Imported on first render, not at server start
+cv2 = lazy_import("cv2")
+CV2_AVAILABLE = cv2 is not None
+
+# Longest side of rendered overlays unless the request asks for something smaller
+RENDER_MAX_DIM = int(os.environ.get('HEATMAP_RENDER_MAX_DIM', 2048))
+
+# Side of the upsampled CAM the fake thresholds are measured on. The value distribution
+# of a bilinear upsample barely changes with output size, so this stands in for full resolution.
+THRESHOLD_GRID = 256
+
+RED = (255, 0, 0)
+YELLOW = (255, 255, 0)
+LEVELS = np.arange(256, dtype=np.float32) / 255.0
+
+
+def _percentile(values: np.ndarray, q: float) -> float:
+    """Linear-interpolated percentile (same as np.percentile) using np.partition instead of a sort."""
+    n = values.size
+    position = q / 100.0 * (n - 1)
+    lo = int(np.floor(position))
+    hi = min(lo + 1, n - 1)
+    part = np.partition(values, (lo, hi))
+    return float(part[lo] + (part[hi] - part[lo]) * (position - lo))
+
+
+def cam_thresholds(cam: np.ndarray) -> Tuple[float, float]:
+    """
+    Yellow and red thresholds for the fake (red/yellow patch) colormap.
+
+    Args:
+        cam: Low-resolution CAM grid (0-1, thresholded)
+
+    Returns:
+        Tuple of (yellow_threshold, red_threshold)
+    """
+    proxy = upsample_cam(cam, (THRESHOLD_GRID, THRESHOLD_GRID)).astype(np.float32) / 255.0
+    peak = float(proxy.max()) if proxy.size else 0.0
+    positive = proxy[proxy > 0]
+    if peak <= 0 or positive.size == 0:
+        return 0.3, 0.7
+    # Red for the top half of highlighted values, yellow for the next 30%
+    red = _percentile(positive, 50)
+    yellow = _percentile(positive, 20)
+    if red > peak * 0.9:
+        red = peak * 0.6
+    if yellow > peak * 0.8:
+        yellow = peak * 0.3
+    return yellow, red
+
+
+def colormap_lut(cam: np.ndarray, is_fake: bool) -> np.ndarray:
+    """
+    256-entry RGB lookup table indexed by the quantized CAM value.
+
+    Args:
+        cam: Low-resolution CAM grid (0-1), used for the fake thresholds
+        is_fake: Red/yellow patches (True) or green gradient (False)
+
+    Returns:
+        uint8 array of shape (256, 3)
+    """
+    lut = np.zeros((256, 3), dtype=np.uint8)
+    if not is_fake:
+        lut[:, 1] = np.arange(256, dtype=np.uint8)
+        return lut
+    yellow, red = cam_thresholds(cam)
+    lut[(LEVELS >= yellow) & (LEVELS < red) & (LEVELS > 0)] = YELLOW
+    lut[LEVELS >= red] = RED
+    return lut
+
+
+def upsample_cam(cam: np.ndarray, size: Tuple[int, int]) -> np.ndarray:
+    """
+    Quantize a CAM grid to uint8 and bilinearly resize it.
+
+    Args:
+        cam: Low-resolution CAM grid (0-1)
+        size: Output (width, height)
+
+    Returns:
+        uint8 array of shape (height, width)
+    """
+    cam8 = np.round(np.clip(cam, 0, 1) * 255).astype(np.uint8)
+    if CV2_AVAILABLE:
+        return cv2.resize(cam8, size, interpolation=cv2.INTER_LINEAR)
+    return np.asarray(Image.fromarray(cam8).resize(size, Image.Resampling.BILINEAR))
+
+
+def _lookup(table: np.ndarray, cam8: np.ndarray) -> np.ndarray:
+    """Apply a 256-entry table to a uint8 image."""
+    if CV2_AVAILABLE:
+        return cv2.LUT(cam8, table)
+    return table[cam8]
+
+
+def blend_lut(original: np.ndarray, cam8: np.ndarray, lut: np.ndarray, alpha: float = 0.5) -> np.ndarray:
+    """
+    Blend colormapped CAM into an image in place, weighting each pixel by its CAM value.
+
+    out = original * (1 - cam * alpha) + color(cam) * (cam * alpha), in 8-bit fixed point.
+
+    Args:
+        original: Writable uint8 RGB array (height, width, 3); overwritten with the overlay
+        cam8: uint8 CAM of shape (height, width)
+        lut: Colormap lookup table from colormap_lut
+        alpha: Maximum heatmap opacity
+
+    Returns:
+        The blended original array
+    """
+    # Per-level weights in 1/256 units; the color term and rounding offset fold into one table
+    weight = np.round(LEVELS * alpha * 256).astype(np.uint16)
+    keep = _lookup(256 - weight, cam8)
+    add = lut.astype(np.uint16) * weight[:, None] + 128
+    channel = np.empty(cam8.shape, dtype=np.uint16)
+    for c in range(3):
+        np.multiply(original[:, :, c], keep, out=channel)
+        channel += _lookup(np.ascontiguousarray(add[:, c]), cam8)
+        channel >>= 8
+        original[:, :, c] = channel
+    return original
+
+
+def render_heatmap_overlay(image: Image.Image, cam: np.ndarray, is_fake: bool, alpha: float = 0.5,
+                           with_heatmap: bool = True) -> Tuple[Optional[np.ndarray], np.ndarray]:
+    """
+    Colorize a low-resolution CAM and blend it over an image at the image's resolution.
+
+    Args:
+        image: PIL Image to draw on (downscale it first to render smaller)
+        cam: Low-resolution CAM grid (0-1)
+        is_fake: Red/yellow patches (True) or green (False)
+        alpha: Maximum heatmap opacity
+        with_heatmap: Also return the colorized heatmap (skip it to save a full-size array)
+
+    Returns:
+        Tuple of (heatmap or None, overlay) as uint8 RGB arrays
+    """
+    cam8 = upsample_cam(cam, image.size)
+    lut = colormap_lut(cam, is_fake)
+    heatmap = lut[cam8] if with_heatmap else None
+    overlay = blend_lut(np.array(image.convert("RGB")), cam8, lut, alpha)
+    return heatmap, overlay
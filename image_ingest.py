@@ -0,0 +1,140 @@
+"""
+Image ingestion for uploads.
+Decodes straight to (about) the resolution that is actually needed: JPEGs use
+draft mode so libjpeg scales during the DCT, other formats are box-reduced
+before RGB conversion. Oversized images are rejected before any pixel is decoded.
+"""
+import io
+import math
+import os
+from typing import Optional, Tuple
+
+from PIL import Image
+
+# Largest accepted image in pixels (decompression-bomb guard)
+MAX_IMAGE_PIXELS = int(os.environ.get('MAX_IMAGE_PIXELS', 150_000_000))
+
+# Decode at least this many times the model input size so the processor's
+# antialiased resize still has real pixels to average over
+DECODE_OVERSAMPLE = 2
+
+DEFAULT_INPUT_SIZE = (224, 224)
+
+# Modes Image.reduce() accepts (8 bits per channel, no palette)
+REDUCIBLE_MODES = ("L", "LA", "RGB", "RGBA")
+
+
+class ImageTooLargeError(ValueError):
+    """Raised when an image exceeds MAX_IMAGE_PIXELS."""
+
+
+def model_input_size(processor) -> Tuple[int, int]:
+    """
+    (width, height) the processor resizes images to.
+
+    Args:
+        processor: The AutoImageProcessor (or None)
+
+    Returns:
+        Input size, DEFAULT_INPUT_SIZE if the processor does not say
+    """
+    size = getattr(processor, "size", None) or {}
+    if "height" in size and "width" in size:
+        return int(size["width"]), int(size["height"])
+    if "shortest_edge" in size:
+        edge = int(size["shortest_edge"])
+        return edge, edge
+    return DEFAULT_INPUT_SIZE
+
+
+def open_image(data: bytes, max_pixels: int = MAX_IMAGE_PIXELS) -> Image.Image:
+    """
+    Open an image lazily (header only) and check its size.
+
+    Args:
+        data: Encoded image bytes
+        max_pixels: Largest accepted width * height
+
+    Returns:
+        Unloaded PIL Image
+
+    Raises:
+        ImageTooLargeError: If the image has more than max_pixels pixels
+    """
+    try:
+        image = Image.open(io.BytesIO(data))
+    except Image.DecompressionBombError as e:
+        raise ImageTooLargeError(str(e))
+    width, height = image.size
+    if width * height > max_pixels:
+        raise ImageTooLargeError(
+            f"Image is {width}x{height} ({width * height:,} pixels); the limit is {max_pixels:,} pixels"
+        )
+    return image
+
+
+def _reduce_while_decoding(image: Image.Image, min_size: Tuple[int, int]) -> Image.Image:
+    """Decode at the smallest size that still covers min_size in both dimensions."""
+    width, height = image.size
+    scale = min(width / min_size[0], height / min_size[1])
+    if scale < 2:
+        return image
+    if image.format == "JPEG":
+        # libjpeg picks the largest 1/2, 1/4 or 1/8 scale that stays >= the requested size
+        image.draft("RGB", (math.ceil(width / scale), math.ceil(height / scale)))
+        return image
+    # No reduced decoding for other formats; box-reduce right after decoding instead.
+    # GIF frames only get their final mode once loaded; palette, 1-bit and 16/32-bit
+    # images go to RGB first, as decode_image would convert them anyway
+    image.load()
+    if image.mode not in REDUCIBLE_MODES:
+        image = image.convert("RGB")
+    return image.reduce(int(scale))
+
+
+def decode_image(data: bytes, min_size: Optional[Tuple[int, int]] = None, max_dim: Optional[int] = None,
+                 max_pixels: int = MAX_IMAGE_PIXELS) -> Tuple[Image.Image, Tuple[int, int]]:
+    """
+    Decode an upload to RGB at a reduced resolution.
+
+    Args:
+        data: Encoded image bytes
+        min_size: (width, height) the result must still cover, e.g. the model input size
+                  times DECODE_OVERSAMPLE (None = no lower bound from the model)
+        max_dim: Cap on the longest side of the result (None = no cap)
+        max_pixels: Largest accepted width * height
+
+    Returns:
+        Tuple of (RGB PIL Image, original (width, height))
+
+    Raises:
+        ImageTooLargeError: If the image has more than max_pixels pixels
+    """
+    image = open_image(data, max_pixels)
+    original_size = image.size
+    if max_dim and max(original_size) > max_dim:
+        scale = max_dim / max(original_size)
+        capped = (max(1, round(original_size[0] * scale)), max(1, round(original_size[1] * scale)))
+        image = _reduce_while_decoding(image, capped)
+        image = image.convert("RGB")
+        if image.size != capped:
+            image = image.resize(capped, Image.Resampling.BILINEAR)
+        return image, original_size
+    if min_size:
+        image = _reduce_while_decoding(image, min_size)
+    return image.convert("RGB"), original_size
+
+
+def decode_for_model(data: bytes, processor) -> Tuple[Image.Image, Tuple[int, int]]:
+    """
+    Decode an upload for classification, just large enough for the processor.
+
+    Args:
+        data: Encoded image bytes
+        processor: The AutoImageProcessor
+
+    Returns:
+        Tuple of (RGB PIL Image, original (width, height))
+    """
+    width, height = model_input_size(processor)
+    return decode_image(data, min_size=(width * DECODE_OVERSAMPLE, height * DECODE_OVERSAMPLE))
@@ -0,0 +1,173 @@
+"""
+Dynamic micro-batching scheduler for the deepfake detection model.
+Collects concurrent requests into one batched forward pass, taking them from a
+FairQueue: interactive uploads before background scans, clients in turn.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Optional
+
+import torch
+
+from fair_queue import INTERACTIVE, FairQueue, weights_from_env
+
+
+class SchedulerFullError(RuntimeError):
+    """Raised when the scheduler queue is at capacity."""
+
+
+class DeadlineExceededError(RuntimeError):
+    """Raised when a request's deadline passed before its batch reached the model."""
+
+
+class BatchScheduler:
+    """Micro-batching scheduler that stacks pixel_values from concurrent callers."""
+
+    def __init__(self, model, device, max_batch_size: int = 8, max_wait_ms: float = 5.0, max_queue_size: int = 64,
+                 client_weights: Optional[dict] = None, interactive_burst: int = 8):
+        """
+        Initialize the scheduler and start its worker thread.
+
+        Args:
+            model: The SiglipForImageClassification model
+            device: Device the model runs on ('cuda' or 'cpu')
+            max_batch_size: Largest batch sent to the model in one forward
+            max_wait_ms: How long to wait for more requests after the first one arrives
+            max_queue_size: Maximum number of pending requests before submit() rejects
+            client_weights: Deficit-round-robin weight per client id (default 1)
+            interactive_burst: Interactive requests served in a row while background ones wait
+        """
+        self.model = model
+        self.device = device
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.max_queue_size = max(1, int(max_queue_size))
+        self._queue = FairQueue(self.max_queue_size, client_weights, interactive_burst)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="batch-scheduler", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_env(cls, model, device):
+        """Create a scheduler configured from BATCH_* environment variables."""
+        return cls(
+            model,
+            device,
+            max_batch_size=int(os.environ.get('BATCH_MAX_SIZE', 8)),
+            max_wait_ms=float(os.environ.get('BATCH_MAX_WAIT_MS', 5)),
+            max_queue_size=int(os.environ.get('BATCH_QUEUE_SIZE', 64)),
+            client_weights=weights_from_env(),
+            interactive_burst=int(os.environ.get('INTERACTIVE_BURST', 8)),
+        )
+
+    def queue_depth(self) -> int:
+        """Number of requests currently waiting for a batch."""
+        return self._queue.qsize()
+
+    def queue_depths(self) -> dict:
+        """Waiting requests per lane and client."""
+        return self._queue.depths()
+
+    def submit(self, pixel_values: torch.Tensor, deadline: Optional[float] = None,
+               client: str = "", lane: str = INTERACTIVE) -> Future:
+        """
+        Queue one preprocessed image for batched inference.
+
+        Args:
+            pixel_values: Tensor of shape [1, C, H, W] (or [C, H, W])
+            deadline: time.monotonic() after which the image is dropped instead of classified
+            client: Client id (fair_queue.client_identity); clients take turns
+            lane: 'interactive' or 'background'
+
+        Returns:
+            Future resolving to a dict with 'logits', 'probs', 'batch_size', 'queue_depth'
+            and 'forward_time' (seconds spent in the batch's forward)
+        """
+        if self._stopped.is_set():
+            raise RuntimeError("Batch scheduler has been stopped")
+        if pixel_values.dim() == 3:
+            pixel_values = pixel_values.unsqueeze(0)
+
+        future = Future()
+        depth = self._queue.qsize()
+        try:
+            self._queue.put_nowait((pixel_values, future, depth, deadline), client, lane)
+        except queue.Full:
+            raise SchedulerFullError(f"Inference queue is full ({self.max_queue_size} pending requests)")
+        return future
+
+    def predict(self, pixel_values: torch.Tensor, timeout: Optional[float] = None,
+                deadline: Optional[float] = None, client: str = "", lane: str = INTERACTIVE) -> dict:
+        """Submit and block until the result for this image is ready."""
+        return self.submit(pixel_values, deadline, client, lane).result(timeout=timeout)
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop the worker thread after draining already-queued requests."""
+        self._stopped.set()
+        self._queue.put(None)
+        self._thread.join(timeout=timeout)
+
+    def _collect_batch(self, first) -> list:
+        """Gather requests until the batch is full or the wait window closes."""
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Re-queue the stop sentinel so the main loop sees it after this batch
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        """Worker loop: collect, forward once, scatter results."""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = self._collect_batch(item)
+            # Drop requests whose caller already gave up
+            batch = [entry for entry in batch if entry[1].set_running_or_notify_cancel()]
+            # Drop requests whose deadline passed while they waited
+            now = time.monotonic()
+            expired = [entry for entry in batch if entry[3] is not None and entry[3] <= now]
+            for entry in expired:
+                entry[1].set_exception(DeadlineExceededError("Request deadline passed while queued for inference"))
+            batch = [entry for entry in batch if entry[3] is None or entry[3] > now]
+            if not batch:
+                continue
+            self._forward(batch)
+
+    def _forward(self, batch: list):
+        """Run a single forward over the stacked batch and resolve every future."""
+        forward_start = time.monotonic()
+        try:
+            pixel_values = torch.cat([entry[0] for entry in batch], dim=0).to(self.device)
+            with torch.no_grad():
+                logits = self.model(pixel_values=pixel_values).logits
+                probs = torch.nn.functional.softmax(logits, dim=1)
+            logits = logits.cpu()
+            probs = probs.cpu()
+        except Exception as e:
+            for _, future, _, _ in batch:
+                future.set_exception(e)
+            return
+
+        forward_time = time.monotonic() - forward_start
+        batch_size = len(batch)
+        for i, (_, future, depth, _) in enumerate(batch):
+            future.set_result({
+                "logits": logits[i],
+                "probs": probs[i],
+                "batch_size": batch_size,
+                "queue_depth": depth,
+                "forward_time": forward_time,
+            })
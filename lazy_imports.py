@@ -0,0 +1,49 @@
+"""
+Deferred imports for heavy optional dependencies.
+cv2 and onnxruntime take hundreds of milliseconds to import and are only needed by
+some requests, so modules bind them through lazy_import() and the real import
+happens on first attribute access instead of at server start.
+"""
+import importlib
+import importlib.util
+import threading
+from typing import Optional
+
+
+class LazyModule:
+    """Proxy that imports the named module the first time one of its attributes is used."""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def _load(self):
+        with self._lock:
+            if self._module is None:
+                self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._module or self._load(), attr)
+
+
+def lazy_import(name: str) -> Optional[LazyModule]:
+    """
+    Bind a module without importing it.
+
+    Args:
+        name: Top-level module name, e.g. 'cv2'
+
+    Returns:
+        LazyModule, or None when the module is not installed (checked without importing it)
+    """
+    try:
+        spec = importlib.util.find_spec(name)
+    except (ImportError, ValueError):
+        spec = None
+    return LazyModule(name) if spec is not None else None
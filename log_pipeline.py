@@ -0,0 +1,160 @@
+"""
+Leveled, non-blocking logging for the detection API.
+Request threads only hand records to a bounded in-memory queue (a QueueHandler);
+one background thread (a QueueListener) formats them and writes to stdout, so a
+slow log sink (e.g. fly.io's log shipper) never stalls a request. When the queue
+is full, records are dropped and counted instead of blocking.
+
+Per-step detail is logged at DEBUG and is off by default (LOG_LEVEL); each
+/api/detect request logs one compact line with its outcome and stage timings.
+LOG_FORMAT selects JSON lines (one object per record) or plain text.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+
+# Attributes every LogRecord has; anything else passed through `extra` is a structured field
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+
+def _fields(record: logging.LogRecord) -> dict:
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, then the record's extra fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(_fields(record))
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, separators=(",", ":"), default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """'[LEVEL] message key=value ...' for reading on a terminal."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = f"[{record.levelname}] {record.getMessage()}"
+        fields = _fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_text:
+            line += "\n" + record.exc_text
+        return line
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records when the queue is full instead of blocking."""
+
+    def __init__(self, record_queue: queue.Queue):
+        super().__init__(record_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only what cannot wait: merge the arguments and render the traceback while it exists.
+        # JSON or text formatting happens on the listener thread.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.stack_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_lock = threading.Lock()
+_handler: Optional[DroppingQueueHandler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+_output: Optional[logging.Handler] = None
+_queue_size = 0
+
+
+def configure_logging(default_format: str = "json", stream=None) -> DroppingQueueHandler:
+    """
+    Route the root logger through the background queue (once per process; later calls are no-ops).
+
+    Reads LOG_LEVEL (default INFO; DEBUG shows the per-step output), LOG_FORMAT ('json' or
+    'text', default default_format) and LOG_QUEUE_SIZE (records buffered, default 10000).
+
+    Args:
+        default_format: Format when LOG_FORMAT is not set (servers use JSON, CLI scripts text)
+        stream: Where the listener writes (default sys.stdout)
+
+    Returns:
+        The queue handler (its 'dropped' attribute counts records lost to a full queue)
+    """
+    global _handler, _output, _queue_size
+    with _lock:
+        if _handler is not None:
+            return _handler
+        fmt = os.environ.get('LOG_FORMAT', default_format).lower()
+        _output = logging.StreamHandler(stream or sys.stdout)
+        _output.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+        _queue_size = max(1, int(os.environ.get('LOG_QUEUE_SIZE', 10000)))
+        _handler = DroppingQueueHandler(queue.Queue(_queue_size))
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(_handler)
+        root.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
+        _start_listener()
+        atexit.register(shutdown_logging)
+        os.register_at_fork(after_in_child=_after_fork)
+        return _handler
+
+
+def _start_listener():
+    global _listener
+    _listener = logging.handlers.QueueListener(_handler.queue, _output, respect_handler_level=False)
+    _listener.start()
+
+
+def _after_fork():
+    # The listener thread does not survive fork(): give the child its own queue and listener
+    global _listener, _lock
+    _lock = threading.Lock()
+    if _handler is None:
+        return
+    _handler.queue = queue.Queue(_queue_size)
+    _handler.dropped = 0
+    _listener = None
+    _start_listener()
+
+
+def shutdown_logging():
+    """Write out the records still queued and stop the listener thread."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            try:
+                _listener.stop()
+            except queue.Full:
+                # No room for the stop sentinel: the sink is far behind, leave the rest
+                pass
+            _listener = None
+            _output.flush()
+
+
+def dropped_records() -> int:
+    """Records this process dropped because the queue was full."""
+    return _handler.dropped if _handler is not None else 0
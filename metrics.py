@@ -0,0 +1,337 @@
+"""
+Prometheus metrics for the detection API.
+Histograms and counters live in one anonymous shared memory map created at
+import, i.e. in the gunicorn master before it forks, so every worker writes
+into the same map and /metrics on any worker reports the whole server. Each
+recording thread owns one row of the map, so recording is a bisect and two
+in-place float adds without locks; a scrape sums the rows. Rows of exited
+threads are reused by their process. When the gunicorn master reaps a worker
+(its child_exit hook), the worker's rows are folded into an archive row and
+freed for reuse. Gauges are read when /metrics is scraped.
+"""
+import logging
+import mmap
+import multiprocessing as mp
+import os
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; decode and encode are milliseconds, Grad-CAM on CPU can take seconds
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUEUE_DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128)
+STAGES = ("decode", "preprocess", "inference", "gradcam", "render", "encode", "total")
+
+
+def _label_text(labels: Tuple[Tuple[str, str], ...]) -> str:
+    return ",".join(f'{key}="{value}"' for key, value in labels)
+
+
+class _Metric:
+    def __init__(self, registry, name: str, help_text: str, kind: str, labels: dict, slots: int):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.labels = tuple(labels.items())
+        self.offset = registry._allocate(slots)
+        self.slots = slots
+        # Direct references keep the recording path to a few lookups
+        self._thread = registry._thread
+        self._values = registry._values
+
+
+class Counter(_Metric):
+    """Monotonic count, summed over threads and processes."""
+
+    def __init__(self, registry, name, help_text, labels):
+        super().__init__(registry, name, help_text, "counter", labels, 1)
+
+    def inc(self, amount: float = 1.0):
+        base = self._thread.base
+        if base is None:
+            base = self.registry._claim()
+        self._values[base + self.offset] += amount
+
+    def samples(self, values) -> List[str]:
+        return [f"{self.name}{{{_label_text(self.labels)}}} {values[self.offset]:g}"]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram, summed over threads and processes."""
+
+    def __init__(self, registry, name, help_text, labels, buckets):
+        self.bounds = tuple(float(b) for b in buckets)
+        # One slot per bucket, one for +Inf, one for the sum
+        super().__init__(registry, name, help_text, "histogram", labels, len(self.bounds) + 2)
+        self._sum = len(self.bounds) + 1
+
+    def observe(self, value: float):
+        base = self._thread.base
+        if base is None:
+            base = self.registry._claim()
+        index = base + self.offset
+        self._values[index + bisect_left(self.bounds, value)] += 1.0
+        self._values[index + self._sum] += value
+
+    def samples(self, values) -> List[str]:
+        labels = _label_text(self.labels)
+        prefix = labels + "," if labels else ""
+        lines = []
+        cumulative = 0.0
+        for i, bound in enumerate(self.bounds + (float("inf"),)):
+            cumulative += values[self.offset + i]
+            le = "+Inf" if bound == float("inf") else f"{bound:g}"
+            lines.append(f'{self.name}_bucket{{{prefix}le="{le}"}} {cumulative:g}')
+        lines.append(f"{self.name}_sum{{{labels}}} {values[self.offset + self._sum]:g}")
+        lines.append(f"{self.name}_count{{{labels}}} {cumulative:g}")
+        return lines
+
+
+class _ThreadRow(threading.local):
+    """Row offset the current thread records into (None until its first recording)."""
+    base = None
+    lease = None
+
+
+class _RowLease:
+    """Returns a thread's row to its process when the thread exits."""
+    __slots__ = ("registry", "row", "pid")
+
+    def __init__(self, registry, row: int):
+        self.registry = registry
+        self.row = row
+        self.pid = os.getpid()
+
+    def __del__(self):
+        try:
+            if os.getpid() == self.pid:
+                self.registry._release(self.row)
+        except Exception:
+            # Interpreter shutdown
+            pass
+
+
+class MetricsRegistry:
+    """Fixed-layout metric store shared by the processes forked after its creation."""
+
+    def __init__(self, max_threads: int = 1024, slots_per_row: int = 512):
+        """
+        Args:
+            max_threads: Threads (over all processes) that can record at the same time
+            slots_per_row: Float slots per row, the capacity for metric registrations
+        """
+        # Row 0 archives exited processes, the last row absorbs threads beyond max_threads
+        self.max_rows = max(1, int(max_threads)) + 2
+        self.row_slots = int(slots_per_row)
+        self._used_slots = 0
+        self._metrics: List[_Metric] = []
+        self._gauges: List[Tuple[str, str, Callable[[], List[Tuple[dict, float]]]]] = []
+        # Row header: number of rows handed out, then the owning pid of each row (0: released)
+        self._header_map = mmap.mmap(-1, 8 * (self.max_rows + 1))
+        self._header = memoryview(self._header_map).cast("d")
+        # Pages are only backed once a row is written to
+        self._map = mmap.mmap(-1, 8 * self.max_rows * self.row_slots)
+        self._values = memoryview(self._map).cast("d")
+        self._rows_lock = mp.get_context("fork").Lock()
+        self._thread = _ThreadRow()
+        self._free_rows = []
+        self._free_lock = threading.Lock()
+        self._overflow_warned = False
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    @classmethod
+    def from_env(cls):
+        """Create a registry sized by METRICS_MAX_THREADS."""
+        return cls(max_threads=int(os.environ.get('METRICS_MAX_THREADS', 1024)))
+
+    def _after_fork(self):
+        # Rows of the parent's threads stay the parent's; the forking thread claims a new one
+        self._thread.base = None
+        self._thread.lease = None
+        self._free_rows = []
+        self._free_lock = threading.Lock()
+
+    def _allocate(self, slots: int) -> int:
+        if self._used_slots + slots > self.row_slots:
+            raise ValueError(f"Metrics registry is full ({self.row_slots} slots per row)")
+        offset = self._used_slots
+        self._used_slots += slots
+        return offset
+
+    def counter(self, name: str, help_text: str, **labels) -> Counter:
+        metric = Counter(self, name, help_text, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, buckets=STAGE_BUCKETS, **labels) -> Histogram:
+        metric = Histogram(self, name, help_text, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, help_text: str, read: Callable[[], List[Tuple[dict, float]]]):
+        """Gauge read at scrape time: read() returns (labels, value) pairs."""
+        self._gauges.append((name, help_text, read))
+
+    def _claim(self) -> int:
+        """Row for the calling thread: one its process freed, a new one, or one released by an exited process."""
+        with self._free_lock:
+            row = self._free_rows.pop() if self._free_rows else None
+        if row is None:
+            with self._rows_lock:
+                rows = int(self._header[0])
+                row = rows + 1 if rows < self.max_rows - 2 else self._reclaim_row(rows)
+                if row is not None:
+                    self._header[0] = max(rows, row)
+                    self._header[1 + row] = os.getpid()
+        if row is None:
+            row = self.max_rows - 1
+            if not self._overflow_warned:
+                self._overflow_warned = True
+                log.warning("More than %d threads record metrics; raise METRICS_MAX_THREADS, "
+                            "the extra threads are not counted", self.max_rows - 2)
+        else:
+            self._thread.lease = _RowLease(self, row)
+        self._thread.base = row * self.row_slots
+        return self._thread.base
+
+    def _release(self, row: int):
+        with self._free_lock:
+            self._free_rows.append(row)
+
+    def _reclaim_row(self, rows: int) -> Optional[int]:
+        for row in range(1, rows + 1):
+            if int(self._header[1 + row]) == 0:
+                return row
+        return None
+
+    def release_process(self, pid: int):
+        """
+        Fold the rows of an exited process into the archive row and free them for reuse.
+
+        Called by the parent once it has reaped the child (gunicorn's child_exit hook), so a
+        reused pid can never be mistaken for the process that recorded into a row.
+        """
+        values = self._values
+        with self._rows_lock:
+            for row in range(1, int(self._header[0]) + 1):
+                if int(self._header[1 + row]) != pid:
+                    continue
+                # Keep the exited process's counts in the archive row
+                base = row * self.row_slots
+                for slot in range(self._used_slots):
+                    values[slot] += values[base + slot]
+                    values[base + slot] = 0.0
+                self._header[1 + row] = 0
+
+    def _totals(self) -> List[float]:
+        """Every slot summed over the archive and the rows handed out."""
+        values = self._values
+        totals = [0.0] * self._used_slots
+        with self._rows_lock:
+            for row in range(int(self._header[0]) + 1):
+                base = row * self.row_slots
+                for slot, value in enumerate(values[base:base + self._used_slots]):
+                    totals[slot] += value
+        return totals
+
+    def live_pids(self) -> List[int]:
+        """Processes that have recorded metrics and have not been released."""
+        with self._rows_lock:
+            pids = {int(self._header[1 + row]) for row in range(1, int(self._header[0]) + 1)}
+        pids.discard(0)
+        return sorted(pids)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        totals = self._totals()
+        lines = []
+        described = set()
+        for metric in self._metrics:
+            if metric.name not in described:
+                described.add(metric.name)
+                lines.append(f"# HELP {metric.name} {metric.help}")
+                lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples(totals))
+        for name, help_text, read in self._gauges:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in read():
+                text = _label_text(tuple(labels.items()))
+                lines.append(f"{name}{{{text}}} {value:g}" if text else f"{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+def resident_memory_bytes(pid: Optional[int] = None) -> Optional[float]:
+    """Resident set size of a process (Linux), None when unavailable."""
+    try:
+        with open(f"/proc/{pid or os.getpid()}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+registry = MetricsRegistry.from_env()
+
+STAGE_SECONDS: Dict[str, Histogram] = {
+    stage: registry.histogram("deepfake_stage_seconds", "Time spent in each /api/detect stage.", stage=stage)
+    for stage in STAGES
+}
+QUEUE_DEPTH_AT_SUBMIT = registry.histogram(
+    "deepfake_queue_depth_at_submit", "Requests already waiting for the model when a request was queued.",
+    QUEUE_DEPTH_BUCKETS)
+PREDICTIONS = {label: registry.counter("deepfake_predictions_total", "Images classified, by predicted class.",
+                                       **{"class": label})
+               for label in ("fake", "real")}
+CACHE = {result: registry.counter("deepfake_cache_requests_total",
+                                  "Detections by result-cache outcome (exact hit, perceptual hit, coalesced, miss).",
+                                  result=result)
+         for result in ("hit", "perceptual", "coalesced", "miss")}
+ERROR_STATUSES = ("400", "413", "429", "500", "503")
+ERRORS = {status: registry.counter("deepfake_errors_total", "/api/detect responses with an error status.",
+                                   status=status)
+          for status in ERROR_STATUSES}
+
+
+def observe_stage(stage: str, seconds: float):
+    """Record one stage duration (see STAGES)."""
+    STAGE_SECONDS[stage].observe(seconds)
+
+
+def record_detection(body: dict, status: int, seconds: float):
+    """Record a processed upload: total time, and for answered ones the cache result and predicted class."""
+    STAGE_SECONDS["total"].observe(seconds)
+    if status != 200:
+        return
+    cache = body.get("cache")
+    if cache == "hit" and body.get("analysis", {}).get("cache_match") == "perceptual":
+        cache = "perceptual"
+    if cache in CACHE:
+        CACHE[cache].inc()
+    prediction = str(body.get("prediction", "")).lower()
+    if prediction in PREDICTIONS:
+        PREDICTIONS[prediction].inc()
+
+
+def count_error(status: int):
+    """Count an /api/detect response by error status (any that the endpoint returns; others are ignored)."""
+    error = ERRORS.get(str(status))
+    if error is not None:
+        error.inc()
+
+
+def process_memory() -> List[Tuple[dict, float]]:
+    """Resident memory of every live process that records metrics, and of this one."""
+    samples = []
+    for pid in sorted(set(registry.live_pids()) | {os.getpid()}):
+        rss = resident_memory_bytes(pid)
+        if rss is not None:
+            samples.append(({"pid": str(pid)}, rss))
+    return samples
+
+
+registry.gauge("deepfake_process_resident_memory_bytes", "Resident memory of each serving process.", process_memory)
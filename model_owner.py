@@ -0,0 +1,95 @@
+"""
+Model-owner process for INFERENCE_MODE=ring.
+The only process that loads the model: it drains the shared-memory ring in
+batches and writes logits back, while the HTTP front-ends only decode and
+preprocess. The owner loads the model exactly as the API does (backend_api.load_model),
+so the engine options (ONNX, int8, bf16, compile) apply unchanged.
+"""
+import atexit
+import logging
+import multiprocessing as mp
+import os
+import signal
+import time
+
+import torch
+
+from shm_ring import TensorRing
+
+log = logging.getLogger(__name__)
+
+
+def ring_settings_from_env() -> dict:
+    """Ring size and batching from RING_SLOTS and the BATCH_* variables the in-process scheduler uses."""
+    return {
+        "num_slots": int(os.environ.get('RING_SLOTS', 64)),
+        "max_batch_size": int(os.environ.get('BATCH_MAX_SIZE', 8)),
+        "max_wait": float(os.environ.get('BATCH_MAX_WAIT_MS', 5)) / 1000.0,
+    }
+
+
+def _owner_main(ring: TensorRing, ready, max_batch_size: int, max_wait: float):
+    """Process entry: load the model, then serve batches from the ring until the parent goes away."""
+    # Drop handlers inherited from the parent (e.g. gunicorn's arbiter) so SIGTERM/SIGINT just stop the owner
+    for name in ("SIGTERM", "SIGINT", "SIGHUP", "SIGQUIT", "SIGCHLD", "SIGUSR1", "SIGUSR2", "SIGWINCH", "SIGTTIN", "SIGTTOU"):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), signal.SIG_DFL)
+    import backend_api
+    parent = os.getppid()
+    torch.set_num_threads(int(os.environ.get('RING_OWNER_THREADS', os.cpu_count() or 1)))
+    backend_api.load_model()
+    model, device = backend_api.inference_model, backend_api.device
+    ready.set()
+    log.info("Model owner serving ring (%d slots, batches up to %d) on %s", ring.num_slots, max_batch_size, device.upper())
+
+    while os.getppid() == parent:
+        slots = ring.take_batch(max_batch_size, max_wait)
+        if not slots:
+            continue
+        try:
+            with torch.no_grad():
+                logits = model(pixel_values=ring.inputs(slots).to(device)).logits
+            ring.complete(slots, logits.float().cpu().numpy())
+        except Exception:
+            log.exception("Model owner batch of %d failed", len(slots))
+            ring.complete(slots, None)
+
+
+def _remove_ring(ring: TensorRing, creator: int):
+    # atexit handlers are inherited by forked front-ends; only the creator removes the block
+    if os.getpid() == creator:
+        ring.close(unlink=True)
+
+
+def start_model_owner(input_shape, num_labels: int, timeout: float = 600.0):
+    """
+    Create the ring and fork the model-owner process; returns once the model is loaded.
+
+    Call this before forking the front-ends so they inherit the ring.
+
+    Args:
+        input_shape: (channels, height, width) of pixel_values
+        num_labels: Logits per image
+        timeout: Seconds to wait for the owner to load the model
+
+    Returns:
+        Tuple of (TensorRing, owner Process, settings dict)
+    """
+    ctx = mp.get_context("fork")
+    settings = ring_settings_from_env()
+    ring = TensorRing(settings["num_slots"], input_shape, num_labels, ctx)
+    ready = ctx.Event()
+    owner = ctx.Process(target=_owner_main, name="model-owner", daemon=True,
+                        args=(ring, ready, settings["max_batch_size"], settings["max_wait"]))
+    owner.start()
+    deadline = time.monotonic() + timeout
+    while not ready.wait(1.0):
+        if not owner.is_alive():
+            ring.close(unlink=True)
+            raise RuntimeError(f"Model-owner process exited with code {owner.exitcode} while loading")
+        if time.monotonic() > deadline:
+            owner.terminate()
+            ring.close(unlink=True)
+            raise RuntimeError(f"Model-owner process did not load the model within {timeout:.0f}s")
+    atexit.register(_remove_ring, ring, os.getpid())
+    return ring, owner, settings
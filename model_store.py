@@ -0,0 +1,79 @@
+"""
+Offline model loading from a pinned local snapshot.
+The weights are read from a Hugging Face cache snapshot (or MODEL_SNAPSHOT_DIR)
+without contacting the Hub, and safetensors files are memory-mapped rather than
+copied through a pickle. transformers is imported here, inside the loader, so
+importing the API does not pay for it.
+"""
+import logging
+import os
+from typing import Optional
+
+log = logging.getLogger(__name__)
+
+MODEL_NAME = "prithivMLmods/deepfake-detector-model-v1"
+# Files needed to build the classifier and its image processor
+SNAPSHOT_PATTERNS = ["*.json", "*.safetensors"]
+
+
+def model_revision_from_env() -> Optional[str]:
+    """Pinned commit hash (or branch/tag) from MODEL_REVISION; None means the cached 'main'."""
+    return os.environ.get('MODEL_REVISION') or None
+
+
+def resolve_snapshot(model_name: str = MODEL_NAME, revision: Optional[str] = None) -> str:
+    """
+    Local folder holding the model files, without a Hub round trip when they are cached.
+
+    Args:
+        model_name: Hugging Face repository id
+        revision: Commit hash, branch or tag (default: MODEL_REVISION env or 'main')
+
+    Returns:
+        Snapshot directory
+
+    Raises:
+        FileNotFoundError: The snapshot is not cached and HF_HUB_OFFLINE forbids downloading it
+    """
+    if os.environ.get('MODEL_SNAPSHOT_DIR'):
+        return os.environ['MODEL_SNAPSHOT_DIR']
+    from huggingface_hub import snapshot_download
+    from huggingface_hub.errors import LocalEntryNotFoundError
+    revision = revision or model_revision_from_env()
+    try:
+        return snapshot_download(model_name, revision=revision, allow_patterns=SNAPSHOT_PATTERNS,
+                                 local_files_only=True)
+    except LocalEntryNotFoundError:
+        if os.environ.get('HF_HUB_OFFLINE', '').lower() in ('1', 'true', 'yes'):
+            raise FileNotFoundError(f"{model_name}@{revision or 'main'} is not cached and HF_HUB_OFFLINE is set; "
+                                    f"run: python download_model.py")
+    # First start on a fresh host: fetch the snapshot once, later starts stay offline
+    log.info("Snapshot not cached, downloading %s@%s...", model_name, revision or 'main')
+    return snapshot_download(model_name, revision=revision, allow_patterns=SNAPSHOT_PATTERNS)
+
+
+def load_pretrained(snapshot_dir: str):
+    """
+    Build the classifier and image processor from a local snapshot.
+
+    Args:
+        snapshot_dir: Folder returned by resolve_snapshot
+
+    Returns:
+        Tuple of (model, processor)
+    """
+    from transformers import AutoImageProcessor, SiglipForImageClassification
+    model = SiglipForImageClassification.from_pretrained(snapshot_dir, local_files_only=True, use_safetensors=True)
+    processor = AutoImageProcessor.from_pretrained(snapshot_dir, local_files_only=True)
+    return model, processor
+
+
+def load_processor(snapshot_dir: str):
+    """Only the image processor, for processes that preprocess but do not run the model."""
+    from transformers import AutoImageProcessor
+    return AutoImageProcessor.from_pretrained(snapshot_dir, local_files_only=True)
+
+
+def parameter_count(model) -> int:
+    """Number of parameters in the model."""
+    return sum(p.numel() for p in model.parameters())
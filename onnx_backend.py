@@ -0,0 +1,186 @@
+"""
+ONNX export of the SigLIP classifier and an ONNX Runtime inference backend.
+The exported graph has a dynamic batch axis and is saved, after ONNX Runtime's
+graph optimizations, next to the Hugging Face cache together with the
+preprocessing settings, so serving it needs neither transformers nor autograd.
+"""
+import copy
+import json
+import logging
+import os
+import time
+from typing import Optional
+
+import numpy as np
+import torch
+
+from lazy_imports import lazy_import
+from preprocessing import SavedProcessorConfig, preprocessing_config
+
+log = logging.getLogger(__name__)
+
+# Only imported when the ONNX backend is actually used
+ort = lazy_import("onnxruntime")
+ONNXRUNTIME_AVAILABLE = ort is not None
+
+MODEL_NAME = "prithivMLmods/deepfake-detector-model-v1"
+INFERENCE_BACKENDS = ("torch", "onnx")
+ONNX_OPSET = 18
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_CONFIG_FILE = "onnx_config.json"
+
+
+def inference_backend_from_env() -> str:
+    """Classification backend from INFERENCE_BACKEND (torch or onnx)."""
+    backend = os.environ.get('INFERENCE_BACKEND', 'torch').lower()
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unknown INFERENCE_BACKEND '{backend}' (use one of {', '.join(INFERENCE_BACKENDS)})")
+    return backend
+
+
+def default_onnx_dir(model_name: str = MODEL_NAME) -> str:
+    """ONNX_MODEL_DIR, or an 'onnx' folder inside the model's Hugging Face cache entry."""
+    if os.environ.get('ONNX_MODEL_DIR'):
+        return os.environ['ONNX_MODEL_DIR']
+    from huggingface_hub import constants
+    return os.path.join(constants.HF_HUB_CACHE, "models--" + model_name.replace("/", "--"), "onnx")
+
+
+def onnx_model_exists(model_dir: str) -> bool:
+    return all(os.path.exists(os.path.join(model_dir, name)) for name in (ONNX_MODEL_FILE, ONNX_CONFIG_FILE))
+
+
+class _LogitsOnly(torch.nn.Module):
+    """pixel_values -> logits, the only output the exported graph needs."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, pixel_values):
+        return self.model(pixel_values=pixel_values).logits
+
+
+def export_onnx(model, processor, model_dir: str, opset: int = ONNX_OPSET) -> str:
+    """
+    Export the classifier to ONNX with a dynamic batch axis and optimize the graph.
+
+    Args:
+        model: fp32 SiglipForImageClassification
+        processor: The loaded AutoImageProcessor (its settings are saved alongside)
+        model_dir: Output folder
+        opset: ONNX opset version
+
+    Returns:
+        Path of the optimized model.onnx
+    """
+    if not ONNXRUNTIME_AVAILABLE:
+        raise RuntimeError("onnxruntime is not installed (pip install onnx onnxruntime onnxscript)")
+    os.makedirs(model_dir, exist_ok=True)
+    config = preprocessing_config(processor)
+    size = config["size"]
+    raw_path = os.path.join(model_dir, "model.raw.onnx")
+    model_path = os.path.join(model_dir, ONNX_MODEL_FILE)
+
+    # Export the fp32 CPU logits path (copying a GPU or bf16 model rather than converting it in place);
+    # batch 2 so the batch axis is not specialized to 1
+    if any(param.device.type != "cpu" or param.dtype != torch.float32 for param in model.parameters()):
+        model = copy.deepcopy(model).to("cpu").float()
+    wrapper = _LogitsOnly(model).eval()
+    example = torch.zeros(2, 3, size["height"], size["width"])
+    with torch.no_grad():
+        torch.onnx.export(
+            wrapper, (example,), raw_path,
+            input_names=["pixel_values"], output_names=["logits"],
+            dynamic_shapes=({0: torch.export.Dim("batch", min=1, max=1024)},),
+            opset_version=opset, dynamo=True, external_data=False, verbose=False,
+        )
+
+    # Constant folding and node fusions, written out so serving starts from the optimized graph
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+    options.optimized_model_filepath = model_path
+    ort.InferenceSession(raw_path, options, providers=["CPUExecutionProvider"])
+    os.remove(raw_path)
+
+    with open(os.path.join(model_dir, ONNX_CONFIG_FILE), "w") as f:
+        json.dump({
+            "model_name": getattr(model.config, "_name_or_path", None) or MODEL_NAME,
+            "opset": opset,
+            "id2label": {str(k): v for k, v in model.config.id2label.items()},
+            "preprocessing": config,
+        }, f, indent=2)
+    return model_path
+
+
+class OnnxOutput:
+    """Minimal stand-in for the transformers output object: just .logits."""
+
+    def __init__(self, logits: torch.Tensor):
+        self.logits = logits
+
+
+class OnnxClassifier:
+    """ONNX Runtime session with the same call interface as the PyTorch classifier."""
+
+    def __init__(self, model_dir: str, device: str = "cpu", threads: Optional[int] = None):
+        """
+        Load an exported model.
+
+        Args:
+            model_dir: Folder written by export_onnx
+            device: 'cuda' uses the CUDA execution provider when onnxruntime has it
+            threads: Intra-op threads (default: ONNX_THREADS env or onnxruntime's choice)
+        """
+        if not ONNXRUNTIME_AVAILABLE:
+            raise RuntimeError("onnxruntime is not installed (pip install onnxruntime)")
+        with open(os.path.join(model_dir, ONNX_CONFIG_FILE)) as f:
+            self.config = json.load(f)
+        self.processor = SavedProcessorConfig(self.config["preprocessing"])
+        self.id2label = {int(k): v for k, v in self.config["id2label"].items()}
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        threads = threads or int(os.environ.get('ONNX_THREADS', 0))
+        if threads:
+            options.intra_op_num_threads = threads
+        providers = ["CPUExecutionProvider"]
+        if str(device).startswith("cuda") and "CUDAExecutionProvider" in ort.get_available_providers():
+            providers.insert(0, "CUDAExecutionProvider")
+        self.model_path = os.path.join(model_dir, ONNX_MODEL_FILE)
+        self.session = ort.InferenceSession(self.model_path, options, providers=providers)
+        self.providers = self.session.get_providers()
+
+    def __call__(self, pixel_values: torch.Tensor) -> OnnxOutput:
+        """Run a batch of pixel_values; logits come back as a CPU float32 tensor."""
+        array = np.ascontiguousarray(pixel_values.detach().cpu().numpy(), dtype=np.float32)
+        logits = self.session.run(["logits"], {"pixel_values": array})[0]
+        return OnnxOutput(torch.from_numpy(logits))
+
+    def size_mb(self) -> float:
+        """Size of the optimized model file in MB."""
+        return os.path.getsize(self.model_path) / (1024 * 1024)
+
+
+def load_onnx_classifier(model=None, processor=None, device: str = "cpu", model_dir: Optional[str] = None):
+    """
+    Load the exported model, exporting it first when it is missing and a PyTorch model is given.
+
+    Args:
+        model: Loaded PyTorch model used for a first-time export (optional)
+        processor: Its image processor (needed with model)
+        device: Device hint for the execution provider
+        model_dir: Export folder (default: default_onnx_dir())
+
+    Returns:
+        OnnxClassifier
+    """
+    model_dir = model_dir or default_onnx_dir()
+    if not onnx_model_exists(model_dir):
+        if model is None:
+            raise FileNotFoundError(f"No exported model in {model_dir}; run: python export_onnx.py")
+        start_time = time.time()
+        log.info("Exporting ONNX model to %s...", model_dir)
+        export_onnx(model, processor, model_dir)
+        log.info("Exported in %.1fs", time.time() - start_time)
+    return OnnxClassifier(model_dir, device)
@@ -0,0 +1,224 @@
+"""
+Perceptual hashing and near-duplicate lookup for previously classified images.
+Re-encoded, resized or metadata-stripped copies hash to nearby 64-bit values,
+so they can reuse a cached result instead of running the model again.
+"""
+import itertools
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+HASH_BITS = 64
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    """Pack a flat boolean array (MSB first) into a Python int."""
+    return int.from_bytes(np.packbits(bits.astype(np.uint8)).tobytes(), "big")
+
+
+def dhash(image: Image.Image) -> int:
+    """
+    Difference hash: compares horizontally adjacent pixels of a 9x8 grayscale thumbnail.
+
+    Args:
+        image: PIL Image (any mode)
+
+    Returns:
+        64-bit hash as an int
+    """
+    small = np.asarray(image.convert("L").resize((9, 8), Image.Resampling.BILINEAR), dtype=np.int16)
+    return _bits_to_int(small[:, 1:] > small[:, :-1])
+
+
+_DCT_MATRIX = None
+
+
+def _dct_matrix(n: int = 32) -> np.ndarray:
+    """Orthonormal DCT-II basis matrix (computed once)."""
+    global _DCT_MATRIX
+    if _DCT_MATRIX is None or _DCT_MATRIX.shape[0] != n:
+        k = np.arange(n)[:, None]
+        i = np.arange(n)[None, :]
+        matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+        matrix[0] /= np.sqrt(2.0)
+        _DCT_MATRIX = matrix.astype(np.float32)
+    return _DCT_MATRIX
+
+
+def phash(image: Image.Image) -> int:
+    """
+    DCT perceptual hash: signs of the low-frequency 8x8 DCT block of a 32x32 thumbnail
+    relative to its median.
+
+    Args:
+        image: PIL Image (any mode)
+
+    Returns:
+        64-bit hash as an int
+    """
+    small = np.asarray(image.convert("L").resize((32, 32), Image.Resampling.BILINEAR), dtype=np.float32)
+    dct = _dct_matrix(32)
+    coeffs = (dct @ small @ dct.T)[:8, :8]
+    return _bits_to_int(coeffs > np.median(coeffs.flatten()[1:]))
+
+
+HASH_FUNCTIONS = {
+    "dhash": dhash,
+    "phash": phash,
+}
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two hashes."""
+    return (a ^ b).bit_count()
+
+
+def is_distinctive(hash_value: int, min_bits: int = 8) -> bool:
+    """
+    Whether a hash carries enough structure to identify an image.
+    Flat or near-uniform images hash to (almost) all zeros or ones regardless of
+    their colors, so they must not be matched against each other.
+    """
+    ones = hash_value.bit_count()
+    return min_bits <= ones <= HASH_BITS - min_bits
+
+
+class PerceptualHashIndex:
+    """
+    Bounded multi-index hash table for Hamming-distance lookup.
+
+    The 64-bit hash is split into num_chunks chunks, each indexed in its own table.
+    If two hashes are within distance d, at least one chunk differs by at most
+    d // num_chunks bits (pigeonhole), so probing every chunk within that radius
+    finds all candidates. Oldest entries are evicted once max_entries is reached.
+    """
+
+    def __init__(self, max_entries: int = 100000, max_distance: int = 6, num_chunks: int = 4):
+        """
+        Initialize the index.
+
+        Args:
+            max_entries: Maximum number of stored hashes (LRU eviction)
+            max_distance: Largest Hamming distance treated as a near-duplicate
+            num_chunks: Number of sub-hash tables (must divide 64)
+        """
+        if HASH_BITS % num_chunks:
+            raise ValueError(f"num_chunks must divide {HASH_BITS}")
+        self.max_entries = max(1, int(max_entries))
+        self.max_distance = max(0, int(max_distance))
+        self.num_chunks = num_chunks
+        self.chunk_bits = HASH_BITS // num_chunks
+        self._chunk_mask = (1 << self.chunk_bits) - 1
+        self._entries = OrderedDict()  # hash -> value
+        self._tables = [dict() for _ in range(num_chunks)]  # chunk value -> set of hashes
+        self._probe_masks = self._build_probe_masks(self.max_distance // num_chunks)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls):
+        """Create an index configured from PHASH_* environment variables."""
+        return cls(
+            max_entries=int(os.environ.get('PHASH_INDEX_SIZE', 100000)),
+            max_distance=int(os.environ.get('PHASH_MAX_DISTANCE', 6)),
+        )
+
+    def _build_probe_masks(self, radius: int) -> list:
+        """All XOR masks over one chunk with at most `radius` bits set."""
+        masks = [0]
+        for r in range(1, radius + 1):
+            for positions in itertools.combinations(range(self.chunk_bits), r):
+                mask = 0
+                for p in positions:
+                    mask |= 1 << p
+                masks.append(mask)
+        return masks
+
+    def _chunks(self, hash_value: int):
+        """Split a hash into its per-table chunk values."""
+        return [(hash_value >> (i * self.chunk_bits)) & self._chunk_mask for i in range(self.num_chunks)]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, hash_value: int, value):
+        """Store (or refresh) a hash with its associated value."""
+        with self._lock:
+            if hash_value in self._entries:
+                self._entries[hash_value] = value
+                self._entries.move_to_end(hash_value)
+                return
+            self._entries[hash_value] = value
+            for table, chunk in zip(self._tables, self._chunks(hash_value)):
+                table.setdefault(chunk, set()).add(hash_value)
+            while len(self._entries) > self.max_entries:
+                oldest, _ = self._entries.popitem(last=False)
+                self._unindex(oldest)
+                self.evictions += 1
+
+    def find(self, hash_value: int) -> Optional[Tuple[int, object, int]]:
+        """
+        Find the closest stored hash within max_distance.
+
+        Returns:
+            (stored_hash, value, distance) of the best match, or None
+        """
+        with self._lock:
+            best = None
+            best_distance = self.max_distance + 1
+            if hash_value in self._entries:
+                best, best_distance = hash_value, 0
+            else:
+                seen = set()
+                for table, chunk in zip(self._tables, self._chunks(hash_value)):
+                    for mask in self._probe_masks:
+                        bucket = table.get(chunk ^ mask)
+                        if not bucket:
+                            continue
+                        for candidate in bucket:
+                            if candidate in seen:
+                                continue
+                            seen.add(candidate)
+                            distance = (candidate ^ hash_value).bit_count()
+                            if distance < best_distance:
+                                best, best_distance = candidate, distance
+            if best is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best)
+            self.hits += 1
+            return best, self._entries[best], best_distance
+
+    def remove(self, hash_value: int):
+        """Drop a hash from the index if present."""
+        with self._lock:
+            if hash_value in self._entries:
+                del self._entries[hash_value]
+                self._unindex(hash_value)
+
+    def stats(self) -> dict:
+        """Index size and hit/miss/eviction counters."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "max_distance": self.max_distance,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _unindex(self, hash_value: int):
+        """Remove a hash from the chunk tables. Caller holds the lock."""
+        for table, chunk in zip(self._tables, self._chunks(hash_value)):
+            bucket = table.get(chunk)
+            if bucket is not None:
+                bucket.discard(hash_value)
+                if not bucket:
+                    del table[chunk]
@@ -0,0 +1,133 @@
+"""
+Reduced-precision (bfloat16) inference for the SigLIP vision tower.
+At startup the host is probed for fast bf16 kernels; when enabled, the vision
+tower's weights are cast to bf16 in place (halving their memory) while
+LayerNorms, the classifier head and the softmax stay in fp32.
+"""
+import os
+import time
+
+import torch
+
+PRECISIONS = ("fp32", "bf16", "auto")
+# 'auto' picks bf16 only when a bf16 matmul is at least this much faster than fp32
+BF16_MIN_SPEEDUP = float(os.environ.get('BF16_MIN_SPEEDUP', 1.2))
+CPU_BF16_FLAGS = ("amx_bf16", "avx512_bf16")
+
+
+def precision_from_env() -> str:
+    """Requested precision from MODEL_PRECISION (fp32, bf16 or auto)."""
+    precision = os.environ.get('MODEL_PRECISION', 'fp32').lower()
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown MODEL_PRECISION '{precision}' (use one of {', '.join(PRECISIONS)})")
+    return precision
+
+
+def _cpu_flags() -> set:
+    """CPU feature flags from /proc/cpuinfo (empty when unavailable)."""
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("flags"):
+                    return set(line.split(":", 1)[1].split())
+    except OSError:
+        pass
+    return set()
+
+
+def _matmul_ms(dtype, device: str, repeats: int = 5) -> float:
+    """Best time of an encoder-sized matmul (196 tokens x 768 -> 3072)."""
+    a = torch.randn(196, 768, device=device).to(dtype)
+    b = torch.randn(768, 3072, device=device).to(dtype)
+    a @ b
+    best = float("inf")
+    for _ in range(repeats):
+        if device == "cuda":
+            torch.cuda.synchronize()
+        start = time.perf_counter()
+        a @ b
+        if device == "cuda":
+            torch.cuda.synchronize()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def probe_bf16(device: str = "cpu") -> dict:
+    """
+    Check whether this host has fast bf16 kernels.
+
+    Args:
+        device: 'cpu' or 'cuda'
+
+    Returns:
+        Dict with 'supported', 'native' (CPU flags or GPU support), 'flags' and measured 'speedup' over fp32
+    """
+    if device == "cuda":
+        supported = torch.cuda.is_bf16_supported()
+        flags = []
+        native = supported
+    else:
+        flags = sorted(_cpu_flags().intersection(CPU_BF16_FLAGS))
+        native = bool(flags)
+        supported = torch.backends.mkldnn.is_available() and torch.ops.mkldnn._is_mkldnn_bf16_supported()
+    speedup = None
+    if supported:
+        speedup = round(_matmul_ms(torch.float32, device) / _matmul_ms(torch.bfloat16, device), 2)
+    return {"supported": bool(supported), "native": native, "flags": flags, "speedup": speedup}
+
+
+def resolve_precision(requested: str, probe: dict) -> str:
+    """
+    Decide the precision actually used.
+
+    Args:
+        requested: fp32, bf16 or auto
+        probe: Result of probe_bf16
+
+    Returns:
+        'bf16' or 'fp32'
+    """
+    if requested == "fp32" or not probe["supported"]:
+        return "fp32"
+    if requested == "bf16":
+        return "bf16"
+    return "bf16" if (probe["speedup"] or 0) >= BF16_MIN_SPEEDUP else "fp32"
+
+
+def _vision_tower(model) -> torch.nn.Module:
+    for name in ("vision_model", "siglip"):
+        if hasattr(model, name):
+            return getattr(model, name)
+    raise ValueError(f"{type(model).__name__} has no vision tower to cast")
+
+
+def _outputs_to_fp32(module, inputs, output):
+    """Forward hook: hand fp32 hidden states to the pooling, classifier and softmax."""
+    for key in ("last_hidden_state", "pooler_output"):
+        value = getattr(output, key, None)
+        if value is not None and value.dtype == torch.bfloat16:
+            setattr(output, key, value.float())
+    return output
+
+
+def cast_vision_tower_bf16(model):
+    """
+    Cast the vision tower to bfloat16 in place, keeping numerically sensitive parts in fp32.
+
+    LayerNorm parameters stay fp32 (PyTorch normalizes bf16 inputs in fp32 with them),
+    attention softmax is upcast by the model itself, and the tower's outputs are cast back
+    to fp32 so mean pooling, the classifier head and the final softmax run in fp32.
+
+    Args:
+        model: SiglipForImageClassification
+
+    Returns:
+        The same model
+    """
+    tower = _vision_tower(model)
+    tower.to(torch.bfloat16)
+    for module in tower.modules():
+        if isinstance(module, torch.nn.LayerNorm):
+            module.float()
+    tower.register_forward_hook(_outputs_to_fp32)
+    return model
@@ -0,0 +1,215 @@
+"""
+Fast image preprocessing shared by the API, run_model.py and Grad-CAM.
+Reads resize size, resample filter, rescale factor and mean/std from the loaded
+image processor once, then resizes each image with the same backend the processor
+uses and rescales + normalizes the whole batch in one float32 pass.
+"""
+import logging
+import threading
+import weakref
+from typing import List, Sequence, Union
+
+import numpy as np
+import torch
+from PIL import Image
+
+log = logging.getLogger(__name__)
+
+try:
+    # v2 functional, as the processors use: it resizes uint8 natively instead of via float
+    from torchvision.transforms import InterpolationMode
+    from torchvision.transforms.v2 import functional as tvF
+    TORCHVISION_AVAILABLE = True
+except ImportError:
+    TORCHVISION_AVAILABLE = False
+
+# PIL resample codes -> torchvision interpolation names
+_TORCH_INTERPOLATION = {0: "NEAREST", 1: "LANCZOS", 2: "BILINEAR", 3: "BICUBIC", 4: "BOX", 5: "HAMMING"}
+
+
+def _uses_torchvision(processor) -> bool:
+    """True for 'fast' processors, which resize uint8 tensors with torchvision instead of PIL."""
+    if isinstance(processor, SavedProcessorConfig):
+        return processor.resize_backend == "torchvision"
+    names = {cls.__name__ for cls in type(processor).__mro__}
+    return bool(names & {"TorchvisionBackend", "BaseImageProcessorFast"})
+
+
+class ImagePreprocessor:
+    """Resize + rescale + normalize equivalent to the model's AutoImageProcessor."""
+
+    def __init__(self, processor):
+        """
+        Read the preprocessing configuration from an image processor.
+
+        Args:
+            processor: The loaded AutoImageProcessor
+
+        Raises:
+            ValueError: If the processor does more than resize/rescale/normalize to a fixed size
+        """
+        size = getattr(processor, "size", None) or {}
+        if "height" not in size or "width" not in size or getattr(processor, "do_center_crop", False):
+            raise ValueError(f"Unsupported image processor configuration: size={dict(size)}")
+        self.processor = processor
+        self.height = int(size["height"])
+        self.width = int(size["width"])
+        self.do_resize = bool(getattr(processor, "do_resize", True))
+        self.resample = int(getattr(processor, "resample", Image.Resampling.BICUBIC))
+        self.use_torchvision = _uses_torchvision(processor) and TORCHVISION_AVAILABLE
+
+        # Rescale and normalize fold into one multiply-add per channel: x * scale + bias
+        rescale = float(processor.rescale_factor) if getattr(processor, "do_rescale", True) else 1.0
+        if getattr(processor, "do_normalize", True):
+            mean = np.asarray(processor.image_mean, dtype=np.float64)
+            std = np.asarray(processor.image_std, dtype=np.float64)
+        else:
+            mean, std = np.zeros(3), np.ones(3)
+        self.scale = torch.tensor(rescale / std, dtype=torch.float32).view(1, 3, 1, 1)
+        self.bias = torch.tensor(-mean / std, dtype=torch.float32).view(1, 3, 1, 1)
+
+        # Pinned staging buffers for host-to-GPU copies, one per thread
+        self._pin = torch.cuda.is_available()
+        self._local = threading.local()
+
+    def _resize(self, image: Image.Image) -> torch.Tensor:
+        """Resize one image to the model input size, returned as a uint8 [3, H, W] tensor."""
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        if self.use_torchvision:
+            tensor = tvF.pil_to_tensor(image)
+            if not self.do_resize or image.size == (self.width, self.height):
+                return tensor
+            interpolation = InterpolationMode[_TORCH_INTERPOLATION.get(self.resample, "BILINEAR")]
+            return tvF.resize(tensor, [self.height, self.width], interpolation=interpolation, antialias=True)
+        if self.do_resize and image.size != (self.width, self.height):
+            image = image.resize((self.width, self.height), resample=self.resample)
+        return torch.from_numpy(np.array(image)).permute(2, 0, 1)
+
+    def _staging_buffer(self, batch_size: int) -> torch.Tensor:
+        """Per-thread pinned float32 buffer holding at least batch_size images."""
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None or buffer.shape[0] < batch_size:
+            buffer = torch.empty((batch_size, 3, self.height, self.width), dtype=torch.float32, pin_memory=True)
+            self._local.buffer = buffer
+            self._local.copied = None
+        elif self._local.copied is not None:
+            # The previous non-blocking copy out of this buffer must finish before it is overwritten
+            self._local.copied.synchronize()
+        return buffer[:batch_size]
+
+    def __call__(self, images: Union[Image.Image, Sequence[Image.Image]], device: str = "cpu") -> torch.Tensor:
+        """
+        Preprocess one image or a batch.
+
+        Args:
+            images: PIL Image or list of PIL Images
+            device: Device for the returned tensor
+
+        Returns:
+            pixel_values tensor [batch, 3, H, W] (float32) on device
+        """
+        if isinstance(images, Image.Image):
+            images = [images]
+        to_gpu = self._pin and str(device).startswith("cuda")
+        if to_gpu:
+            pixel_values = self._staging_buffer(len(images))
+        else:
+            pixel_values = torch.empty((len(images), 3, self.height, self.width), dtype=torch.float32)
+
+        # uint8 -> float32 conversion happens in the copy; one in-place multiply-add normalizes the batch
+        for i, image in enumerate(images):
+            pixel_values[i].copy_(self._resize(image))
+        pixel_values.mul_(self.scale).add_(self.bias)
+
+        if to_gpu:
+            on_device = pixel_values.to(device, non_blocking=True)
+            self._local.copied = torch.cuda.Event()
+            self._local.copied.record()
+            return on_device
+        return pixel_values if str(device) == "cpu" else pixel_values.to(device)
+
+    def inputs(self, images: Union[Image.Image, List[Image.Image]], device: str = "cpu") -> dict:
+        """Model keyword arguments, like processor(images=..., return_tensors='pt') moved to device."""
+        return {"pixel_values": self(images, device)}
+
+
+_preprocessors = weakref.WeakKeyDictionary()
+_preprocessors_lock = threading.Lock()
+
+
+def get_preprocessor(processor):
+    """
+    Return the shared preprocessor for an image processor, creating it on first use.
+
+    Processors this module cannot reproduce are wrapped so callers keep the same interface.
+
+    Args:
+        processor: The loaded AutoImageProcessor
+
+    Returns:
+        ImagePreprocessor (or ProcessorFallback)
+    """
+    with _preprocessors_lock:
+        preprocessor = _preprocessors.get(processor)
+        if preprocessor is None:
+            try:
+                preprocessor = ImagePreprocessor(processor)
+            except ValueError as e:
+                log.warning("%s; using the image processor directly", e)
+                preprocessor = ProcessorFallback(processor)
+            _preprocessors[processor] = preprocessor
+        return preprocessor
+
+
+class ProcessorFallback:
+    """Same interface as ImagePreprocessor, calling the image processor itself."""
+
+    def __init__(self, processor):
+        self.processor = processor
+
+    def __call__(self, images, device: str = "cpu") -> torch.Tensor:
+        return self.processor(images=images, return_tensors="pt")["pixel_values"].to(device)
+
+    def inputs(self, images, device: str = "cpu") -> dict:
+        return {"pixel_values": self(images, device)}
+
+
+_CONFIG_FIELDS = ("size", "do_resize", "resample", "do_center_crop", "do_rescale", "rescale_factor",
+                  "do_normalize", "image_mean", "image_std")
+
+
+def preprocessing_config(processor) -> dict:
+    """
+    JSON-serializable settings ImagePreprocessor reads from an image processor.
+
+    Saved next to exported models so they can be served without transformers.
+
+    Args:
+        processor: The loaded AutoImageProcessor
+
+    Returns:
+        Dict accepted by SavedProcessorConfig
+    """
+    config = {}
+    for field in _CONFIG_FIELDS:
+        value = getattr(processor, field, None)
+        if value is None:
+            continue
+        if field == "size":
+            value = dict(value)
+        elif isinstance(value, (list, tuple)):
+            value = [float(v) for v in value]
+        elif field == "resample":
+            value = int(value)
+        config[field] = value
+    config["resize_backend"] = "torchvision" if _uses_torchvision(processor) else "pil"
+    return config
+
+
+class SavedProcessorConfig:
+    """Stand-in for an image processor, rebuilt from preprocessing_config() output."""
+
+    def __init__(self, config: dict):
+        self.resize_backend = "pil"
+        self.__dict__.update(config)
@@ -0,0 +1,158 @@
+"""
+Int8 quantized CPU inference for the SigLIP classifier.
+Dynamic quantization converts the vision encoder's Linear layers to int8 weights
+with activations quantized on the fly; static quantization also fixes activation
+scales from a calibration set. The fp32 model is kept for Grad-CAM, which needs gradients.
+"""
+import copy
+import io
+import logging
+import os
+from typing import List, Optional
+
+import torch
+from PIL import Image
+
+log = logging.getLogger(__name__)
+
+QUANTIZATION_MODES = ("none", "dynamic", "static")
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.bmp')
+
+
+def quantization_from_env() -> str:
+    """Quantization mode from MODEL_QUANTIZATION (none, dynamic or static)."""
+    mode = os.environ.get('MODEL_QUANTIZATION', 'none').lower()
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown MODEL_QUANTIZATION '{mode}' (use one of {', '.join(QUANTIZATION_MODES)})")
+    return mode
+
+
+def _vision_encoder(model) -> torch.nn.Module:
+    """The SigLIP vision tower (the classifier head stays fp32)."""
+    for name in ("vision_model", "siglip"):
+        if hasattr(model, name):
+            return getattr(model, name)
+    return model
+
+
+def _copy_sharing_linear_weights(model) -> torch.nn.Module:
+    """
+    Deep copy of the model whose Linear layers share the original fp32 parameters.
+
+    Those layers are replaced by int8 modules right after, so copying their weights
+    would only add a second fp32 copy to peak memory.
+    """
+    memo = {id(param): param
+            for module in _vision_encoder(model).modules() if type(module) is torch.nn.Linear
+            for param in module.parameters()}
+    return copy.deepcopy(model, memo)
+
+
+def quantize_dynamic_int8(model) -> torch.nn.Module:
+    """
+    Copy of the model with the vision encoder's Linear layers dynamically quantized to int8.
+
+    Args:
+        model: fp32 SiglipForImageClassification (on CPU)
+
+    Returns:
+        Quantized copy; the input model is unchanged
+    """
+    from torch.ao.quantization import quantize_dynamic
+    quantized = _copy_sharing_linear_weights(model)
+    encoder = _vision_encoder(quantized)
+    quantize_dynamic(encoder, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return quantized.eval()
+
+
+class _StaticQuantLinear(torch.nn.Module):
+    """Linear wrapped in quant/dequant stubs so eager-mode static quantization can convert it."""
+
+    def __init__(self, linear: torch.nn.Linear):
+        super().__init__()
+        from torch.ao.quantization import DeQuantStub, QuantStub
+        self.quant = QuantStub()
+        self.linear = linear
+        self.dequant = DeQuantStub()
+
+    def forward(self, x):
+        return self.dequant(self.linear(self.quant(x)))
+
+
+def _wrap_linears(module: torch.nn.Module, qconfig) -> int:
+    """Replace every nn.Linear under module with a _StaticQuantLinear. Returns how many were wrapped."""
+    count = 0
+    for name, child in module.named_children():
+        if type(child) is torch.nn.Linear:
+            wrapper = _StaticQuantLinear(child)
+            wrapper.qconfig = qconfig
+            setattr(module, name, wrapper)
+            count += 1
+        else:
+            count += _wrap_linears(child, qconfig)
+    return count
+
+
+def quantize_static_int8(model, calibration_inputs: List[torch.Tensor]) -> torch.nn.Module:
+    """
+    Copy of the model with the vision encoder's Linear layers statically quantized to int8.
+
+    Activation scales come from running the calibration batches through observers.
+
+    Args:
+        model: fp32 SiglipForImageClassification (on CPU)
+        calibration_inputs: pixel_values tensors representative of production traffic
+
+    Returns:
+        Quantized copy; the input model is unchanged
+    """
+    from torch.ao.quantization import convert, get_default_qconfig, prepare
+    if not calibration_inputs:
+        raise ValueError("Static quantization needs at least one calibration image")
+    quantized = _copy_sharing_linear_weights(model).eval()
+    encoder = _vision_encoder(quantized)
+    _wrap_linears(encoder, get_default_qconfig(torch.backends.quantized.engine))
+    prepare(encoder, inplace=True)
+    with torch.no_grad():
+        for pixel_values in calibration_inputs:
+            quantized(pixel_values=pixel_values)
+    convert(encoder, inplace=True)
+    return quantized.eval()
+
+
+def load_calibration_images(folder: str, limit: int = 64) -> List[Image.Image]:
+    """Load up to limit RGB images from a folder."""
+    files = sorted(f for f in os.listdir(folder) if f.lower().endswith(IMAGE_EXTENSIONS))[:limit]
+    return [Image.open(os.path.join(folder, f)).convert("RGB") for f in files]
+
+
+def build_inference_model(model, preprocess, mode: str, calibration_dir: Optional[str] = None):
+    """
+    Build the model used for no-grad classification.
+
+    Args:
+        model: fp32 model on CPU
+        preprocess: ImagePreprocessor for calibration images
+        mode: none, dynamic or static
+        calibration_dir: Folder of calibration images (static mode)
+
+    Returns:
+        Tuple of (inference model, effective mode); the fp32 model itself for 'none'
+    """
+    if mode == "dynamic":
+        return quantize_dynamic_int8(model), mode
+    if mode == "static":
+        if not calibration_dir or not os.path.isdir(calibration_dir):
+            log.warning("Static quantization needs QUANTIZATION_CALIBRATION_DIR; using dynamic quantization")
+            return quantize_dynamic_int8(model), "dynamic"
+        images = load_calibration_images(calibration_dir)
+        batches = [preprocess(images[i:i + 8]) for i in range(0, len(images), 8)]
+        return quantize_static_int8(model, batches), mode
+    return model, "none"
+
+
+def model_size_mb(model) -> float:
+    """Serialized state_dict size in MB."""
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / (1024 * 1024)
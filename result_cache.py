@@ -0,0 +1,139 @@
+"""
+In-process LRU cache for detection results.
+Keyed by a content hash of the uploaded image, the model name and the request options.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+def make_cache_key(image_bytes: bytes, model_name: str, options: Optional[dict] = None) -> str:
+    """
+    Build a content-addressed cache key.
+
+    Args:
+        image_bytes: Raw uploaded image bytes
+        model_name: Name of the model producing the result
+        options: Request options that change the response (e.g. heatmap on/off)
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    digest = hashlib.sha256(image_bytes)
+    digest.update(b"\0" + model_name.encode("utf-8"))
+    digest.update(b"\0" + json.dumps(options or {}, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def estimate_size(value) -> int:
+    """Approximate memory footprint of a JSON-like result in bytes."""
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(len(str(k)) + estimate_size(v) for k, v in value.items()) + 64
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_size(v) for v in value) + 32
+    return 16
+
+
+class ResultCache:
+    """Thread-safe LRU cache bounded by entry count and total bytes, with optional TTL."""
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 256 * 1024 * 1024, ttl: Optional[float] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of cached results
+            max_bytes: Maximum total (estimated) size of cached results
+            ttl: Seconds an entry stays valid (None or 0 = never expires)
+        """
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max(1, int(max_bytes))
+        self.ttl = ttl if ttl else None
+        self._entries = OrderedDict()  # key -> (value, size, stored_at)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @classmethod
+    def from_env(cls):
+        """Create a cache configured from RESULT_CACHE_* environment variables."""
+        return cls(
+            max_entries=int(os.environ.get('RESULT_CACHE_MAX_ENTRIES', 1024)),
+            max_bytes=int(float(os.environ.get('RESULT_CACHE_MAX_MB', 256)) * 1024 * 1024),
+            ttl=float(os.environ.get('RESULT_CACHE_TTL', 0)),
+        )
+
+    def get(self, key: str, record: bool = True):
+        """
+        Return the cached value for key (and mark it recently used), or None.
+
+        Args:
+            key: Cache key from make_cache_key()
+            record: Whether this lookup counts towards the hit/miss counters
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += record
+                return None
+            value, size, stored_at = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += record
+                return None
+            self._entries.move_to_end(key)
+            self.hits += record
+            return value
+
+    def put(self, key: str, value):
+        """Store a value, evicting least recently used entries to stay within bounds."""
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, time.monotonic())
+            self._total_bytes += size
+            while len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def clear(self):
+        """Remove all entries (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> dict:
+        """Snapshot of cache size and hit/miss/eviction counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _remove(self, key: str):
+        """Drop an entry and update the byte total. Caller holds the lock."""
+        _, size, _ = self._entries.pop(key)
+        self._total_bytes -= size
@@ -1,14 +1,18 @@
 """
 Run the deepfake detector model on images.
 """
-from transformers import AutoImageProcessor, SiglipForImageClassification
-from transformers import file_utils
 from PIL import Image
 import torch
+from preprocessing import get_preprocessor
+from onnx_backend import default_onnx_dir, inference_backend_from_env, load_onnx_classifier
+from log_pipeline import configure_logging
+import logging
 import sys
 import os
 import time
 
+log = logging.getLogger("run_model")
+
 # Label mapping
 id2label = {
     0: "fake",
@@ -17,105 +21,91 @@ id2label = {
 
 def get_model_cache_path():
     """Get the path where the model is cached."""
+    from transformers import file_utils
     cache_dir = file_utils.default_cache_path
     model_cache_path = os.path.join(cache_dir, "models--prithivMLmods--deepfake-detector-model-v1")
     return model_cache_path, cache_dir
 
 def load_model():
     """Load the model and processor."""
+    # transformers is only needed for the PyTorch backend (INFERENCE_BACKEND=onnx skips it)
+    from transformers import AutoImageProcessor, SiglipForImageClassification
     model_name = "prithivMLmods/deepfake-detector-model-v1"
     
-    print("="*70)
-    print("MODEL LOADING INFORMATION")
-    print("="*70)
-    
     # Show GPU info
-    print("\n[1] GPU/Device Check:")
-    print(f"    CUDA Available: {torch.cuda.is_available()}")
     if torch.cuda.is_available():
-        print(f"    GPU Device: {torch.cuda.get_device_name(0)}")
-        print(f"    CUDA Version: {torch.version.cuda}")
+        log.info("Device: CUDA (%s, CUDA %s)", torch.cuda.get_device_name(0), torch.version.cuda)
         device = "cuda"
     else:
-        print("    Using CPU (no GPU detected)")
+        log.info("Device: CPU (no GPU detected)")
         device = "cpu"
     
     # Show model cache location
     model_cache_path, cache_dir = get_model_cache_path()
-    print(f"\n[2] Model Cache Location:")
-    print(f"    Cache Directory: {cache_dir}")
-    print(f"    Model Path: {model_cache_path}")
-    print(f"    Model Exists: {os.path.exists(model_cache_path)}")
-    
-    # Show model source
-    print(f"\n[3] Model Source:")
-    print(f"    Repository: {model_name}")
-    print(f"    Source: Hugging Face Hub (huggingface.co)")
+    log.debug("Model cache: %s (cached: %s)", model_cache_path, os.path.exists(model_cache_path))
     
     # Load model
-    print(f"\n[4] Loading Model...")
+    log.info("Loading %s from the Hugging Face Hub", model_name)
     start_time = time.time()
     model = SiglipForImageClassification.from_pretrained(model_name)
     processor = AutoImageProcessor.from_pretrained(model_name)
     load_time = time.time() - start_time
     
-    print(f"    Model loaded in {load_time:.2f} seconds")
-    print(f"    Model Type: {type(model).__name__}")
-    print(f"    Parameters: {sum(p.numel() for p in model.parameters()):,}")
+    log.info("Model loaded in %.2fs (%s, %s parameters)",
+             load_time, type(model).__name__, f"{sum(p.numel() for p in model.parameters()):,}")
     
     # Set model to evaluation mode
     model.eval()
     
     # Move to GPU if available
-    print(f"\n[5] Moving Model to Device...")
     start_time = time.time()
     model = model.to(device)
     move_time = time.time() - start_time
-    print(f"    Model moved to {device.upper()} in {move_time:.2f} seconds")
-    
-    print("="*70)
+    log.info("Model moved to %s in %.2fs", device.upper(), move_time)
     return model, processor, device
 
+def load_onnx_model():
+    """Load the exported ONNX model; needs neither transformers nor autograd."""
+    model_dir = default_onnx_dir()
+    
+    log.info("Creating ONNX Runtime session for %s", model_dir)
+    start_time = time.time()
+    try:
+        model = load_onnx_classifier(model_dir=model_dir)
+    except FileNotFoundError as e:
+        log.error("%s", e)
+        raise
+    log.info("Session created in %.2fs (%s, %.1f MB)",
+             time.time() - start_time, ", ".join(model.providers), model.size_mb())
+    return model, model.processor, "cpu"
+
 def classify_image(image_path, model, processor, device):
     """Classify an image as real or fake."""
-    print("\n" + "="*70)
-    print("IMAGE PROCESSING & INFERENCE")
-    print("="*70)
-    
     # Load and preprocess image
-    print(f"\n[1] Loading Image:")
-    print(f"    Image Path: {os.path.abspath(image_path)}")
     try:
         start_time = time.time()
         image = Image.open(image_path).convert("RGB")
         load_time = time.time() - start_time
-        print(f"    Image Size: {image.size}")
-        print(f"    Image Mode: {image.mode}")
-        print(f"    Loaded in {load_time:.4f} seconds")
+        log.debug("Loaded %s: %s %s in %.4fs", os.path.abspath(image_path), image.size, image.mode, load_time)
     except Exception as e:
-        print(f"    Error loading image: {e}")
+        log.error("Error loading image %s: %s", image_path, e)
         return None
     
     # Process image
-    print(f"\n[2] Preprocessing Image:")
     start_time = time.time()
-    inputs = processor(images=image, return_tensors="pt")
-    inputs = {k: v.to(device) for k, v in inputs.items()}
+    inputs = get_preprocessor(processor).inputs(image, device)
     prep_time = time.time() - start_time
-    print(f"    Input Shape: {inputs['pixel_values'].shape}")
-    print(f"    Input Device: {inputs['pixel_values'].device}")
-    print(f"    Preprocessed in {prep_time:.4f} seconds")
+    log.debug("Preprocessed in %.4fs: %s on %s",
+              prep_time, tuple(inputs["pixel_values"].shape), inputs["pixel_values"].device)
     
     # Run inference
-    print(f"\n[3] Running Inference on {device.upper()}:")
     start_time = time.time()
     with torch.no_grad():
         outputs = model(**inputs)
         logits = outputs.logits
         probs = torch.nn.functional.softmax(logits, dim=1).squeeze()
     inference_time = time.time() - start_time
-    print(f"    Inference completed in {inference_time:.4f} seconds")
-    print(f"    Raw Logits: {logits.cpu().tolist()}")
+    log.debug("Inference on %s in %.4fs, logits %s", device.upper(), inference_time, logits)
     
     # Get predictions
     probs_list = probs.cpu().tolist()
@@ -128,9 +118,9 @@ def classify_image(image_path, model, processor, device):
     predicted_class = id2label[predicted_class_idx]
     confidence = probs_list[predicted_class_idx]
     
-    print(f"\n[4] Results:")
-    print(f"    Predicted Class: {predicted_class.upper()}")
-    print(f"    Confidence: {confidence:.2%}")
+    log.info("classify", extra={"image": image_path, "prediction": predicted_class, "confidence": round(confidence, 4),
+                                "preprocess_ms": round(prep_time * 1000, 2),
+                                "inference_ms": round(inference_time * 1000, 2)})
     
     return {
         "predictions": prediction,
@@ -142,9 +132,14 @@ def classify_image(image_path, model, processor, device):
 def main():
     """Main function to run the model."""
     total_start_time = time.time()
+    # Logs go to stderr (step details are DEBUG: LOG_LEVEL=DEBUG shows them); the results go to stdout
+    configure_logging(default_format="text", stream=sys.stderr)
     
-    # Load model
-    model, processor, device = load_model()
+    # Load model (INFERENCE_BACKEND=onnx runs the exported model with ONNX Runtime)
+    if inference_backend_from_env() == "onnx":
+        model, processor, device = load_onnx_model()
+    else:
+        model, processor, device = load_model()
     
     # Check if image path is provided
     if len(sys.argv) > 1:
@@ -157,7 +152,7 @@ def main():
         image_path = input("\nEnter the path to an image file: ").strip().strip('"')
     
     if not os.path.exists(image_path):
-        print(f"Error: Image file not found: {image_path}")
+        log.error("Image file not found: %s", image_path)
         return
     
     # Classify image
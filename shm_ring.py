@@ -0,0 +1,250 @@
+"""
+Shared-memory tensor ring buffer between HTTP front-end processes and one
+model-owner process.
+Front-ends write preprocessed pixel_values into a free slot and queue its index;
+the owner drains queued slots in batches, runs one forward over them and writes
+the logits back into the same slots. Tensors live in one SharedMemory block and
+are read in place, so nothing is pickled across the process boundary. The
+semaphores and lock are inherited through fork(), so the ring must be created
+before the front-ends and the owner are forked.
+"""
+import multiprocessing as mp
+import time
+from multiprocessing import shared_memory
+from typing import List, Optional, Sequence
+
+import numpy as np
+import torch
+
+from compiled_engine import LogitsOutput
+from inference_scheduler import DeadlineExceededError, SchedulerFullError
+
+# Slot states
+FREE, FILLING, QUEUED, RUNNING, DONE, FAILED, ABANDONED = range(7)
+_ALIGN = 64
+
+
+class TensorRing:
+    """Fixed number of input/output slots plus a FIFO of queued slot indices, all in shared memory."""
+
+    def __init__(self, num_slots: int, input_shape: Sequence[int], num_labels: int, ctx=None):
+        """
+        Allocate the shared block and the cross-process primitives.
+
+        Args:
+            num_slots: Maximum number of images in flight across all front-ends
+            input_shape: (channels, height, width) of one image's pixel_values
+            num_labels: Number of logits per image
+            ctx: multiprocessing context (default: fork)
+        """
+        ctx = ctx or mp.get_context("fork")
+        self.num_slots = max(1, int(num_slots))
+        self.input_shape = tuple(input_shape)
+        self.num_labels = int(num_labels)
+
+        n = self.num_slots
+        layout = [
+            ("states", np.uint8, (n,)),
+            ("fifo", np.int32, (n,)),
+            ("counters", np.int64, (2,)),  # head, tail of the FIFO
+            ("batch_sizes", np.int32, (n,)),
+            ("pixels", np.float32, (n, *self.input_shape)),
+            ("logits", np.float32, (n, self.num_labels)),
+        ]
+        offsets = []
+        size = 0
+        for name, dtype, shape in layout:
+            size = (size + _ALIGN - 1) // _ALIGN * _ALIGN
+            offsets.append((name, dtype, shape, size))
+            size += int(np.prod(shape)) * np.dtype(dtype).itemsize
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        for name, dtype, shape, offset in offsets:
+            setattr(self, name, np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=offset))
+        self.states[:] = FREE
+        self.counters[:] = 0
+
+        self._lock = ctx.Lock()
+        self._free = ctx.Semaphore(n)
+        self._queued = ctx.Semaphore(0)
+        self._done = [ctx.Semaphore(0) for _ in range(n)]
+
+    def size_mb(self) -> float:
+        return self.shm.size / (1024 * 1024)
+
+    def queue_depth(self) -> int:
+        """Slots queued but not yet taken by the owner."""
+        return int(self.counters[1] - self.counters[0])
+
+    # Front-end side
+
+    def submit(self, pixel_values: torch.Tensor) -> tuple:
+        """
+        Copy one image into a free slot and queue it.
+
+        Returns:
+            (slot, queue depth at submission)
+
+        Raises:
+            SchedulerFullError: Every slot is in use
+        """
+        if not self._free.acquire(False):
+            raise SchedulerFullError(f"Inference ring is full ({self.num_slots} images in flight)")
+        with self._lock:
+            slot = int(np.flatnonzero(self.states == FREE)[0])
+            self.states[slot] = FILLING
+        self.pixels[slot] = pixel_values.reshape(self.input_shape).numpy()
+        with self._lock:
+            depth = self.queue_depth()
+            self.fifo[self.counters[1] % self.num_slots] = slot
+            self.counters[1] += 1
+            self.states[slot] = QUEUED
+        self._queued.release()
+        return slot, depth
+
+    def wait(self, slot: int, timeout: Optional[float] = None) -> tuple:
+        """
+        Wait for a slot's logits and free the slot.
+
+        Returns:
+            (logits array copy, size of the batch it ran in)
+
+        Raises:
+            TimeoutError: Not done within timeout (the owner frees the slot when it dequeues or finishes it)
+            RuntimeError: The owner's forward failed
+        """
+        if not self._done[slot].acquire(True, timeout):
+            with self._lock:
+                if self.states[slot] not in (DONE, FAILED):
+                    self.states[slot] = ABANDONED
+                    raise TimeoutError(f"No result for ring slot {slot} within {timeout}s")
+            # Finished while we were giving up
+            self._done[slot].acquire()
+        failed = self.states[slot] == FAILED
+        logits = self.logits[slot].copy()
+        batch_size = int(self.batch_sizes[slot])
+        with self._lock:
+            self.states[slot] = FREE
+        self._free.release()
+        if failed:
+            raise RuntimeError("Inference failed in the model-owner process")
+        return logits, batch_size
+
+    # Owner side
+
+    def _pop(self) -> Optional[int]:
+        """Next queued slot, or None when its front-end already gave up waiting (the slot is freed here)."""
+        with self._lock:
+            slot = int(self.fifo[self.counters[0] % self.num_slots])
+            self.counters[0] += 1
+            if self.states[slot] == ABANDONED:
+                self.states[slot] = FREE
+                self._free.release()
+                return None
+            self.states[slot] = RUNNING
+        return slot
+
+    def _acquire_queued(self, timeout: float) -> bool:
+        return self._queued.acquire(True, timeout) if timeout > 0 else self._queued.acquire(False)
+
+    def take_batch(self, max_batch_size: int, max_wait: float, timeout: float = 1.0) -> List[int]:
+        """
+        Block for the first queued slot, then gather more until the batch is full or max_wait passes.
+        Slots whose front-end timed out while queued are freed instead of run.
+
+        Returns:
+            Slot indices (empty if nothing arrived within timeout)
+        """
+        give_up = time.monotonic() + timeout
+        slots = []
+        while not slots:
+            if not self._acquire_queued(give_up - time.monotonic()):
+                return []
+            slot = self._pop()
+            if slot is not None:
+                slots.append(slot)
+        deadline = time.monotonic() + max_wait
+        while len(slots) < max_batch_size:
+            if not self._acquire_queued(deadline - time.monotonic()):
+                break
+            slot = self._pop()
+            if slot is not None:
+                slots.append(slot)
+        return slots
+
+    def inputs(self, slots: List[int]) -> torch.Tensor:
+        """pixel_values for the slots (a view when they are consecutive, one gather otherwise)."""
+        start = slots[0]
+        if slots == list(range(start, start + len(slots))):
+            return torch.from_numpy(self.pixels[start:start + len(slots)])
+        return torch.from_numpy(self.pixels[slots])
+
+    def complete(self, slots: List[int], logits: Optional[np.ndarray]):
+        """Write logits (None on failure) into the slots and wake their waiters."""
+        if logits is not None:
+            self.logits[slots] = logits
+        self.batch_sizes[slots] = len(slots)
+        with self._lock:
+            for slot in slots:
+                if self.states[slot] == ABANDONED:
+                    # The front-end gave up waiting; recycle the slot here
+                    self.states[slot] = FREE
+                    self._free.release()
+                else:
+                    self.states[slot] = DONE if logits is not None else FAILED
+                    self._done[slot].release()
+
+    def close(self, unlink: bool = False):
+        """Detach from the shared block (and remove it, from the process that created it)."""
+        for name in ("states", "fifo", "counters", "batch_sizes", "pixels", "logits"):
+            setattr(self, name, None)
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+class RingClient:
+    """Front-end handle with the BatchScheduler.predict interface, backed by a TensorRing."""
+
+    def __init__(self, ring: TensorRing, max_batch_size: int, max_wait: float, timeout: float = 60.0):
+        self.ring = ring
+        # Reported like the in-process scheduler's settings; the owner applies them
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_queue_size = ring.num_slots
+        self.timeout = timeout
+
+    def queue_depth(self) -> int:
+        return self.ring.queue_depth()
+
+    def predict(self, pixel_values: torch.Tensor, timeout: Optional[float] = None,
+                deadline: Optional[float] = None, client: str = "", lane: str = "interactive") -> dict:
+        """
+        Classify one image; returns 'logits', 'probs', 'batch_size' and 'queue_depth' like BatchScheduler.
+
+        The ring is served in arrival order: client and lane are accepted for interface
+        compatibility, and only the ClientGate limits apply across front-ends.
+        """
+        # The owner does not see deadlines; an expired request is dropped before it enters the ring
+        if deadline is not None and deadline <= time.monotonic():
+            raise DeadlineExceededError("Request deadline passed before inference")
+        slot, depth = self.ring.submit(pixel_values.cpu())
+        logits, batch_size = self.ring.wait(slot, self.timeout if timeout is None else timeout)
+        logits = torch.from_numpy(logits)
+        return {
+            "logits": logits,
+            "probs": torch.softmax(logits, dim=0),
+            "batch_size": batch_size,
+            "queue_depth": depth,
+        }
+
+    def __call__(self, pixel_values: torch.Tensor) -> LogitsOutput:
+        """Classify a batch: every image is queued before waiting, so the owner can batch them together."""
+        slots = []
+        try:
+            for image in pixel_values.cpu():
+                slots.append(self.ring.submit(image)[0])
+        except SchedulerFullError:
+            for slot in slots:
+                self.ring.wait(slot, self.timeout)
+            raise
+        return LogitsOutput(torch.stack([torch.from_numpy(self.ring.wait(slot, self.timeout)[0]) for slot in slots]))
@@ -0,0 +1,95 @@
+"""
+Single-flight coalescing of identical in-flight work.
+The first caller for a key runs the computation; callers arriving with the same
+key while it runs wait on its future and get the same result (or the same
+exception) instead of starting a duplicate.
+"""
+import threading
+from concurrent.futures import CancelledError, Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Callable, Hashable, Optional, Tuple
+
+
+class SingleFlight:
+    """Per-key deduplication of concurrent calls, safe across threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._counters = {"leaders": 0, "coalesced": 0, "retried": 0, "shared_errors": 0}
+
+    def do(self, key: Hashable, func: Callable[[], object], shareable: Callable[[object], bool] = lambda result: True,
+           timeout: Optional[float] = None) -> Tuple[object, bool]:
+        """
+        Run func once per key among concurrent callers.
+
+        Args:
+            key: Identity of the computation
+            func: The computation, run by the first caller
+            shareable: Whether a result may be handed to waiting callers; when it is not
+                (e.g. a rejection that depends on the first caller's own deadline), they retry
+            timeout: Seconds a waiting caller waits for the first one
+
+        Returns:
+            Tuple of (result, coalesced), coalesced being True for callers that waited
+
+        Raises:
+            Whatever func raised, in the first caller and in every caller that waited on it
+            concurrent.futures.TimeoutError: A waiting caller gave up after timeout seconds
+        """
+        while True:
+            with self._lock:
+                future = self._calls.get(key)
+                leader = future is None
+                if leader:
+                    future = self._calls[key] = Future()
+                    self._counters["leaders"] += 1
+            if leader:
+                return self._lead(key, future, func, shareable), False
+            try:
+                result = future.result(timeout)
+            except CancelledError:
+                # The first caller was interrupted, or its result was not shareable: start over
+                self._count("retried")
+                continue
+            except FutureTimeoutError:
+                raise
+            except Exception:
+                self._count("shared_errors")
+                self._count("coalesced")
+                raise
+            self._count("coalesced")
+            return result, True
+
+    def _lead(self, key, future: Future, func, shareable):
+        try:
+            result = func()
+        except Exception as e:
+            self._finish(key)
+            future.set_exception(e)
+            raise
+        except BaseException:
+            # Interrupted (e.g. SystemExit): waiters retry rather than inherit it
+            self._finish(key)
+            future.cancel()
+            raise
+        # Later arrivals start fresh (and normally hit the result cache filled by func)
+        self._finish(key)
+        if shareable(result):
+            future.set_result(result)
+        else:
+            future.cancel()
+        return result
+
+    def _finish(self, key):
+        with self._lock:
+            self._calls.pop(key, None)
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def stats(self) -> dict:
+        """Computations started, callers served by another's computation, retries, and in-flight keys."""
+        with self._lock:
+            return dict(self._counters, in_flight=len(self._calls))
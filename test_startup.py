@@ -0,0 +1,70 @@
+"""
+Startup budget regression test.
+Starts the API in a fresh interpreter with the Hub disabled (HF_HUB_OFFLINE=1),
+loads the model from the local snapshot and checks that:
+  - the total startup time stays within STARTUP_BUDGET_S (default 30s)
+  - cv2 and matplotlib were not imported (they load with the first heatmap)
+  - /api/health/live answers and /api/health/ready reports ready
+
+Needs the model to be cached first: python download_model.py
+Usage: python test_startup.py
+"""
+import json
+import os
+import subprocess
+import sys
+
+STARTUP_BUDGET_S = float(os.environ.get('STARTUP_BUDGET_S', 30))
+DEFERRED_MODULES = ("cv2", "matplotlib")
+
+CHILD = """
+import json, sys
+import backend_api
+client = backend_api.app.test_client()
+live = client.get('/api/health/live').status_code
+backend_api.load_model()
+ready = client.get('/api/health/ready')
+print("STARTUP_RESULT " + json.dumps({
+    "report": backend_api.startup_report,
+    "imported": [name for name in %r if name in sys.modules],
+    "live": live,
+    "ready": ready.status_code,
+}))
+""" % (DEFERRED_MODULES,)
+
+
+def measure_startup() -> dict:
+    """Run a cold API start in a subprocess and return its result."""
+    env = dict(os.environ, HF_HUB_OFFLINE="1", MODEL_COMPILE="none", DISK_CACHE_DIR="")
+    proc = subprocess.run([sys.executable, "-c", CHILD], capture_output=True, text=True, env=env,
+                          cwd=os.path.dirname(os.path.abspath(__file__)), timeout=STARTUP_BUDGET_S * 4)
+    for line in proc.stdout.splitlines():
+        if line.startswith("STARTUP_RESULT "):
+            return json.loads(line.split(" ", 1)[1])
+    raise AssertionError(f"API did not start (exit code {proc.returncode}):\n{proc.stdout[-2000:]}\n{proc.stderr[-2000:]}")
+
+
+def test_startup_budget():
+    result = measure_startup()
+    report = result["report"]
+
+    print("Startup breakdown:")
+    for stage in ("import", "load", "move", "engine", "warmup", "total"):
+        print(f"  {stage:>7}: {report.get(stage, 0):.2f}s")
+
+    assert result["live"] == 200, f"/api/health/live returned {result['live']}"
+    assert result["ready"] == 200, f"/api/health/ready returned {result['ready']} after load"
+    assert not result["imported"], f"Imported at startup, should be deferred: {', '.join(result['imported'])}"
+    assert report["total"] <= STARTUP_BUDGET_S, \
+        f"Startup took {report['total']:.2f}s, budget is {STARTUP_BUDGET_S:.0f}s"
+
+
+if __name__ == "__main__":
+    print("Testing cold start...")
+    print("=" * 50)
+    try:
+        test_startup_budget()
+    except AssertionError as e:
+        print(f"\n❌ {e}")
+        sys.exit(1)
+    print(f"\n✅ Startup within {STARTUP_BUDGET_S:.0f}s budget")
@@ -0,0 +1,101 @@
+"""
+Fetching user-supplied image URLs without exposing the internal network.
+Every connection, including each redirect hop, resolves the host once and only
+connects to the addresses it vetted: loopback, private, link-local, reserved,
+multicast and other non-global addresses are refused, so a URL (or a DNS answer
+that changes between check and connect) cannot reach the metadata service or
+anything else on the private network. Only http and https are followed.
+"""
+import http.client
+import ipaddress
+import socket
+import urllib.request
+
+
+class UnsafeURLError(ValueError):
+    """Raised when a URL's host resolves to an address the server must not fetch from."""
+
+
+def public_addresses(host: str, port: int) -> list:
+    """
+    Resolve host to the socket addresses to connect to.
+
+    Raises:
+        UnsafeURLError: If any address it resolves to is not a public unicast address
+    """
+    addresses = []
+    for family, _, _, _, sockaddr in socket.getaddrinfo(host, port, type=socket.SOCK_STREAM):
+        ip = ipaddress.ip_address(sockaddr[0])
+        if ip.version == 6 and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+        if not ip.is_global or ip.is_multicast:
+            raise UnsafeURLError(f"Refusing to fetch from {host}: it resolves to a non-public address ({ip})")
+        addresses.append((family, sockaddr))
+    return addresses
+
+
+def _create_public_connection(address, timeout, source_address=None) -> socket.socket:
+    """socket.create_connection, restricted to the vetted addresses of the host."""
+    host, port = address
+    error = None
+    for family, sockaddr in public_addresses(host, port):
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(timeout)
+            if source_address:
+                sock.bind(source_address)
+            sock.connect(sockaddr)
+            return sock
+        except OSError as e:
+            sock.close()
+            error = e
+    raise error or OSError(f"No addresses for {host}")
+
+
+class _PublicHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _create_public_connection
+
+
+class _PublicHTTPSConnection(http.client.HTTPSConnection):
+    # Certificate and SNI checks still use the URL's host name
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _create_public_connection
+
+
+class _PublicHTTPHandler(urllib.request.HTTPHandler):
+    def http_open(self, req):
+        return self.do_open(_PublicHTTPConnection, req)
+
+
+class _PublicHTTPSHandler(urllib.request.HTTPSHandler):
+    def https_open(self, req):
+        return self.do_open(_PublicHTTPSConnection, req, context=self._context)
+
+
+def _build_opener() -> urllib.request.OpenerDirector:
+    # No proxy, ftp, file or data handlers: a redirect to any other scheme fails
+    opener = urllib.request.OpenerDirector()
+    for handler in (_PublicHTTPHandler(), _PublicHTTPSHandler(), urllib.request.HTTPRedirectHandler(),
+                    urllib.request.HTTPDefaultErrorHandler(), urllib.request.HTTPErrorProcessor(),
+                    urllib.request.UnknownHandler()):
+        opener.add_handler(handler)
+    return opener
+
+
+_opener = _build_opener()
+
+
+def open_public_url(url: str, timeout: float):
+    """
+    urllib.request.urlopen for untrusted http(s) URLs: only public addresses, on every redirect too.
+
+    Raises:
+        UnsafeURLError: If the URL is not http(s), or it or a redirect target resolves to a non-public address
+        urllib.error.URLError: Any other fetch failure (including redirects to other schemes)
+    """
+    if not url.lower().startswith(('http://', 'https://')):
+        raise UnsafeURLError("Only http(s) URLs are supported")
+    return _opener.open(url, timeout=timeout)
@@ -0,0 +1,93 @@
+"""
+Verify image_ingest.decode_image on the image modes uploads actually arrive in:
+palette PNG/GIF/TIFF, grayscale GIF, 1-bit, 16/32-bit integer and float, alpha and
+CMYK. Both reduced decodes (model-size copy and capped heatmap copy) must return
+RGB at the expected size and match a full decode resized the same way.
+
+Usage: python verify_decode.py
+"""
+import io
+import sys
+
+from PIL import Image, ImageChops, ImageStat
+
+from benchmark_utils import encode_image, synthetic_image
+from heatmap_renderer import RENDER_MAX_DIM
+from image_ingest import DECODE_OVERSAMPLE, DEFAULT_INPUT_SIZE, decode_image
+
+# Large enough that both decodes take the box-reduce path (at least 2x over RENDER_MAX_DIM)
+WIDTH, HEIGHT = 4400, 3300
+MODEL_MIN_SIZE = (DEFAULT_INPUT_SIZE[0] * DECODE_OVERSAMPLE, DEFAULT_INPUT_SIZE[1] * DECODE_OVERSAMPLE)
+# Mean absolute difference per channel (0-255) to a full decode resized to the same size
+TOLERANCE = 6.0
+
+
+def make_cases():
+    rgb = synthetic_image(WIDTH, HEIGHT)
+    gray = rgb.convert("L")
+    palette = rgb.convert("P", palette=Image.Palette.ADAPTIVE, colors=256)
+    return [
+        ("palette PNG", palette, "PNG"),
+        ("palette GIF", palette, "GIF"),
+        ("grayscale GIF", gray, "GIF"),
+        ("palette TIFF", palette, "TIFF"),
+        ("1-bit PNG", rgb.convert("1"), "PNG"),
+        ("1-bit TIFF", rgb.convert("1"), "TIFF"),
+        ("16-bit PNG", gray.convert("I").point(lambda v: v * 256).convert("I;16"), "PNG"),
+        ("32-bit TIFF", gray.convert("I"), "TIFF"),
+        ("float TIFF", gray.convert("F"), "TIFF"),
+        ("LA PNG", gray.convert("LA"), "PNG"),
+        ("RGBA PNG", rgb.convert("RGBA"), "PNG"),
+        ("CMYK JPEG", rgb.convert("CMYK"), "JPEG"),
+    ]
+
+
+def mean_diff(image, data):
+    reference = Image.open(io.BytesIO(data)).convert("RGB").resize(image.size, Image.Resampling.BOX)
+    return max(ImageStat.Stat(ImageChops.difference(image, reference)).mean)
+
+
+def check(decoded, data, expected_size=None):
+    """Returns (ok, detail) for one decode result."""
+    if decoded.mode != "RGB":
+        return False, f"mode {decoded.mode}"
+    if expected_size is not None and decoded.size != expected_size:
+        return False, f"size {decoded.size[0]}x{decoded.size[1]}"
+    if decoded.size[0] < min(MODEL_MIN_SIZE[0], WIDTH) or decoded.size[1] < min(MODEL_MIN_SIZE[1], HEIGHT):
+        return False, f"size {decoded.size[0]}x{decoded.size[1]} below the model minimum"
+    diff = mean_diff(decoded, data)
+    return diff <= TOLERANCE, f"{decoded.size[0]}x{decoded.size[1]} diff={diff:.2f}"
+
+
+def main():
+    scale = RENDER_MAX_DIM / max(WIDTH, HEIGHT)
+    capped = (round(WIDTH * scale), round(HEIGHT * scale)) if scale < 1 else None
+
+    print("\n" + "=" * 78)
+    print("DECODE VERIFICATION")
+    print("=" * 78)
+    print(f"Source: {WIDTH}x{HEIGHT}  Model decode covers {MODEL_MIN_SIZE[0]}x{MODEL_MIN_SIZE[1]}, "
+          f"heatmap decode capped at {RENDER_MAX_DIM}px")
+    print(f"\n{'case':>14} {'stored':>7} {'model decode':>26} {'heatmap decode':>26}")
+
+    failures = 0
+    for name, image, fmt in make_cases():
+        data = encode_image(image, fmt)
+        stored = Image.open(io.BytesIO(data)).mode
+        cells = []
+        for kwargs, expected in (({"min_size": MODEL_MIN_SIZE}, None), ({"max_dim": RENDER_MAX_DIM}, capped)):
+            try:
+                ok, detail = check(decode_image(data, **kwargs)[0], data, expected)
+            except Exception as e:
+                ok, detail = False, f"{type(e).__name__}: {e}"
+            failures += not ok
+            cells.append(f"{'ok' if ok else 'FAIL'} {detail}")
+        print(f"{name:>14} {stored:>7} {cells[0]:>26} {cells[1]:>26}")
+
+    print("\n" + ("✓ All decodes passed" if not failures else f"✗ {failures} decode(s) failed"))
+    print("=" * 78)
+    return 0 if not failures else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
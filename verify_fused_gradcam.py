@@ -0,0 +1,92 @@
+"""
+Verify that fused classification + Grad-CAM matches the separate no-grad path.
+Compares probabilities and heatmap overlays, and reports CPU time for both paths.
+
+Usage: python verify_fused_gradcam.py [image_or_folder ...]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+from PIL import Image
+
+from benchmark_utils import load_benchmark_model, synthetic_image
+from grad_cam_utils import get_gradcam
+from preprocessing import get_preprocessor
+
+PROB_TOLERANCE = 1e-5
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.bmp')
+
+
+def collect_images(paths):
+    """Load images from files/folders, or fall back to 1.png and synthetic images."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(os.path.join(path, f) for f in os.listdir(path) if f.lower().endswith(IMAGE_EXTENSIONS))
+        else:
+            files.append(path)
+    if not files and os.path.exists("1.png"):
+        files.append("1.png")
+    images = [Image.open(f).convert("RGB") for f in files]
+    images += [synthetic_image(640, 480, seed=i) for i in range(max(0, 4 - len(images)))]
+    return images
+
+
+def separate_path(model, processor, device, gradcam, image):
+    """Today's explained request: no-grad classification, then Grad-CAM."""
+    inputs = get_preprocessor(processor).inputs(image, device)
+    with torch.no_grad():
+        probs = torch.nn.functional.softmax(model(**inputs).logits, dim=1)[0].cpu()
+    predicted = int(torch.argmax(probs).item())
+    _, overlay = gradcam.generate_cam(image, target_class=predicted, is_fake=(predicted == 0))
+    return probs, overlay
+
+
+def main():
+    model, processor, device = load_benchmark_model()
+    gradcam = get_gradcam(model, processor, device)
+    images = collect_images(sys.argv[1:])
+
+    print("\n" + "=" * 60)
+    print("FUSED GRAD-CAM VERIFICATION")
+    print("=" * 60)
+    print(f"Images: {len(images)}  Device: {device.upper()}")
+
+    max_prob_diff = 0.0
+    max_overlay_diff = 0
+    cpu_separate = 0.0
+    cpu_fused = 0.0
+    for i, image in enumerate(images):
+        start = time.process_time()
+        probs_separate, overlay_separate = separate_path(model, processor, device, gradcam, image)
+        cpu_separate += time.process_time() - start
+
+        start = time.process_time()
+        probs_fused, _, overlay_fused = gradcam.classify_and_explain(image)
+        cpu_fused += time.process_time() - start
+
+        prob_diff = float((probs_separate - probs_fused).abs().max())
+        overlay_diff = int(np.abs(overlay_separate.astype(np.int16) - overlay_fused.astype(np.int16)).max())
+        max_prob_diff = max(max_prob_diff, prob_diff)
+        max_overlay_diff = max(max_overlay_diff, overlay_diff)
+        print(f"   [{i + 1}] fake={probs_fused[0]:.4f} real={probs_fused[1]:.4f} "
+              f"prob diff={prob_diff:.2e} overlay diff={overlay_diff}")
+
+    print("\nResults:")
+    print(f"   - Max probability difference: {max_prob_diff:.2e} (tolerance {PROB_TOLERANCE:.0e})")
+    print(f"   - Max overlay pixel difference: {max_overlay_diff}")
+    print(f"   - CPU time separate: {cpu_separate:.3f}s  fused: {cpu_fused:.3f}s "
+          f"({(1 - cpu_fused / cpu_separate) * 100:.1f}% less)")
+
+    ok = max_prob_diff <= PROB_TOLERANCE
+    print("\n" + "=" * 60)
+    print("VERIFICATION PASSED" if ok else "VERIFICATION FAILED")
+    print("=" * 60)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
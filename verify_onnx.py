@@ -0,0 +1,63 @@
+"""
+Verify that the ONNX Runtime backend matches the PyTorch model.
+Exports the model to a temporary folder, then compares preprocessing from the
+saved settings, per-image probabilities and a batched run (dynamic batch axis).
+
+Usage: python verify_onnx.py [image_or_folder ...]
+"""
+import sys
+import tempfile
+
+import torch
+
+from benchmark_utils import load_benchmark_model
+from onnx_backend import OnnxClassifier, export_onnx
+from preprocessing import get_preprocessor
+from verify_fused_gradcam import collect_images
+
+PROB_TOLERANCE = 1e-4
+
+
+def main():
+    model, processor, device = load_benchmark_model()
+    images = collect_images(sys.argv[1:])
+
+    print("\n" + "=" * 60)
+    print("ONNX RUNTIME VERIFICATION")
+    print("=" * 60)
+    with tempfile.TemporaryDirectory() as model_dir:
+        export_onnx(model, processor, model_dir)
+        engine = OnnxClassifier(model_dir, device)
+        print(f"Images: {len(images)}  Device: {device.upper()}  Providers: {', '.join(engine.providers)}")
+
+        pixel_values = get_preprocessor(processor)(images)
+        prep_diff = float((pixel_values - get_preprocessor(engine.processor)(images)).abs().max())
+        print(f"   Preprocessing from saved settings: max diff={prep_diff:.2e}")
+
+        with torch.no_grad():
+            reference = torch.softmax(model(pixel_values=pixel_values.to(device)).logits.float().cpu(), dim=1)
+        max_prob_diff = 0.0
+        for i in range(len(images)):
+            probs = torch.softmax(engine(pixel_values=pixel_values[i:i + 1]).logits, dim=1)[0]
+            prob_diff = float((probs - reference[i]).abs().max())
+            max_prob_diff = max(max_prob_diff, prob_diff)
+            print(f"   [{i + 1}] fake={probs[0]:.4f} real={probs[1]:.4f} prob diff={prob_diff:.2e}")
+
+        batch_probs = torch.softmax(engine(pixel_values=pixel_values).logits, dim=1)
+        batch_diff = float((batch_probs - reference).abs().max())
+        max_prob_diff = max(max_prob_diff, batch_diff)
+        print(f"   [batch of {len(images)}] prob diff={batch_diff:.2e}")
+
+    print("\nResults:")
+    print(f"   - Max probability difference: {max_prob_diff:.2e} (tolerance {PROB_TOLERANCE:.0e})")
+    print(f"   - Preprocessing difference: {prep_diff:.2e}")
+
+    ok = max_prob_diff <= PROB_TOLERANCE and prep_diff == 0.0
+    print("\n" + "=" * 60)
+    print("VERIFICATION PASSED" if ok else "VERIFICATION FAILED")
+    print("=" * 60)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
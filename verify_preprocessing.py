@@ -0,0 +1,71 @@
+"""
+Verify that preprocessing.ImagePreprocessor matches the model's AutoImageProcessor.
+Compares pixel_values for single images and a mixed-size batch, and reports the
+time both take.
+
+Usage: python verify_preprocessing.py [image_or_folder ...]
+"""
+import sys
+import time
+
+import torch
+
+from benchmark_utils import load_benchmark_model, synthetic_image
+from preprocessing import get_preprocessor
+from verify_fused_gradcam import collect_images
+
+TOLERANCE = 1e-5
+
+
+def best_time_ms(func, repeats=10):
+    func()
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    _, processor, _ = load_benchmark_model()
+    preprocess = get_preprocessor(processor)
+    images = collect_images(sys.argv[1:])
+    images += [synthetic_image(4000, 3000, seed=10), synthetic_image(300, 900, seed=11)]
+
+    print("\n" + "=" * 60)
+    print("PREPROCESSING VERIFICATION")
+    print("=" * 60)
+    print(f"Processor: {type(processor).__name__}  Preprocessor: {type(preprocess).__name__}")
+
+    max_diff = 0.0
+    for i, image in enumerate(images):
+        reference = processor(images=image, return_tensors="pt")["pixel_values"]
+        diff = float((reference - preprocess(image)).abs().max())
+        max_diff = max(max_diff, diff)
+        print(f"   [{i + 1}] {image.size[0]}x{image.size[1]} max diff={diff:.2e}")
+
+    reference = processor(images=images, return_tensors="pt")["pixel_values"]
+    batch_diff = float((reference - preprocess(images)).abs().max())
+    max_diff = max(max_diff, batch_diff)
+    print(f"   [batch of {len(images)}] max diff={batch_diff:.2e}")
+
+    batch = [synthetic_image(640, 480, seed=i) for i in range(16)]
+    with torch.no_grad():
+        processor_ms = best_time_ms(lambda: processor(images=batch, return_tensors="pt"))
+        preprocess_ms = best_time_ms(lambda: preprocess(batch))
+
+    print("\nResults:")
+    print(f"   - Max difference: {max_diff:.2e} (tolerance {TOLERANCE:.0e})")
+    print(f"   - 16 x 640x480: AutoImageProcessor {processor_ms:.2f}ms, "
+          f"preprocessing {preprocess_ms:.2f}ms ({processor_ms / preprocess_ms:.1f}x)")
+
+    ok = max_diff <= TOLERANCE
+    print("\n" + "=" * 60)
+    print("VERIFICATION PASSED" if ok else "VERIFICATION FAILED")
+    print("=" * 60)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
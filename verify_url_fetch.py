@@ -0,0 +1,101 @@
+"""
+Verify that url_fetch refuses URLs that reach internal addresses.
+Checks the address classification, then fetches from a local HTTP server: direct
+requests must be refused, and with the server standing in for a public host, a
+redirect to the cloud metadata address or another scheme must fail.
+
+Usage: python verify_url_fetch.py
+"""
+import http.server
+import socket
+import sys
+import threading
+import urllib.error
+
+import url_fetch
+from url_fetch import UnsafeURLError, open_public_url, public_addresses
+
+REFUSED_HOSTS = ["127.0.0.1", "localhost", "10.0.0.5", "172.16.0.1", "192.168.1.1", "169.254.169.254",
+                 "100.64.0.1", "0.0.0.0", "224.0.0.1", "::1", "fe80::1", "fd00::1", "::ffff:127.0.0.1"]
+PUBLIC_HOSTS = ["8.8.8.8", "1.1.1.1", "2606:4700:4700::1111"]
+
+
+class RedirectHandler(http.server.BaseHTTPRequestHandler):
+    TARGETS = {"/metadata": "http://169.254.169.254/latest/meta-data/", "/ftp": "ftp://example.com/image.jpg",
+               "/file": "file:///etc/passwd"}
+
+    def do_GET(self):
+        if self.path in self.TARGETS:
+            self.send_response(302)
+            self.send_header("Location", self.TARGETS[self.path])
+            self.end_headers()
+        else:
+            self.send_response(200)
+            self.end_headers()
+            self.wfile.write(b"image")
+
+    def log_message(self, *args):
+        pass
+
+
+def refused(url):
+    """Returns (ok, detail): ok when fetching url fails."""
+    try:
+        with open_public_url(url, timeout=2):
+            return False, "fetched"
+    except (UnsafeURLError, urllib.error.URLError) as e:
+        return True, f"{type(e).__name__}: {e}"
+
+
+def main():
+    ok = True
+    print("\n" + "=" * 60)
+    print("URL FETCH VERIFICATION")
+    print("=" * 60)
+
+    print("\nAddress checks:")
+    for host in REFUSED_HOSTS + PUBLIC_HOSTS:
+        try:
+            public_addresses(host, 80)
+            allowed = True
+        except UnsafeURLError:
+            allowed = False
+        passed = allowed == (host in PUBLIC_HOSTS)
+        ok &= passed
+        print(f"   {'✓' if passed else '✗'} {host:22s} {'allowed' if allowed else 'refused'}")
+
+    server = http.server.HTTPServer(("127.0.0.1", 0), RedirectHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    print("\nLocal server:")
+    for url in (f"{base}/image.jpg", f"http://localhost:{server.server_port}/image.jpg", "file:///etc/passwd"):
+        passed, detail = refused(url)
+        ok &= passed
+        print(f"   {'✓' if passed else '✗'} {url}: {detail}")
+
+    # The local server stands in for a public host; everything else is still checked
+    vetted = url_fetch.public_addresses
+    url_fetch.public_addresses = lambda host, port: ([(socket.AF_INET, ("127.0.0.1", port))]
+                                                     if host == "127.0.0.1" else vetted(host, port))
+    try:
+        print("\nRedirects from a public host:")
+        with open_public_url(f"{base}/image.jpg", timeout=2) as response:
+            passed = response.read() == b"image"
+        ok &= passed
+        print(f"   {'✓' if passed else '✗'} direct fetch {'succeeds' if passed else 'failed'}")
+        for path in RedirectHandler.TARGETS:
+            passed, detail = refused(base + path)
+            ok &= passed
+            print(f"   {'✓' if passed else '✗'} {path} -> {RedirectHandler.TARGETS[path]}: {detail}")
+    finally:
+        url_fetch.public_addresses = vetted
+        server.shutdown()
+
+    print("\n" + ("✓ All checks passed" if ok else "✗ Some checks failed"))
+    print("=" * 60)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""
+Background Grad-CAM heatmap jobs.
+/api/detect returns the classification immediately; heatmaps are computed on a
+low-priority worker pool and fetched later by id.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Optional
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+log = logging.getLogger(__name__)
+
+
+class JobQueueFullError(RuntimeError):
+    """Raised when too many heatmap jobs are already pending."""
+
+
+class VisualizationJobs:
+    """Bounded pool of background heatmap workers with bounded result retention."""
+
+    def __init__(self, num_workers: int = 1, max_pending: int = 32, max_results: int = 256,
+                 ttl: float = 300.0, nice: int = 10):
+        """
+        Initialize the pool and start its worker threads.
+
+        Args:
+            num_workers: Number of worker threads
+            max_pending: Maximum queued jobs before submit() rejects
+            max_results: Maximum finished results kept for retrieval
+            ttl: Seconds a finished result stays retrievable
+            nice: Scheduling niceness applied to worker threads (Linux only)
+        """
+        self.max_pending = max(1, int(max_pending))
+        self.max_results = max(1, int(max_results))
+        self.ttl = float(ttl)
+        self.nice = int(nice)
+        self._queue = queue.Queue(maxsize=self.max_pending)
+        self._jobs = OrderedDict()  # id -> job dict
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._workers = [
+            threading.Thread(target=self._run, name=f"heatmap-worker-{i}", daemon=True)
+            for i in range(max(1, int(num_workers)))
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    @classmethod
+    def from_env(cls):
+        """Create a pool configured from HEATMAP_* environment variables."""
+        return cls(
+            num_workers=int(os.environ.get('HEATMAP_WORKERS', 1)),
+            max_pending=int(os.environ.get('HEATMAP_MAX_PENDING', 32)),
+            max_results=int(os.environ.get('HEATMAP_MAX_RESULTS', 256)),
+            ttl=float(os.environ.get('HEATMAP_RESULT_TTL', 300)),
+            nice=int(os.environ.get('HEATMAP_NICE', 10)),
+        )
+
+    def submit(self, func: Callable[[], dict], on_done: Optional[Callable[[dict], None]] = None) -> str:
+        """
+        Queue a heatmap job.
+
+        Args:
+            func: Callable returning the visualization dict
+            on_done: Optional callback invoked with the visualization dict when the job succeeds
+
+        Returns:
+            Job id for GET /api/visualization/<id>
+        """
+        job_id = uuid.uuid4().hex
+        job = {"id": job_id, "status": PENDING, "visualization": None, "error": None,
+               "created": time.monotonic(), "finished": None}
+        with self._lock:
+            self._jobs[job_id] = job
+            self._prune()
+        try:
+            self._queue.put_nowait((job, func, on_done))
+        except queue.Full:
+            with self._lock:
+                self._jobs.pop(job_id, None)
+                self.rejected += 1
+            raise JobQueueFullError(f"Too many pending heatmap jobs ({self.max_pending})")
+        self.submitted += 1
+        return job_id
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """Return a snapshot of the job, or None if unknown or expired."""
+        with self._lock:
+            self._prune()
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def pending(self) -> int:
+        """Number of jobs waiting for a worker."""
+        return self._queue.qsize()
+
+    def stats(self) -> dict:
+        """Counters for submitted, completed, failed and rejected jobs."""
+        with self._lock:
+            retained = len(self._jobs)
+        return {
+            "pending": self.pending(),
+            "retained": retained,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+    def _prune(self):
+        """Drop expired finished jobs and keep at most max_results finished jobs. Caller holds the lock."""
+        now = time.monotonic()
+        finished = [job_id for job_id, job in self._jobs.items() if job["status"] != PENDING]
+        excess = len(finished) - self.max_results
+        for job_id in finished:
+            job = self._jobs[job_id]
+            if excess > 0 or now - job["finished"] > self.ttl:
+                del self._jobs[job_id]
+                excess -= 1
+
+    def _lower_priority(self):
+        """Renice the current worker thread so classification requests win the CPU."""
+        if self.nice <= 0 or not hasattr(os, "setpriority"):
+            return
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), self.nice)
+        except (OSError, AttributeError):
+            pass
+
+    def _run(self):
+        """Worker loop."""
+        self._lower_priority()
+        while True:
+            job, func, on_done = self._queue.get()
+            try:
+                visualization = func()
+            except Exception as e:
+                visualization = None
+                error = str(e)
+            else:
+                error = None if visualization.get("available") else visualization.get("message")
+            with self._lock:
+                job["visualization"] = visualization
+                job["error"] = error
+                job["status"] = DONE if error is None else FAILED
+                job["finished"] = time.monotonic()
+                if error is None:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+            if error is None and on_done is not None:
+                try:
+                    on_done(visualization)
+                except Exception as e:
+                    log.warning("Heatmap completion callback failed: %s", e)